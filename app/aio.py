@@ -0,0 +1,54 @@
+"""
+Async database access.
+
+`crud` and `services` here are async versions of the modules of the same
+name: every function takes an AsyncSession and runs the synchronous
+implementation on the session's connection with AsyncSession.run_sync. There
+is therefore a single implementation of every query and transaction, used by
+both database modes.
+"""
+import functools
+from typing import Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import crud as _crud, services as _services
+
+# What the get_db dependency yields, depending on MEMORYBANK_DB_MODE.
+AnySession = Union[Session, AsyncSession]
+
+
+class _AsyncModule:
+    """
+    Exposes the public functions of a module as coroutines taking an AsyncSession.
+    """
+
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name: str):
+        fn = getattr(self._module, name)
+
+        @functools.wraps(fn)
+        async def wrapper(db: AsyncSession, *args, **kwargs):
+            return await db.run_sync(fn, *args, **kwargs)
+
+        setattr(self, name, wrapper)
+        return wrapper
+
+
+crud = _AsyncModule(_crud)
+services = _AsyncModule(_services)
+
+
+async def run_db(db: AnySession, fn, *args, **kwargs):
+    """
+    Runs the synchronous `fn(session, *args, **kwargs)` without blocking the
+    event loop: on the AsyncSession's connection in async mode, or in the
+    threadpool with a plain Session in sync mode.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
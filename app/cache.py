@@ -0,0 +1,81 @@
+"""
+In-process read-through cache for project_context values.
+
+Entries are stored together with the "<version>:<seq>" cursor of the key
+(see crud.read_project_context). Every read first fetches the current cursor
+with a cheap indexed query and only uses the cached value if it still
+matches, so writes made by other workers or processes are picked up at the
+next read without any cross-process signalling.
+"""
+import threading
+from collections import OrderedDict
+
+from . import config
+
+
+class ContextCache:
+    """
+    Size-bounded LRU cache of {key: (cursor, value, size)}, where size is
+    the value's length in UTF-8 bytes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str, cursor: str):
+        """
+        Returns the cached value of `key` if it was stored under `cursor`,
+        otherwise None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != cursor:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, cursor: str, value: str):
+        size = len(value.encode())
+        with self._lock:
+            self._discard(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (cursor, value, size)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "bytes": self._size,
+            }
+
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+
+context_cache = ContextCache(
+    max_entries=config.CONTEXT_CACHE_MAX_ENTRIES,
+    max_bytes=config.CONTEXT_CACHE_MAX_BYTES,
+)
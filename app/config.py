@@ -0,0 +1,83 @@
+"""
+Runtime configuration, read from MEMORYBANK_* environment variables.
+"""
+import os
+
+
+def _int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+# For SQLite, the database will be a single file named 'memorybank.db' in the working directory.
+DATABASE_URL = os.getenv("MEMORYBANK_DATABASE_URL", "sqlite:///./memorybank.db")
+# "sync": endpoints use a Session in FastAPI's threadpool.
+# "async": endpoints use an AsyncSession (aiosqlite) on the event loop.
+DB_MODE = os.getenv("MEMORYBANK_DB_MODE", "sync")
+
+# SQLite tuning. "tuned" applies the pragmas below on every connection and
+# routes reads and writes through separate connection pools; "legacy" uses a
+# single pool with SQLite's defaults (rollback journal, synchronous=FULL).
+SQLITE_PROFILE = os.getenv("MEMORYBANK_SQLITE_PROFILE", "tuned")
+SQLITE_JOURNAL_MODE = os.getenv("MEMORYBANK_SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("MEMORYBANK_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = _int("MEMORYBANK_SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_MMAP_SIZE = _int("MEMORYBANK_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+SQLITE_CACHE_SIZE_KB = _int("MEMORYBANK_SQLITE_CACHE_SIZE_KB", 64 * 1024)
+# Connections available to read-only requests. Writes always share a single
+# connection, so writers queue in the pool instead of failing with
+# "database is locked".
+SQLITE_READ_POOL_SIZE = _int("MEMORYBANK_SQLITE_READ_POOL_SIZE", 8)
+SQLITE_WRITE_TIMEOUT_S = _int("MEMORYBANK_SQLITE_WRITE_TIMEOUT_S", 30)
+
+# Newest journal entries included in task responses; older ones are
+# available through getTaskJournal.
+TASK_JOURNAL_LIMIT = _int("MEMORYBANK_TASK_JOURNAL_LIMIT", 20)
+
+# Fair share across roles: callers that do not filter by assignee_role get
+# tasks of the role with the fewest RUNNING tasks first, so a role with a
+# large backlog cannot starve the others. Tasks without a role count as one
+# role.
+FAIR_SHARE = os.getenv("MEMORYBANK_FAIR_SHARE", "0").lower() in ("1", "true", "yes")
+
+# Task leases (see app/leases.py). Starting or claiming a task leases it for
+# TASK_LEASE_S seconds; heartbeatTask extends the lease. A sweeper returns
+# tasks whose lease expired to PENDING every LEASE_SWEEP_INTERVAL_S seconds,
+# LEASE_SWEEP_BATCH tasks per statement. Leases are off (0) unless set, as
+# only clients that call heartbeatTask should run with them.
+TASK_LEASE_S = _int("MEMORYBANK_TASK_LEASE_S", 0)
+LEASE_SWEEP_INTERVAL_S = float(os.getenv("MEMORYBANK_LEASE_SWEEP_INTERVAL_S", "10"))
+LEASE_SWEEP_BATCH = _int("MEMORYBANK_LEASE_SWEEP_BATCH", 500)
+
+# Group commit for transactional tools (see app/group_commit.py).
+GROUP_COMMIT = os.getenv("MEMORYBANK_GROUP_COMMIT", "0").lower() in ("1", "true", "yes")
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("MEMORYBANK_GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = _int("MEMORYBANK_GROUP_COMMIT_MAX_BATCH", 8)
+
+# Read-through cache for project_context values (see app/cache.py).
+CONTEXT_CACHE_MAX_ENTRIES = _int("MEMORYBANK_CONTEXT_CACHE_MAX_ENTRIES", 64)
+CONTEXT_CACHE_MAX_BYTES = _int("MEMORYBANK_CONTEXT_CACHE_MAX_BYTES", 64 * 1024 * 1024)
+
+# SQL statement counting and timing (see app/instrumentation.py): per-request
+# X-Query-Count / X-Query-Time-Ms headers and the /debug/queries endpoint.
+SQL_STATS = os.getenv("MEMORYBANK_SQL_STATS", "1").lower() in ("1", "true", "yes")
+# Number of slowest statements kept for /debug/queries
+SQL_SLOW_LOG_SIZE = _int("MEMORYBANK_SQL_SLOW_LOG_SIZE", 20)
+
+# Per-tool latency, request and error metrics on /metrics (see app/metrics.py).
+# The domain gauges on /metrics are always served.
+METRICS = os.getenv("MEMORYBANK_METRICS", "1").lower() in ("1", "true", "yes")
+
+# Journal retention (see app/retention.py). Tasks whose status is one of
+# JOURNAL_RETENTION_STATUSES keep only their newest JOURNAL_KEEP_LAST journal
+# entries; every JOURNAL_COMPACTION_INTERVAL_S seconds the older ones are
+# appended to gzipped NDJSON files in JOURNAL_ARCHIVE_DIR, counted in
+# journal_summaries and deleted, JOURNAL_COMPACTION_BATCH entries per write
+# transaction. JOURNAL_KEEP_LAST=0 disables compaction.
+JOURNAL_KEEP_LAST = _int("MEMORYBANK_JOURNAL_KEEP_LAST", 0)
+JOURNAL_RETENTION_STATUSES = tuple(
+    status.strip() for status in os.getenv("MEMORYBANK_JOURNAL_RETENTION_STATUSES", "COMPLETED").split(",")
+    if status.strip()
+)
+JOURNAL_COMPACTION_INTERVAL_S = float(os.getenv("MEMORYBANK_JOURNAL_COMPACTION_INTERVAL_S", "60"))
+JOURNAL_COMPACTION_BATCH = _int("MEMORYBANK_JOURNAL_COMPACTION_BATCH", 500)
+JOURNAL_ARCHIVE_DIR = os.getenv("MEMORYBANK_JOURNAL_ARCHIVE_DIR", "./journal-archive")
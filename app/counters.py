@@ -0,0 +1,147 @@
+"""
+Trigger-maintained counters for the /metrics gauges.
+
+`stats_counters` holds one row per counter. SQLite triggers on the tables
+being counted keep it up to date in the same transaction as each write, so
+a scrape reads a handful of rows instead of scanning `tasks`, `journal` or
+the context tables. Counters:
+- "tasks_status:<STATUS>": tasks per status
+- "tasks_ready": PENDING tasks with no unmet dependencies
+- "role_ready:<role>" / "role_running:<role>": ready and RUNNING tasks per
+  assignee_role ("" for none), for fair-share scheduling
+- "journal_rows": journal entries
+- "context_bytes:<key>": bytes of a context key's value and segments
+
+The triggers are installed, and the counters computed from the existing
+rows, the first time the tables are created in a database, or by the last
+migration for databases created by older versions. Both reinstall them when
+their definitions below have changed.
+"""
+from sqlalchemy import event, inspect, text
+
+from .database import Base
+
+
+def _add(name_sql: str, delta_sql: str, when_sql: str = "1") -> str:
+    return (
+        f"INSERT INTO stats_counters (name, value) SELECT {name_sql}, {delta_sql} WHERE {when_sql} "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;"
+    )
+
+
+def _is_ready(row: str) -> str:
+    return f"({row}.status = 'PENDING' AND {row}.unmet_dependencies = 0)"
+
+
+def _role(row: str) -> str:
+    return f"coalesce({row}.assignee_role, '')"
+
+
+def _size(value_sql: str) -> str:
+    return f"coalesce(length(CAST({value_sql} AS BLOB)), 0)"
+
+
+_TRIGGERS = {
+    "stats_tasks_insert": f"""
+        AFTER INSERT ON tasks BEGIN
+            {_add("'tasks_status:' || NEW.status", "1")}
+            {_add("'tasks_ready'", "1", _is_ready("NEW"))}
+            {_add(f"'role_ready:' || {_role('NEW')}", "1", _is_ready("NEW"))}
+            {_add(f"'role_running:' || {_role('NEW')}", "1", "NEW.status = 'RUNNING'")}
+        END""",
+    "stats_tasks_update": f"""
+        AFTER UPDATE OF status, unmet_dependencies, assignee_role ON tasks
+        WHEN OLD.status IS NOT NEW.status OR OLD.unmet_dependencies IS NOT NEW.unmet_dependencies
+            OR OLD.assignee_role IS NOT NEW.assignee_role
+        BEGIN
+            {_add("'tasks_status:' || OLD.status", "-1", "OLD.status IS NOT NEW.status")}
+            {_add("'tasks_status:' || NEW.status", "1", "OLD.status IS NOT NEW.status")}
+            {_add("'tasks_ready'", f"{_is_ready('NEW')} - {_is_ready('OLD')}", f"{_is_ready('NEW')} != {_is_ready('OLD')}")}
+            {_add(f"'role_ready:' || {_role('OLD')}", "-1", _is_ready("OLD"))}
+            {_add(f"'role_ready:' || {_role('NEW')}", "1", _is_ready("NEW"))}
+            {_add(f"'role_running:' || {_role('OLD')}", "-1", "OLD.status = 'RUNNING' AND (NEW.status IS NOT 'RUNNING' OR OLD.assignee_role IS NOT NEW.assignee_role)")}
+            {_add(f"'role_running:' || {_role('NEW')}", "1", "NEW.status = 'RUNNING' AND (OLD.status IS NOT 'RUNNING' OR OLD.assignee_role IS NOT NEW.assignee_role)")}
+        END""",
+    "stats_tasks_delete": f"""
+        AFTER DELETE ON tasks BEGIN
+            {_add("'tasks_status:' || OLD.status", "-1")}
+            {_add("'tasks_ready'", "-1", _is_ready("OLD"))}
+            {_add(f"'role_ready:' || {_role('OLD')}", "-1", _is_ready("OLD"))}
+            {_add(f"'role_running:' || {_role('OLD')}", "-1", "OLD.status = 'RUNNING'")}
+        END""",
+    "stats_journal_insert": f"""
+        AFTER INSERT ON journal BEGIN
+            {_add("'journal_rows'", "1")}
+        END""",
+    "stats_journal_delete": f"""
+        AFTER DELETE ON journal BEGIN
+            {_add("'journal_rows'", "-1")}
+        END""",
+    "stats_segments_insert": f"""
+        AFTER INSERT ON project_context_segments BEGIN
+            {_add("'context_bytes:' || NEW.key", _size("NEW.content"))}
+        END""",
+    "stats_segments_delete": f"""
+        AFTER DELETE ON project_context_segments BEGIN
+            {_add("'context_bytes:' || OLD.key", f"-{_size('OLD.content')}")}
+        END""",
+    "stats_context_insert": f"""
+        AFTER INSERT ON project_context BEGIN
+            {_add("'context_bytes:' || NEW.key", _size("NEW.value"))}
+        END""",
+    "stats_context_update": f"""
+        AFTER UPDATE OF value ON project_context BEGIN
+            {_add("'context_bytes:' || NEW.key", f"{_size('NEW.value')} - {_size('OLD.value')}")}
+        END""",
+    "stats_context_delete": f"""
+        AFTER DELETE ON project_context BEGIN
+            {_add("'context_bytes:' || OLD.key", f"-{_size('OLD.value')}")}
+        END""",
+}
+
+_BACKFILL = [
+    "INSERT INTO stats_counters (name, value) SELECT 'tasks_status:' || status, count(*) FROM tasks GROUP BY status",
+    "INSERT INTO stats_counters (name, value) "
+    "SELECT 'tasks_ready', count(*) FROM tasks WHERE status = 'PENDING' AND unmet_dependencies = 0",
+    "INSERT INTO stats_counters (name, value) "
+    f"SELECT 'role_ready:' || {_role('tasks')}, count(*) FROM tasks "
+    f"WHERE status = 'PENDING' AND unmet_dependencies = 0 GROUP BY {_role('tasks')}",
+    "INSERT INTO stats_counters (name, value) "
+    f"SELECT 'role_running:' || {_role('tasks')}, count(*) FROM tasks WHERE status = 'RUNNING' GROUP BY {_role('tasks')}",
+    "INSERT INTO stats_counters (name, value) SELECT 'journal_rows', count(*) FROM journal",
+    "INSERT INTO stats_counters (name, value) "
+    "SELECT 'context_bytes:' || key, sum(size) FROM ("
+    f"  SELECT key, {_size('value')} AS size FROM project_context"
+    f"  UNION ALL SELECT key, {_size('content')} FROM project_context_segments"
+    ") GROUP BY key",
+]
+
+
+def install_triggers(connection):
+    """
+    Installs the triggers and computes the counters from the existing rows,
+    unless the current triggers are already installed.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    expected = {name: f"CREATE TRIGGER {name} {body}" for name, body in _TRIGGERS.items()}
+    installed = dict(connection.execute(text(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'stats\\_%' ESCAPE '\\'"
+    )).all())
+    if installed == expected:
+        return
+    for name in installed:
+        connection.execute(text(f"DROP TRIGGER {name}"))
+    for statement in expected.values():
+        connection.execute(text(statement))
+    connection.execute(text("DELETE FROM stats_counters"))
+    for statement in _BACKFILL:
+        connection.execute(text(statement))
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_after_create(target, connection, **kw):
+    # Tables created by older versions lack columns the triggers use; for
+    # those, migrations.run_migrations installs them once they are added.
+    if "unmet_dependencies" in {column["name"] for column in inspect(connection).get_columns("tasks")}:
+        install_triggers(connection)
\ No newline at end of file
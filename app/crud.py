@@ -1,6 +1,10 @@
+import heapq
 import json
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import String, delete, func, select, text, tuple_, type_coerce, update
 from sqlalchemy.orm import Session
-from . import models, schemas
+from . import config, models, schemas
+from .cache import context_cache
 
 # ===================
 # Task CRUD
@@ -12,48 +16,417 @@ def get_task(db: Session, task_id: str):
 def get_tasks(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Task).offset(skip).limit(limit).all()
 
+def list_tasks(db: Session, columns, limit: int, status: str = None, type: str = None,
+               assignee_role: str = None, updated_since: str = None, after=None, ascending: bool = False):
+    """
+    Returns up to `limit` rows of the given Task `columns` plus `task_id` and
+    the stored `updated_at` text as "updated_key", ordered by
+    (updated_at, task_id), newest first unless `ascending`. `after` is the
+    (updated_key, task_id) of the last row of the previous page.
+
+    Keyset pagination: every page is a range scan of ix_tasks_updated, or of
+    ix_tasks_{status,type,role}_updated when filtering, starting at `after`,
+    so deep pages cost the same as the first.
+    """
+    # Compared as stored text: timestamps are not normalised, and binding a
+    # datetime would add microseconds that break equality on page boundaries.
+    updated_key = type_coerce(models.Task.updated_at, String)
+    query = select(models.Task.task_id, updated_key.label("updated_key"), *columns)
+    if status is not None:
+        query = query.where(models.Task.status == status)
+    if type is not None:
+        query = query.where(models.Task.type == type)
+    if assignee_role is not None:
+        query = query.where(models.Task.assignee_role == assignee_role)
+    if updated_since is not None:
+        query = query.where(updated_key >= updated_since)
+    key = tuple_(updated_key, models.Task.task_id)
+    if ascending:
+        if after is not None:
+            query = query.where(key > tuple_(*after))
+        query = query.order_by(updated_key, models.Task.task_id)
+    else:
+        if after is not None:
+            query = query.where(key < tuple_(*after))
+        query = query.order_by(updated_key.desc(), models.Task.task_id.desc())
+    return db.execute(query.limit(limit)).all()
+
+def get_tasks_by_ids(db: Session, task_ids):
+    """
+    Loads the given tasks in the order of `task_ids`. Missing IDs are skipped.
+    """
+    task_ids = list(task_ids)
+    tasks = {}
+    for start in range(0, len(task_ids), 5000):
+        rows = db.query(models.Task).filter(models.Task.task_id.in_(task_ids[start:start + 5000]))
+        tasks.update((task.task_id, task) for task in rows)
+    return [tasks[task_id] for task_id in task_ids if task_id in tasks]
+
+def get_dependency_ids(db: Session, task_ids):
+    """
+    Returns {task_id: [dependency IDs]} for `task_ids` with one query per
+    5000 tasks. Tasks without dependencies are left out.
+    """
+    task_ids = list(task_ids)
+    dependencies = {}
+    for start in range(0, len(task_ids), 5000):
+        rows = db.query(models.TaskDependency.task_id, models.TaskDependency.depends_on_id).filter(
+            models.TaskDependency.task_id.in_(task_ids[start:start + 5000])
+        ).order_by(models.TaskDependency.task_id, models.TaskDependency.depends_on_id)
+        for task_id, depends_on_id in rows:
+            dependencies.setdefault(task_id, []).append(depends_on_id)
+    return dependencies
+
+def get_recent_journal_entries(db: Session, task_ids, limit: int):
+    """
+    Returns {task_id: (entries, total)} for `task_ids`: the newest `limit`
+    journal entries of each task, oldest first, and how many it has in all.
+    Ranking and counting only read `ix_journal_task_id_id`; full rows are
+    fetched for the kept entries only. Tasks without entries are left out.
+    """
+    task_ids = list(task_ids)
+    journals = {}
+    for start in range(0, len(task_ids), 5000):
+        ranked = select(
+            models.Journal.id,
+            func.row_number().over(
+                partition_by=models.Journal.task_id, order_by=models.Journal.id.desc()
+            ).label("rank"),
+            func.count().over(partition_by=models.Journal.task_id).label("total"),
+        ).where(models.Journal.task_id.in_(task_ids[start:start + 5000])).subquery()
+        # Rank 1 is kept even with limit 0 so the total is still reported.
+        rows = db.execute(
+            select(models.Journal, ranked.c.total)
+            .join(ranked, models.Journal.id == ranked.c.id)
+            .where(ranked.c.rank <= max(limit, 1))
+            .order_by(models.Journal.task_id, models.Journal.id)
+        )
+        for entry, total in rows:
+            entries, _ = journals.setdefault(entry.task_id, ([], total))
+            entries.append(entry)
+    if limit == 0:
+        return {task_id: ([], total) for task_id, (_, total) in journals.items()}
+    return journals
+
+def get_journal_page(db: Session, task_id: str, limit: int, before_id: int = None):
+    """
+    Returns up to `limit` journal entries of a task, newest first, starting
+    below `before_id` if given.
+    """
+    query = db.query(models.Journal).filter(models.Journal.task_id == task_id)
+    if before_id is not None:
+        query = query.filter(models.Journal.id < before_id)
+    return query.order_by(models.Journal.id.desc()).limit(limit).all()
+
+def get_inconsistent_tasks(db: Session, limit: int, after_task_id: str = None):
+    """
+    Returns up to `limit` (task_id, status, last_event) rows of the tasks
+    whose status disagrees with their last journal event, ordered by
+    task_id and starting after `after_task_id` if given.
+    """
+    # A range scan of the partial index, however large tasks and journal
+    # are. Without ANALYZE statistics the planner prefers ix_tasks_ready,
+    # which reads every PENDING task, so the index is named explicitly.
+    statement = (
+        "SELECT task_id, status, last_event FROM tasks INDEXED BY ix_tasks_last_event_mismatch "
+        f"WHERE ({models.LAST_EVENT_MISMATCH})"
+    )
+    if after_task_id is not None:
+        statement += " AND task_id > :after_task_id"
+    statement += " ORDER BY task_id LIMIT :limit"
+    return db.execute(text(statement), {"after_task_id": after_task_id, "limit": limit}).all()
+
+_TASK_GRAPH_STEPS = {
+    # Follows task -> dependency edges on the primary key
+    "ancestors": "SELECT d.depends_on_id FROM task_dependencies d JOIN graph ON d.task_id = graph.task_id",
+    # Follows dependency -> task edges on ix_task_dependencies_depends_on_id
+    "descendants": "SELECT d.task_id FROM task_dependencies d JOIN graph ON d.depends_on_id = graph.task_id",
+}
+
+def get_task_graph_rows(db: Session, task_id: str, direction: str, max_tasks: int):
+    """
+    Returns (task_id, status, unmet_dependencies, priority, created_at,
+    depends_on_id) rows for `task_id` and its "ancestors" (the tasks it
+    transitively depends on) or "descendants" (the tasks that transitively
+    depend on it), one row per dependency of each (depends_on_id is NULL for
+    tasks without any). Tasks that are referenced but do not exist have a
+    NULL status. The walk stops after the `max_tasks` nearest tasks.
+    """
+    # UNION rather than UNION ALL visits every task once, so shared
+    # dependencies (diamonds) and dependency cycles are walked only once.
+    # SQLite walks breadth-first and the LIMIT caps the rows ever added to
+    # graph, including the task itself.
+    statement = (
+        f"WITH RECURSIVE graph(task_id) AS (VALUES (:task_id) UNION {_TASK_GRAPH_STEPS[direction]} "
+        "LIMIT :max_tasks + 1) "
+        "SELECT graph.task_id, t.status, t.unmet_dependencies, t.priority, t.created_at, d.depends_on_id "
+        "FROM graph LEFT JOIN tasks t ON t.task_id = graph.task_id "
+        "LEFT JOIN task_dependencies d ON d.task_id = graph.task_id"
+    )
+    return db.execute(text(statement), {"task_id": task_id, "max_tasks": max_tasks}).all()
+
 def create_task(db: Session, task: schemas.TaskCreate):
-    # Pydantic model has a list of strings, but DB model stores a JSON string.
-    dependencies_json = json.dumps(task.dependencies)
+    # Pydantic model has a list of strings, but DB model stores one edge per dependency.
+    dependency_ids = list(dict.fromkeys(task.dependencies or []))
     db_task = models.Task(
         **task.model_dump(exclude={'dependencies'}),
-        dependencies=dependencies_json
+        unmet_dependencies=count_unmet_dependencies(db, dependency_ids)
     )
+    db_task.dependency_links = [
+        models.TaskDependency(depends_on_id=dep_id) for dep_id in dependency_ids
+    ]
     db.add(db_task)
+    if db_task.status == 'COMPLETED':
+        # Tasks that already reference this one counted it as unmet.
+        adjust_unmet_dependencies(db, [db_task.task_id], -1)
     db.commit()
     db.refresh(db_task)
     return db_task
 
-def get_next_ready_task(db: Session):
-    """
-    Finds the next task that is 'PENDING' and has all its dependencies 'COMPLETED'.
-    """
-    pending_tasks = db.query(models.Task).filter(models.Task.status == 'PENDING').order_by(models.Task.created_at).all()
-    
-    for task in pending_tasks:
-        if not task.dependencies or task.dependencies == '[]':
-            return task # No dependencies, ready to run
-
-        try:
-            dependency_ids = json.loads(task.dependencies)
-        except json.JSONDecodeError:
-            continue # Skip if dependencies are malformed
-
-        if not dependency_ids:
-            return task # Empty dependency list
-
-        # Check status of all dependent tasks
-        dependencies_met = True
-        for dep_id in dependency_ids:
-            dep_task = get_task(db, dep_id)
-            if not dep_task or dep_task.status != 'COMPLETED':
-                dependencies_met = False
-                break
-        
-        if dependencies_met:
-            return task
-            
-    return None
+def get_task_statuses(db: Session, task_ids):
+    """
+    Returns a {task_id: status} dict for those of `task_ids` that exist.
+    """
+    task_ids = list(task_ids)
+    statuses = {}
+    # Chunked to stay below SQLite's limit on bound parameters.
+    for start in range(0, len(task_ids), 5000):
+        rows = db.query(models.Task.task_id, models.Task.status).filter(
+            models.Task.task_id.in_(task_ids[start:start + 5000])
+        )
+        statuses.update(rows)
+    return statuses
+
+def count_unmet_dependencies(db: Session, dependency_ids):
+    """
+    Counts the distinct dependencies that are not 'COMPLETED'.
+    A dependency that does not exist (yet) counts as unmet.
+    """
+    dependency_ids = set(dependency_ids)
+    if not dependency_ids:
+        return 0
+    completed = db.query(func.count(models.Task.task_id)).filter(
+        models.Task.task_id.in_(dependency_ids),
+        models.Task.status == 'COMPLETED'
+    ).scalar()
+    return len(dependency_ids) - completed
+
+def get_dependent_task_ids(db: Session, task_id: str):
+    """
+    Returns the IDs of the tasks that list `task_id` as a dependency.
+    """
+    rows = db.query(models.TaskDependency.task_id).filter(
+        models.TaskDependency.depends_on_id == task_id
+    )
+    return [dependent_id for dependent_id, in rows]
+
+def adjust_unmet_dependencies(db: Session, task_ids, delta: int):
+    """
+    Adds `delta` to the unmet dependency count of every task that depends on
+    one of `task_ids`, once for each of those dependencies. Does not commit.
+    Returns the IDs of the PENDING dependents whose count is now 0, in ready
+    queue order.
+    """
+    task_ids = list(task_ids)
+    matching_dependencies = select(func.count()).where(
+        models.TaskDependency.task_id == models.Task.task_id,
+        models.TaskDependency.depends_on_id.in_(task_ids)
+    ).scalar_subquery()
+    dependents = select(models.TaskDependency.task_id).where(
+        models.TaskDependency.depends_on_id.in_(task_ids)
+    )
+    rows = db.execute(
+        update(models.Task)
+        .where(models.Task.task_id.in_(dependents))
+        .values(unmet_dependencies=models.Task.unmet_dependencies + delta * matching_dependencies)
+        .returning(
+            models.Task.task_id, models.Task.status, models.Task.unmet_dependencies,
+            models.Task.priority, models.Task.created_at
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+    ready = sorted(
+        (-row.priority, row.created_at, row.task_id) for row in rows
+        if row.status == 'PENDING' and row.unmet_dependencies == 0
+    )
+    return [task_id for *_, task_id in ready]
+
+def set_task_status(db: Session, db_task: models.Task, status: str):
+    """
+    Sets the status of a task without committing. Moving it to 'RUNNING'
+    (again) starts a new lease; any other status ends it.
+    When the task moves into or out of 'COMPLETED', the unmet dependency
+    counts of its dependents are updated in the same transaction.
+    Returns the IDs of the dependents this made ready (see
+    adjust_unmet_dependencies); empty unless the task was just completed.
+    """
+    previous_status = db_task.status
+    db_task.status = status
+    db_task.lease_expires_at = new_lease_expiry() if status == 'RUNNING' else None
+    if previous_status != 'COMPLETED' and status == 'COMPLETED':
+        return adjust_unmet_dependencies(db, [db_task.task_id], -1)
+    elif previous_status == 'COMPLETED' and status != 'COMPLETED':
+        adjust_unmet_dependencies(db, [db_task.task_id], 1)
+    return []
+
+def utcnow() -> datetime:
+    # Naive UTC, like the CURRENT_TIMESTAMP defaults of the timestamp columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def new_lease_expiry(now: datetime = None):
+    """
+    Returns when a lease taken `now` expires, or None if leases are
+    disabled (MEMORYBANK_TASK_LEASE_S=0).
+    """
+    if config.TASK_LEASE_S <= 0:
+        return None
+    return (now or utcnow()) + timedelta(seconds=config.TASK_LEASE_S)
+
+def extend_lease(db: Session, task_id: str):
+    """
+    Renews the lease of a RUNNING task without committing, in one UPDATE.
+    Returns the new expiry as (task_id, lease_expires_at), or None if the
+    task does not exist or is not RUNNING.
+    """
+    return db.execute(
+        update(models.Task)
+        .where(models.Task.task_id == task_id, models.Task.status == 'RUNNING')
+        .values(lease_expires_at=new_lease_expiry())
+        .returning(models.Task.task_id, models.Task.lease_expires_at)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+def expire_leases(db: Session, now: datetime, limit: int):
+    """
+    Returns up to `limit` RUNNING tasks whose lease expired before `now` to
+    'PENDING', without committing, and returns their (task_id,
+    unmet_dependencies) rows. One UPDATE ... RETURNING over the
+    ix_tasks_lease_expires_at range, so the cost follows the number of
+    expired tasks. The statement runs under the write lock, so concurrent
+    sweeps (e.g. from several workers) expire each task only once.
+    """
+    # Only RUNNING tasks have a lease (see set_task_status). Filtering on
+    # status as well would make SQLite scan every RUNNING task through
+    # ix_tasks_ready instead.
+    expired = (
+        select(models.Task.task_id)
+        .where(models.Task.lease_expires_at < now)
+        .order_by(models.Task.lease_expires_at)
+        .limit(limit)
+    )
+    return db.execute(
+        update(models.Task)
+        .where(models.Task.task_id.in_(expired))
+        .values(status='PENDING', lease_expires_at=None)
+        .returning(models.Task.task_id, models.Task.unmet_dependencies)
+        .execution_options(synchronize_session=False)
+    ).all()
+
+# Ready queue order, as stored in ix_tasks_ready and ix_tasks_role_ready
+READY_QUEUE_ORDER = (models.Task.priority.desc(), models.Task.created_at)
+
+def role_condition(role: str):
+    """
+    Filters on a role as named by plan_fair_share, where "" stands for
+    tasks without a role.
+    """
+    if role == "":
+        return models.Task.assignee_role.is_(None)
+    return models.Task.assignee_role == role
+
+def plan_fair_share(db: Session, count: int):
+    """
+    Splits `count` ready tasks across roles, one at a time to the role with
+    the fewest RUNNING tasks (counting those already handed out), and
+    returns {role: number of tasks}. Reads the role_ready / role_running
+    counters (see app/counters.py) instead of the tasks table.
+    """
+    counters = db.query(models.StatsCounter.name, models.StatsCounter.value).filter(
+        models.StatsCounter.name.like("role\\_%", escape="\\")
+    )
+    ready, running = {}, {}
+    for name, value in counters:
+        kind, _, role = name.partition(":")
+        (ready if kind == "role_ready" else running)[role] = value
+    queue = [(running.get(role, 0), role) for role, value in ready.items() if value > 0]
+    heapq.heapify(queue)
+    plan = {}
+    while queue and count > 0:
+        role_running, role = heapq.heappop(queue)
+        plan[role] = plan.get(role, 0) + 1
+        count -= 1
+        if plan[role] < ready[role]:
+            heapq.heappush(queue, (role_running + 1, role))
+    return plan
+
+def get_next_ready_task(db: Session, assignee_role: str = None):
+    """
+    Finds the next task that is 'PENDING' and has all its dependencies 'COMPLETED',
+    optionally only among those for `assignee_role`: the highest priority
+    one, oldest first among equals. Without `assignee_role` and with
+    MEMORYBANK_FAIR_SHARE, only among those of the role plan_fair_share picks.
+    Readiness is stored in `unmet_dependencies`, so this is a single lookup on
+    the `ix_tasks_ready` or `ix_tasks_role_ready` index regardless of how
+    many tasks are pending.
+    """
+    query = db.query(models.Task).filter(
+        models.Task.status == 'PENDING',
+        models.Task.unmet_dependencies == 0
+    )
+    if assignee_role is not None:
+        query = query.filter(models.Task.assignee_role == assignee_role)
+    elif config.FAIR_SHARE:
+        plan = plan_fair_share(db, 1)
+        if not plan:
+            return None
+        query = query.filter(role_condition(next(iter(plan))))
+    return query.order_by(*READY_QUEUE_ORDER).first()
+
+_SEARCH_STATEMENTS = {
+    "task": (
+        "SELECT 'task', t.task_id, NULL, NULL, "
+        "snippet(tasks_fts, -1, :mark_start, :mark_end, '…', :tokens), rank "
+        "FROM tasks_fts JOIN tasks t ON t.rowid = tasks_fts.rowid "
+        "WHERE tasks_fts MATCH :match ORDER BY rank LIMIT :limit"
+    ),
+    "context": (
+        "SELECT 'context', NULL, c.key, NULL, "
+        "snippet(project_context_fts, -1, :mark_start, :mark_end, '…', :tokens), rank "
+        "FROM project_context_fts JOIN project_context c ON c.rowid = project_context_fts.rowid "
+        "WHERE project_context_fts MATCH :match ORDER BY rank LIMIT :limit"
+    ),
+    "segment": (
+        "SELECT 'context', NULL, s.key, s.seq, "
+        "snippet(project_context_segments_fts, -1, :mark_start, :mark_end, '…', :tokens), rank "
+        "FROM project_context_segments_fts JOIN project_context_segments s ON s.seq = project_context_segments_fts.rowid "
+        "WHERE project_context_segments_fts MATCH :match ORDER BY rank LIMIT :limit"
+    ),
+}
+
+def search_memory(db: Session, match: str, kinds, limit: int, snippet_tokens: int):
+    """
+    Runs the FTS5 query `match` (see search.match_expression) against the
+    full-text indexes of `kinds` ("task", "context") and returns up to
+    `limit` (kind, task_id, key, seq, snippet, bm25) rows, best match first
+    (lowest bm25). Matched terms in snippets are wrapped in [ and ].
+    """
+    # Each index returns its own best `limit` rows in rank order, so snippets
+    # are only built for rows that can make the final list.
+    parts = [_SEARCH_STATEMENTS["task"]] if "task" in kinds else []
+    if "context" in kinds:
+        parts += [_SEARCH_STATEMENTS["context"], _SEARCH_STATEMENTS["segment"]]
+    statement = " UNION ALL ".join(f"SELECT * FROM ({part})" for part in parts)
+    rows = db.execute(text(statement), {
+        "match": match, "limit": limit, "tokens": snippet_tokens, "mark_start": "[", "mark_end": "]",
+    }).all()
+    return sorted(rows, key=lambda row: row[5])[:limit]
+
+def get_stats_counters(db: Session):
+    """
+    Returns {name: value} of the trigger-maintained counters (see
+    app/counters.py). Reads a few rows, however large the tables are.
+    """
+    return dict(db.query(models.StatsCounter.name, models.StatsCounter.value))
 
 # ===================
 # Journal CRUD
@@ -66,6 +439,140 @@ def create_journal_entry(db: Session, entry: schemas.JournalCreate):
     db.refresh(db_entry)
     return db_entry
 
+def get_compactable_journal_entries(db: Session, statuses, keep: int, limit: int):
+    """
+    Returns up to `limit` (id, task_id, event_type, timestamp) rows, oldest
+    first, of the journal entries that the retention policy no longer keeps:
+    all but the newest `keep` entries of each task in one of `statuses`.
+    `timestamp` is the stored text, so archived entries load back unchanged.
+
+    Candidate tasks are a range scan of ix_tasks_journal_events, and only
+    their entries are ranked (on ix_journal_task_id_id).
+    """
+    candidates = select(models.Task.task_id).where(
+        models.Task.status.in_(statuses), models.Task.journal_events > keep
+    ).limit(limit)
+    ranked = select(
+        models.Journal.id,
+        models.Journal.task_id,
+        models.Journal.event_type,
+        type_coerce(models.Journal.timestamp, String).label("timestamp"),
+        func.row_number().over(
+            partition_by=models.Journal.task_id, order_by=models.Journal.id.desc()
+        ).label("rank"),
+    ).where(models.Journal.task_id.in_(candidates)).subquery()
+    return db.execute(
+        select(ranked.c.id, ranked.c.task_id, ranked.c.event_type, ranked.c.timestamp)
+        .where(ranked.c.rank > keep)
+        .order_by(ranked.c.id)
+        .limit(limit)
+    ).all()
+
+def delete_journal_entries(db: Session, ids):
+    """
+    Deletes the journal entries `ids` without committing and returns the
+    (id, task_id, event_type, timestamp) rows of those that still existed.
+    """
+    return db.execute(
+        delete(models.Journal)
+        .where(models.Journal.id.in_(list(ids)))
+        .returning(
+            models.Journal.id, models.Journal.task_id, models.Journal.event_type,
+            type_coerce(models.Journal.timestamp, String),
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+def restore_journal_entry(db: Session, entry: dict) -> bool:
+    """
+    Inserts an archived journal entry with its original id and timestamp,
+    without committing. Returns False if the entry is already in the journal
+    or its task no longer exists.
+    """
+    return db.execute(text(
+        "INSERT OR IGNORE INTO journal (id, task_id, event_type, timestamp) "
+        "SELECT :id, :task_id, :event_type, :timestamp "
+        "WHERE EXISTS (SELECT 1 FROM tasks WHERE task_id = :task_id) RETURNING id"
+    ), entry).first() is not None
+
+def refresh_last_events(db: Session, task_ids):
+    """
+    Sets `last_event` of `task_ids` from their newest journal entry again,
+    e.g. after older entries were restored (which fires journal_last_event).
+    """
+    newest = select(models.Journal.event_type).where(
+        models.Journal.task_id == models.Task.task_id
+    ).order_by(models.Journal.id.desc()).limit(1).scalar_subquery()
+    db.execute(
+        update(models.Task)
+        .where(models.Task.task_id.in_(list(task_ids)))
+        .values(last_event=newest)
+        .execution_options(synchronize_session=False)
+    )
+
+def _summarised_entries(rows):
+    # task_id -> (count, {event_type: count}, first timestamp, last timestamp)
+    summaries = {}
+    for _, task_id, event_type, timestamp in rows:
+        count, event_counts, first, last = summaries.get(task_id, (0, {}, timestamp, timestamp))
+        event_counts[event_type] = event_counts.get(event_type, 0) + 1
+        summaries[task_id] = (count + 1, event_counts, min(first, timestamp), max(last, timestamp))
+    return summaries
+
+def add_to_journal_summaries(db: Session, rows):
+    """
+    Adds archived (id, task_id, event_type, timestamp) rows to their tasks'
+    journal summaries, without committing.
+    """
+    summaries = _summarised_entries(rows)
+    existing = {
+        summary.task_id: summary for summary in db.query(models.JournalSummary)
+        .filter(models.JournalSummary.task_id.in_(list(summaries)))
+    }
+    for task_id, (count, event_counts, first, last) in summaries.items():
+        first, last = datetime.fromisoformat(first), datetime.fromisoformat(last)
+        summary = existing.get(task_id)
+        if summary is None:
+            db.add(models.JournalSummary(
+                task_id=task_id, archived_entries=count, event_counts=json.dumps(event_counts),
+                first_timestamp=first, last_timestamp=last,
+            ))
+            continue
+        counts = json.loads(summary.event_counts)
+        for event_type, event_count in event_counts.items():
+            counts[event_type] = counts.get(event_type, 0) + event_count
+        summary.archived_entries += count
+        summary.event_counts = json.dumps(counts)
+        summary.first_timestamp = min(summary.first_timestamp or first, first)
+        summary.last_timestamp = max(summary.last_timestamp or last, last)
+
+def remove_from_journal_summaries(db: Session, rows):
+    """
+    Takes restored (id, task_id, event_type, timestamp) rows out of their
+    tasks' journal summaries, without committing; a summary with no archived
+    entries left is deleted. The archived time range is left as it was.
+    """
+    summaries = _summarised_entries(rows)
+    for summary in db.query(models.JournalSummary).filter(
+        models.JournalSummary.task_id.in_(list(summaries))
+    ):
+        count, event_counts, _, _ = summaries[summary.task_id]
+        if summary.archived_entries <= count:
+            db.delete(summary)
+            continue
+        counts = json.loads(summary.event_counts)
+        for event_type, event_count in event_counts.items():
+            remaining = counts.get(event_type, 0) - event_count
+            if remaining > 0:
+                counts[event_type] = remaining
+            else:
+                counts.pop(event_type, None)
+        summary.archived_entries -= count
+        summary.event_counts = json.dumps(counts)
+
+def get_journal_summary(db: Session, task_id: str):
+    return db.get(models.JournalSummary, task_id)
+
 # ===================
 # Project Context CRUD
 # ===================
@@ -73,28 +580,135 @@ def create_journal_entry(db: Session, entry: schemas.JournalCreate):
 def get_project_context(db: Session, key: str):
     return db.query(models.ProjectContext).filter(models.ProjectContext.key == key).first()
 
+def _get_project_context_version(db: Session, key: str):
+    version = select(models.ProjectContext.version).where(
+        models.ProjectContext.key == key
+    ).scalar_subquery()
+    last_seq = select(func.max(models.ProjectContextSegment.seq)).where(
+        models.ProjectContextSegment.key == key
+    ).scalar_subquery()
+    return db.execute(select(func.coalesce(version, 0), func.coalesce(last_seq, 0))).one()
+
+def get_project_context_cursor(db: Session, key: str):
+    """
+    Returns the current "<version>:<seq>" cursor of a context key (see
+    read_project_context) without reading its value.
+    """
+    version, last_seq = _get_project_context_version(db, key)
+    return f"{version}:{last_seq}"
+
+def read_project_context(db: Session, key: str, since: str = None, last_segments: int = None, max_bytes: int = None):
+    """
+    Reads the value of a context key: its base value followed by the appended
+    segments, oldest first, separated by newlines.
+    `last_segments` and `max_bytes` keep only the newest whole segments that
+    fit; the base value counts as the oldest segment.
+
+    Returns (value, cursor, not_modified). The cursor is "<version>:<seq>",
+    where `version` changes whenever the value is replaced and `seq` is the
+    newest segment read. Passing an earlier cursor as `since` returns only
+    the segments appended after it, or not_modified=True if there are none.
+    A cursor from before a replacement falls back to a full read.
+
+    Full reads are served from `cache.context_cache` while the cursor is
+    unchanged.
+    """
+    version, last_seq = _get_project_context_version(db, key)
+    cursor = f"{version}:{last_seq}"
+    if since == cursor:
+        return "", cursor, True
+    full_read = since is None and last_segments is None and max_bytes is None
+    if full_read:
+        cached = context_cache.get(key, cursor)
+        if cached is not None:
+            return cached, cursor, False
+
+    version, base = db.query(
+        models.ProjectContext.version, models.ProjectContext.value
+    ).filter(models.ProjectContext.key == key).first() or (0, None)
+    # Use the version that goes with `base` in case it was replaced meanwhile.
+    cursor = f"{version}:{last_seq}"
+
+    after_seq = None
+    since_version, _, since_seq = (since or "").partition(":")
+    if since_version == str(version) and since_seq.isdigit():
+        after_seq = int(since_seq)
+        base = None # Already seen by the caller
+
+    # Bounded by last_seq so that the value matches the cursor even if another
+    # writer appends while we read.
+    segments = db.query(models.ProjectContextSegment.content).filter(
+        models.ProjectContextSegment.key == key,
+        models.ProjectContextSegment.seq <= last_seq
+    ).order_by(models.ProjectContextSegment.seq.desc())
+    if after_seq is not None:
+        segments = segments.filter(models.ProjectContextSegment.seq > after_seq)
+    if last_segments is not None:
+        segments = segments.limit(last_segments)
+
+    parts = []
+    size = 0
+    budget_exceeded = False
+    # Newest first, so a limited read stops after the segments it returns.
+    for content, in segments.yield_per(500):
+        size += len(content.encode()) + (1 if parts else 0)
+        if max_bytes is not None and size > max_bytes:
+            budget_exceeded = True
+            break
+        parts.append(content)
+
+    if base and not budget_exceeded and (last_segments is None or len(parts) < last_segments):
+        size += len(base.encode()) + (1 if parts else 0)
+        if max_bytes is None or size <= max_bytes:
+            parts.append(base)
+    value = "\n".join(reversed(parts))
+    # A session in deferred-commit mode may read its own uncommitted writes,
+    # which can still be rolled back (and their segment seq reused).
+    if full_read and not db.info.get("deferred_commit"):
+        context_cache.put(key, cursor, value)
+    return value, cursor, False
+
+def get_project_context_value(db: Session, key: str, last_segments: int = None, max_bytes: int = None):
+    """
+    Returns the full (or limited, see read_project_context) value of a context key.
+    """
+    value, _, _ = read_project_context(db, key, last_segments=last_segments, max_bytes=max_bytes)
+    return value
+
 def create_or_update_project_context(db: Session, context: schemas.ProjectContextCreate):
+    db_context = set_project_context(db, context)
+    db.commit()
+    db.refresh(db_context)
+    return db_context
+
+def set_project_context(db: Session, context: schemas.ProjectContextCreate):
+    """
+    Creates or replaces the value of a context key, without committing.
+    """
     db_context = get_project_context(db, context.key)
     if db_context:
         db_context.value = context.value
+        db_context.version += 1 # Invalidates cursors handed out so far
     else:
         db_context = models.ProjectContext(**context.model_dump())
         db.add(db_context)
-    db.commit()
-    db.refresh(db_context)
+    # The new value replaces everything appended so far.
+    db.query(models.ProjectContextSegment).filter(
+        models.ProjectContextSegment.key == context.key
+    ).delete(synchronize_session=False)
     return db_context
 
+def add_project_context_segment(db: Session, key: str, content: str):
+    """
+    Appends `content` to a context key as a new segment, without committing.
+    This is a single INSERT; the existing value is never read or rewritten.
+    """
+    db_segment = models.ProjectContextSegment(key=key, content=content)
+    db.add(db_segment)
+    return db_segment
+
 def append_project_context(db: Session, key: str, content_to_append: str):
-    db_context = get_project_context(db, key)
-    if db_context:
-        if db_context.value:
-            db_context.value += "\n" + content_to_append
-        else:
-            db_context.value = content_to_append
-    else:
-        # If key does not exist, create it.
-        db_context = models.ProjectContext(key=key, value=content_to_append)
-        db.add(db_context)
+    db_segment = add_project_context_segment(db, key, content_to_append)
     db.commit()
-    db.refresh(db_context)
-    return db_context
\ No newline at end of file
+    db.refresh(db_segment)
+    return db_segment
\ No newline at end of file
@@ -1,19 +1,109 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import declarative_base, sessionmaker
 
-# For SQLite, the database will be a single file named 'memorybank.db' in the root directory.
-SQLALCHEMY_DATABASE_URL = "sqlite:///./memorybank.db"
+from . import config, instrumentation
 
-# The engine is the entry point to the database.
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+
+_TUNED = config.SQLITE_PROFILE == "tuned"
+# Separate read and write pools would open separate in-memory databases.
+_IN_MEMORY = SQLALCHEMY_DATABASE_URL in ("sqlite://", "sqlite:///:memory:")
+
+
+def sqlite_pragmas(read_only: bool = False):
+    """
+    The PRAGMA statements of the "tuned" SQLite profile.
+    """
+    pragmas = [
+        f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+        # A negative cache_size is in KiB rather than pages.
+        f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def _apply_pragmas_on_connect(engine, read_only: bool = False):
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def _pool_args(read_only: bool):
+    if not _TUNED or _IN_MEMORY:
+        return {}
+    if read_only:
+        return {"pool_size": config.SQLITE_READ_POOL_SIZE, "max_overflow": 0}
+    return {"pool_size": 1, "max_overflow": 0, "pool_timeout": config.SQLITE_WRITE_TIMEOUT_S}
+
+
+def _create_engines(create, url, connect_args):
+    """
+    Returns (write engine, read engine) made with `create`
+    (create_engine or create_async_engine).
+    """
+    write_engine = create(url, connect_args=connect_args, **_pool_args(read_only=False))
+    if not _TUNED:
+        return write_engine, write_engine
+    _apply_pragmas_on_connect(getattr(write_engine, "sync_engine", write_engine))
+    if _IN_MEMORY:
+        return write_engine, write_engine
+    read_engine = create(url, connect_args=connect_args, **_pool_args(read_only=True))
+    _apply_pragmas_on_connect(getattr(read_engine, "sync_engine", read_engine), read_only=True)
+    return write_engine, read_engine
+
+
+# The engine is the entry point to the database. `engine` is used by requests
+# that write; `read_engine` by read-only tools, so in WAL mode they never
+# wait behind a writer.
 # The 'connect_args' is needed only for SQLite to allow multithreaded access.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+engine, read_engine = _create_engines(
+    create_engine, SQLALCHEMY_DATABASE_URL, {"check_same_thread": False}
 )
 
+instrumentation.instrument_engine(engine)
+instrumentation.instrument_engine(read_engine)
+
 # Each instance of the SessionLocal class will be a database session.
 # The class itself is not a session yet, but will create one when instantiated.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# In async mode, requests use the same database through aiosqlite. The sync
+# engine above is still used for table creation and migrations at startup.
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if config.DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine, async_read_engine = _create_engines(
+        create_async_engine,
+        SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+        {}
+    )
+    instrumentation.instrument_engine(async_engine.sync_engine)
+    instrumentation.instrument_engine(async_read_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False)
+
+def begin_transaction(db, immediate: bool = True):
+    """
+    Explicitly starts the session's database transaction; IMMEDIATE takes
+    the write lock up front. pysqlite only emits BEGIN before DML, so without
+    this a SAVEPOINT would open its own transaction and RELEASE would commit.
+    """
+    db.connection().exec_driver_sql("BEGIN IMMEDIATE" if immediate else "BEGIN")
 
 # We will inherit from this class to create each of the ORM models.
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
@@ -0,0 +1,170 @@
+"""
+In-process event bus for task state changes.
+
+Services record events on their session with `queue_event`; they are only
+published once the session commits (and dropped on rollback), so
+subscribers never see a change that did not happen. Subscribers are asyncio
+queues: waitForReadyTask sleeps on one until a task becomes ready, and the
+/events/tasks endpoint streams them as Server-Sent Events.
+
+The bus only sees commits made by this process. With several workers, a
+waiter may miss a change made by another worker and only notice it at its
+timeout, so waiters always re-check the database.
+"""
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import schemas
+
+# Event types
+CREATED = "created"
+STARTED = "started"
+FINISHED = "finished"
+STATUS_UPDATED = "status_updated"
+# A task is PENDING with all its dependencies completed
+READY = "ready"
+
+_PENDING_KEY = "pending_events"
+# Seconds between SSE comments that keep idle connections open
+SSE_KEEPALIVE_S = 15
+
+
+class Subscription:
+    def __init__(self, max_queued: int):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queued)
+        # Events lost because the subscriber did not keep up
+        self.dropped = 0
+
+    def _deliver(self, task_event: schemas.TaskEvent):
+        try:
+            self.queue.put_nowait(task_event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout: float = None):
+        """
+        Returns the next event, or None if none arrives within `timeout`
+        seconds.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def wait_for(self, event_type: str, timeout: float) -> bool:
+        """
+        Waits up to `timeout` seconds for an event of `event_type`. Also
+        returns True if events were dropped, since one of them may have been
+        the awaited one.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not self.dropped:
+            task_event = await self.get(deadline - loop.time())
+            if task_event is None:
+                return False
+            if task_event.event == event_type:
+                return True
+        return True
+
+
+class EventBus:
+    def __init__(self, max_queued: int = 1000):
+        self.max_queued = max_queued
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self):
+        """
+        Registers a subscription on the running event loop for the duration
+        of the `with` block.
+        """
+        subscription = Subscription(self.max_queued)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions.discard(subscription)
+
+    def publish(self, events):
+        """
+        Delivers `events` to every subscriber. Safe to call from any thread.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            for task_event in events:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription._deliver, task_event)
+                except RuntimeError:
+                    # The subscriber's event loop has been closed.
+                    break
+
+
+bus = EventBus()
+
+
+async def sse_stream(event_bus: EventBus, keepalive: float = SSE_KEEPALIVE_S):
+    """
+    Yields the events published on `event_bus` as Server-Sent Events. If the
+    client falls behind, a `lagged` event reports how many events it missed.
+    """
+    with event_bus.subscribe() as subscription:
+        yield ": connected\n\n"
+        while True:
+            task_event = await subscription.get(keepalive)
+            if subscription.dropped:
+                yield f"event: lagged\ndata: {json.dumps({'dropped': subscription.dropped})}\n\n"
+                subscription.dropped = 0
+            if task_event is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"event: {task_event.event}\ndata: {task_event.model_dump_json()}\n\n"
+
+
+def queue_event(db: Session, event_type: str, task_id: str, status: str = None):
+    """
+    Records an event to be published when `db` commits.
+    """
+    db.info.setdefault(_PENDING_KEY, []).append(
+        schemas.TaskEvent(event=event_type, task_id=task_id, status=status)
+    )
+
+
+def pending_count(db: Session) -> int:
+    return len(db.info.get(_PENDING_KEY, ()))
+
+
+def discard_since(db: Session, count: int):
+    """
+    Drops the events queued after the first `count`, e.g. those of a call
+    rolled back to its SAVEPOINT.
+    """
+    del db.info.get(_PENDING_KEY, [])[count:]
+
+
+# Both hooks also fire when a SAVEPOINT is released or rolled back; only the
+# outermost transaction decides whether the events happened.
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(db):
+    if db.in_nested_transaction():
+        return
+    events = db.info.pop(_PENDING_KEY, None)
+    if events:
+        bus.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(db):
+    if db.in_nested_transaction():
+        return
+    db.info.pop(_PENDING_KEY, None)
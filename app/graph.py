@@ -0,0 +1,149 @@
+"""
+Analysis of the dependency graph around one task, for getTaskGraph.
+
+crud.get_task_graph_rows walks the ancestors and the descendants of the task
+with one recursive CTE each; the functions here turn those rows into
+distances, the critical path and the ready frontier with a few linear passes
+over the subgraph. Nothing is cached, so the result always reflects committed
+writes, including those of other workers. Instead, each walk stops after the
+nearest `max_tasks` tasks, which bounds the cost on large graphs; everything
+is then computed over the tasks walked.
+"""
+from collections import deque
+
+
+class Subgraph:
+    """
+    The tasks reached from one task in one direction, with their
+    dependencies and the edges to follow from each task.
+    """
+
+    def __init__(self, rows, direction: str):
+        # task_id -> (status, unmet_dependencies, priority, created_at)
+        self.tasks = tasks = {}
+        self.dependencies = dependencies = {}
+        for task_id, status, unmet_dependencies, priority, created_at, depends_on_id in rows:
+            if task_id not in tasks:
+                tasks[task_id] = (status, unmet_dependencies, priority, created_at)
+                dependencies[task_id] = []
+            if depends_on_id is not None:
+                dependencies[task_id].append(depends_on_id)
+        # Dependents, leaving out descendants' dependencies outside the subgraph
+        dependents = {}
+        for task_id, depends_on_ids in dependencies.items():
+            for depends_on_id in depends_on_ids:
+                if depends_on_id in tasks:
+                    dependents.setdefault(depends_on_id, []).append(task_id)
+        for task_ids in dependents.values():
+            if len(task_ids) > 1:
+                task_ids.sort()
+        # Dependencies outside the subgraph (of descendants, or beyond a
+        # truncated walk) are not followed.
+        walked_dependencies = {
+            task_id: [depends_on_id for depends_on_id in depends_on_ids if depends_on_id in tasks]
+            for task_id, depends_on_ids in dependencies.items()
+        }
+        if direction == "ancestors":
+            self.next_ids, self.previous_ids = walked_dependencies, dependents
+        else:
+            self.next_ids, self.previous_ids = dependents, walked_dependencies
+
+    def distances(self, start: str):
+        """
+        Returns {task_id: number of edges from `start`} (breadth-first).
+        """
+        next_ids = self.next_ids
+        distances = {start: 0}
+        queue = deque([start])
+        while queue:
+            task_id = queue.popleft()
+            distance = distances[task_id] + 1
+            for next_id in next_ids.get(task_id, ()):
+                if next_id not in distances:
+                    distances[next_id] = distance
+                    queue.append(next_id)
+        return distances
+
+    def longest_chain(self, start: str):
+        """
+        Returns the chain of task IDs from `start` that contains the most
+        unfinished (not COMPLETED) tasks.
+
+        Tasks are scored from the far end of the subgraph inwards, each once
+        all the tasks it leads to are scored (Kahn's algorithm), so chains of
+        any length need no recursion. Tasks on other dependency cycles are
+        never scored and are left out.
+        """
+        tasks, next_ids, previous_ids = self.tasks, self.next_ids, self.previous_ids
+        # Edges back to `start` close a cycle through it and are ignored.
+        remaining = {
+            task_id: sum(next_id != start for next_id in next_ids.get(task_id, ())) for task_id in tasks
+        }
+        queue = [task_id for task_id, count in remaining.items() if count == 0]
+        # task_id -> (unfinished tasks on the best chain from it, next task on it)
+        best = {}
+        while start not in best:
+            for task_id in queue:
+                length, following = 0, None
+                for next_id in next_ids.get(task_id, ()):
+                    scored = best.get(next_id)
+                    if scored is not None and scored[0] > length:
+                        length, following = scored[0], next_id
+                best[task_id] = (length + (tasks[task_id][0] != "COMPLETED"), following)
+                if task_id == start:
+                    break
+                for previous_id in previous_ids.get(task_id, ()):
+                    remaining[previous_id] -= 1
+                    if remaining[previous_id] == 0 and previous_id not in best:
+                        queue.append(previous_id)
+            # Only reached again if `start` leads to a cycle; score it from the
+            # tasks scored so far.
+            queue = [start]
+        chain = [start]
+        while best[chain[-1]][1] is not None:
+            chain.append(best[chain[-1]][1])
+        return chain
+
+    def is_ready(self, task_id: str) -> bool:
+        status, unmet_dependencies, _, _ = self.tasks[task_id]
+        return status == "PENDING" and unmet_dependencies == 0
+
+
+def walk(rows, direction: str, start: str, max_tasks: int):
+    """
+    Builds the Subgraph of `start` from rows of a walk that went up to one
+    task past `max_tasks`. Returns (subgraph, truncated): if the walk found
+    more than `max_tasks` tasks, the farthest one is left out and truncated
+    is True.
+    """
+    subgraph = Subgraph(rows, direction)
+    if len(subgraph.tasks) - 1 <= max_tasks:
+        return subgraph, False
+    distances = subgraph.distances(start)
+    farthest = max(distances, key=lambda task_id: (distances[task_id], task_id))
+    return Subgraph([row for row in rows if row[0] != farthest], direction), True
+
+
+def critical_path(task_id: str, ancestors: Subgraph, descendants: Subgraph):
+    """
+    Returns the unfinished tasks on the longest chain of dependencies that
+    runs through `task_id`, in the order they have to be done.
+    """
+    chain = ancestors.longest_chain(task_id)[::-1] + descendants.longest_chain(task_id)[1:]
+    return [
+        chain_id for chain_id in chain
+        if (ancestors.tasks.get(chain_id) or descendants.tasks[chain_id])[0] != "COMPLETED"
+    ]
+
+
+def ready_frontier(ancestors: Subgraph, descendants: Subgraph):
+    """
+    Returns the ready tasks of both subgraphs in ready queue order (priority
+    first, then age).
+    """
+    ready = {}
+    for subgraph in (ancestors, descendants):
+        for task_id, (_, _, priority, created_at) in subgraph.tasks.items():
+            if subgraph.is_ready(task_id):
+                ready[task_id] = (-priority, created_at, task_id)
+    return sorted(ready, key=ready.get)
@@ -0,0 +1,146 @@
+"""
+Group commit for transactional tool calls.
+
+With MEMORYBANK_GROUP_COMMIT enabled, transactional tools are not committed
+by the request that runs them. They are queued to a single writer thread,
+which collects calls for up to MEMORYBANK_GROUP_COMMIT_WINDOW_MS (or until
+MEMORYBANK_GROUP_COMMIT_MAX_BATCH calls are queued) and applies the batch in
+one database transaction, so many agent actions share one commit/fsync.
+
+Each call runs in its own SAVEPOINT: a call that raises is rolled back on
+its own and gets its exception, while the other calls in the batch still
+commit. A caller's result is only handed back once the batch has committed.
+"""
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from . import config, events
+from .database import SessionLocal, begin_transaction
+
+_STOP = object()
+
+
+class GroupCommitWriter:
+    def __init__(self, session_factory, window_ms: float = 2.0, max_batch: int = 8):
+        self.session_factory = session_factory
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.calls = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Queues `fn(session, *args, **kwargs)` and returns a Future that
+        resolves once the batch containing it has committed.
+        """
+        self.start()
+        future = Future()
+        # Run `fn` in the caller's context, e.g. so its statements count
+        # towards the caller's request (see app/instrumentation.py).
+        context = contextvars.copy_context()
+        self._queue.put((context, fn, args, kwargs, future))
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        Calls submitted but not yet picked up by the writer thread.
+        """
+        return self._queue.qsize()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """
+        Applies everything queued so far, then stops the writer thread.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._apply(batch)
+            if stopping:
+                return
+
+    def _apply(self, batch):
+        outcomes = []
+        db = self.session_factory()
+        db.info["deferred_commit"] = True
+        try:
+            # Take the write lock up front; the SAVEPOINTs below then nest
+            # inside this one transaction.
+            begin_transaction(db)
+            for context, fn, args, kwargs, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                queued_events = events.pending_count(db)
+                try:
+                    with db.begin_nested():
+                        outcomes.append((future, context.run(fn, db, *args, **kwargs), None))
+                except Exception as e:
+                    events.discard_since(db, queued_events)
+                    outcomes.append((future, None, e))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            db.close()
+
+        self.batches += 1
+        self.calls += len(outcomes)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+def create_writer():
+    """
+    Returns the writer configured by MEMORYBANK_GROUP_COMMIT*, or None if
+    group commit is disabled.
+    """
+    if not config.GROUP_COMMIT:
+        return None
+    return GroupCommitWriter(
+        SessionLocal,
+        window_ms=config.GROUP_COMMIT_WINDOW_MS,
+        max_batch=config.GROUP_COMMIT_MAX_BATCH,
+    )
@@ -0,0 +1,186 @@
+"""
+SQL statement counting and timing.
+
+`instrument_engine` hooks an engine's cursor events. Every statement is
+timed and recorded:
+- in the stats of the current request (see QueryStatsMiddleware, which
+  reports them in the X-Query-Count and X-Query-Time-Ms response headers),
+- in `slow_queries`, the slowest statements seen since startup (served by
+  /debug/queries),
+- in any active `capture()`, used by the `query_budget` test fixture.
+
+The current request is tracked with a ContextVar, which FastAPI's
+threadpool, AsyncSession.run_sync and the group-commit writer all carry
+over to the code that runs the statements.
+"""
+import heapq
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from . import config
+
+_STATEMENT_PREVIEW = 500
+
+
+class QueryStats:
+    def __init__(self, label: str = None, keep_statements: bool = False):
+        self.label = label
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = [] if keep_statements else None
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, elapsed_ms: float):
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if self.statements is not None:
+                self.statements.append((statement, elapsed_ms))
+
+
+class SlowQueryLog:
+    """
+    Keeps the `max_entries` slowest statements and overall totals.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total_ms = 0.0
+            # Min-heap on duration, so the fastest kept entry is replaced first
+            self._slowest = []
+            self._sequence = 0
+
+    def record(self, statement: str, elapsed_ms: float, label: str = None):
+        with self._lock:
+            self.count += 1
+            self.total_ms += elapsed_ms
+            if self.max_entries <= 0:
+                return
+            if len(self._slowest) >= self.max_entries and elapsed_ms <= self._slowest[0][0]:
+                return
+            self._sequence += 1
+            entry = (elapsed_ms, self._sequence, statement[:_STATEMENT_PREVIEW], label)
+            if len(self._slowest) < self.max_entries:
+                heapq.heappush(self._slowest, entry)
+            else:
+                heapq.heapreplace(self._slowest, entry)
+
+    def snapshot(self):
+        with self._lock:
+            slowest = sorted(self._slowest, reverse=True)
+            return {
+                "queries": self.count,
+                "total_ms": round(self.total_ms, 3),
+                "slowest": [
+                    {"ms": round(elapsed_ms, 3), "statement": statement, "request": label}
+                    for elapsed_ms, _, statement, label in slowest
+                ],
+            }
+
+
+slow_queries = SlowQueryLog(config.SQL_SLOW_LOG_SIZE)
+_current_request: ContextVar = ContextVar("memorybank_query_stats", default=None)
+_captures = set()
+_captures_lock = threading.Lock()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_times"].pop()) * 1000
+    stats = _current_request.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+    slow_queries.record(statement, elapsed_ms, stats.label if stats is not None else None)
+    if _captures:
+        with _captures_lock:
+            captures = list(_captures)
+        for capture_stats in captures:
+            capture_stats.record(statement, elapsed_ms)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute.
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_times"):
+        connection.info["query_start_times"].pop()
+
+
+def instrument_engine(engine):
+    """
+    Counts and times the statements run on `engine` (a sync Engine; pass
+    `sync_engine` for an AsyncEngine).
+    """
+    if not config.SQL_STATS:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_request(label: str = None):
+    """
+    Attributes the statements run in this context to a new QueryStats.
+    """
+    stats = QueryStats(label)
+    token = _current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_request.reset(token)
+
+
+@contextmanager
+def capture():
+    """
+    Records every statement run on an instrumented engine, from any thread,
+    while the block runs.
+    """
+    stats = QueryStats(keep_statements=True)
+    with _captures_lock:
+        _captures.add(stats)
+    try:
+        yield stats
+    finally:
+        with _captures_lock:
+            _captures.discard(stats)
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware that tracks the statements of each HTTP request and adds
+    X-Query-Count and X-Query-Time-Ms to its response. For streaming
+    responses they only cover the statements run before the body started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.SQL_STATS:
+            await self.app(scope, receive, send)
+            return
+
+        with track_request(f"{scope['method']} {scope['path']}") as stats:
+            async def send_with_stats(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(stats.count).encode()))
+                    headers.append((b"x-query-time-ms", f"{stats.total_ms:.3f}".encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
@@ -0,0 +1,73 @@
+"""
+Sweeper for expired task leases.
+
+Starting or claiming a task leases it for MEMORYBANK_TASK_LEASE_S seconds,
+and the agent working on it extends the lease with heartbeatTask. If the
+agent stops (e.g. it crashed), the lease runs out and the sweeper returns the
+task to PENDING with a LEASE_EXPIRED journal entry, so another agent can pick
+it up and its dependents are not blocked forever. Leases are off unless
+MEMORYBANK_TASK_LEASE_S is set; only enable them for clients that heartbeat.
+
+Every server worker runs its own sweeper. Each sweep is a single
+UPDATE ... RETURNING (see crud.expire_leases), so concurrent sweeps from
+several workers never expire the same task twice.
+"""
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from . import config, services
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseSweeper:
+    def __init__(self, session_factory, interval_s: float = 10.0, batch_size: int = 500):
+        self.session_factory = session_factory
+        self.interval = interval_s
+        self.batch_size = batch_size
+        self.expired = 0
+
+    def sweep(self) -> int:
+        """
+        Expires every lease that has run out, `batch_size` tasks per
+        transaction. Returns the number of tasks expired.
+        """
+        total = 0
+        while True:
+            db = self.session_factory()
+            try:
+                expired = services.expire_leases(db, limit=self.batch_size)
+            finally:
+                db.close()
+            total += len(expired)
+            if len(expired) < self.batch_size:
+                break
+        self.expired += total
+        return total
+
+    async def run_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.sweep)
+            except Exception:
+                # e.g. the database is locked for longer than busy_timeout;
+                # the next sweep picks the leases up.
+                logger.exception("Lease sweep failed")
+
+
+def create_sweeper():
+    """
+    Returns the sweeper configured by MEMORYBANK_TASK_LEASE_S and
+    MEMORYBANK_LEASE_SWEEP_*, or None if leases are disabled.
+    """
+    if config.TASK_LEASE_S <= 0 or config.LEASE_SWEEP_INTERVAL_S <= 0:
+        return None
+    return LeaseSweeper(
+        SessionLocal,
+        interval_s=config.LEASE_SWEEP_INTERVAL_S,
+        batch_size=config.LEASE_SWEEP_BATCH,
+    )
\ No newline at end of file
@@ -1,32 +1,94 @@
-import json
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+import tempfile
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi_mcp.server import FastApiMCP
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
 
-from . import crud, models, schemas, services
-from .database import SessionLocal, engine
+from . import config, crud, events, group_commit, instrumentation, leases, metrics, migrations, models, retention, schemas, tools, transfer
+from .aio import AnySession, run_db
+from .cache import context_cache
+from .database import AsyncReadSessionLocal, AsyncSessionLocal, ReadSessionLocal, SessionLocal, engine
 
 # Create all database tables based on the models
 models.Base.metadata.create_all(bind=engine)
+# Bring databases created by older versions up to date
+migrations.run_migrations(engine)
+
+# Shared writer for transactional tools when group commit is enabled
+writer = group_commit.create_writer()
+# Returns tasks whose lease expired to PENDING, unless leases are disabled
+sweeper = leases.create_sweeper()
+# Moves old journal entries to the archive, unless journal retention is disabled
+compactor = retention.create_compactor()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper_task = asyncio.create_task(sweeper.run_forever()) if sweeper is not None else None
+    compactor_task = asyncio.create_task(compactor.run_forever()) if compactor is not None else None
+    yield
+    if sweeper_task is not None:
+        sweeper_task.cancel()
+    if compactor_task is not None:
+        compactor_task.cancel()
+    if writer is not None:
+        writer.stop()
 
 app = FastAPI(
     title="MemoryBank-MCP-Server",
     description="A centralized, transactional context management service for AI agents.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+# Statement count and time per request, as X-Query-Count / X-Query-Time-Ms
+app.add_middleware(instrumentation.QueryStatsMiddleware)
+# Latency, request and error metrics per tool, served by /metrics
+app.add_middleware(metrics.ToolMetricsMiddleware)
+
 # Initialize FastAPI MCP server
 mcp = FastApiMCP(app)
 
 # Dependency to get a DB session for each request
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+get_db = get_async_db if config.DB_MODE == "async" else get_sync_db
+
+# Dependency for read-only tools: a session on the read connection pool
+def get_sync_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+get_read_db = get_async_read_db if config.DB_MODE == "async" else get_sync_read_db
+
+async def run_write(db: AnySession, fn, *args):
+    """
+    Runs a transactional tool: through the group-commit writer if enabled,
+    otherwise in its own transaction on the request's session.
+    """
+    if writer is not None:
+        return await writer.run(fn, *args)
+    return await run_db(db, fn, *args)
+
 # ==============================================================================
 # MCP TOOLS IMPLEMENTATION (API ENDPOINTS)
 # ==============================================================================
@@ -36,171 +98,291 @@ def get_db():
 # -------------------
 
 @app.post("/tools/createTaskChain", response_model=List[schemas.Task], tags=["Orchestrator-Architect Tools"], operation_id="createTaskChain")
-def create_task_chain(payload: schemas.TaskChainCreate, db: Session = Depends(get_db)):
+async def create_task_chain(payload: schemas.TaskChainCreate, db: AnySession = Depends(get_db)):
     """
     Creates one or more tasks with dependencies in a single transaction.
+    The whole chain is rejected if a task ID already exists, a dependency is
+    unknown or the dependencies form a cycle.
     """
-    created_tasks = []
-    # Although crud.create_task commits one by one, for this initial version,
-    # we will handle it this way. A more robust implementation might wrap this
-    # entire loop in a single transaction in the service layer.
-    for task_data in payload.tasks:
-        # Check for duplicate task_id
-        db_task = crud.get_task(db, task_id=task_data.task_id)
-        if db_task:
-            raise HTTPException(status_code=400, detail=f"Task with ID '{task_data.task_id}' already exists.")
-        created_task = crud.create_task(db=db, task=task_data)
-        created_tasks.append(created_task)
-
-    # Parse dependencies from JSON string to list for the response model
-    for task in created_tasks:
-        if task.dependencies:
-            try:
-                task.dependencies = json.loads(task.dependencies)
-            except json.JSONDecodeError:
-                task.dependencies = [] # Handle malformed JSON
-        else:
-            task.dependencies = []
-            
-    return created_tasks
+    return await run_db(db, tools.create_task_chain, payload)
 
 @app.post("/tools/getNextReadyTask", response_model=Optional[schemas.NextReadyTask], tags=["Orchestrator-Architect Tools"], operation_id="getNextReadyTask")
-def get_next_ready_task(db: Session = Depends(get_db)):
+async def get_next_ready_task(payload: Optional[schemas.ReadyTaskQuery] = None, db: AnySession = Depends(get_read_db)):
+    """
+    Gets the next task that is PENDING and has all its dependencies COMPLETED,
+    optionally only among those for `assignee_role`: the highest `priority`
+    one, oldest first among equals. Returns null if no task is ready.
+    """
+    return await run_db(db, tools.get_next_ready_task, payload or schemas.ReadyTaskQuery())
+
+@app.post("/tools/waitForReadyTask", response_model=Optional[schemas.NextReadyTask], tags=["Orchestrator-Architect Tools"], operation_id="waitForReadyTask")
+async def wait_for_ready_task(payload: schemas.WaitForReadyTaskPayload, db: AnySession = Depends(get_read_db)):
     """
-    Gets the next task that is PENDING and has all its dependencies COMPLETED.
-    Returns null if no task is ready.
+    Like getNextReadyTask (optionally only for `assignee_role`), but if no
+    task is ready, waits up to `timeout` seconds for one to become ready
+    instead of returning null straight away.
+    The database is only queried again when a task becomes ready, so idle
+    waiters put no load on it.
     """
-    db_task = crud.get_next_ready_task(db)
-    return db_task
+    with events.bus.subscribe() as subscription:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + payload.timeout
+        while True:
+            task = await run_db(db, tools.poll_ready_task, payload.assignee_role)
+            remaining = deadline - loop.time()
+            if task is not None or remaining <= 0:
+                return task
+            if not await subscription.wait_for(events.READY, remaining):
+                return None
 
 # -------------------
 # General Agent Tools
 # -------------------
 
 @app.post("/tools/getTaskDetails", response_model=schemas.Task, tags=["General Agent Tools"], operation_id="getTaskDetails")
-def get_task_details(payload: schemas.TaskIdPayload, db: Session = Depends(get_db)):
+async def get_task_details(payload: schemas.TaskIdPayload, db: AnySession = Depends(get_read_db)):
     """
     Gets the full details for a specified task.
     """
-    db_task = crud.get_task(db, task_id=payload.task_id)
-    if db_task is None:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    # The dependencies are stored as a JSON string, so we parse it back to a list
-    # for the response model.
-    if db_task.dependencies:
-        try:
-            db_task.dependencies = json.loads(db_task.dependencies)
-        except json.JSONDecodeError:
-            db_task.dependencies = [] # Handle malformed JSON
-    else:
-        db_task.dependencies = []
-        
-    return db_task
+    return await run_db(db, tools.get_task_details, payload)
+
+@app.post("/tools/getTaskJournal", response_model=schemas.TaskJournalPage, tags=["General Agent Tools"], operation_id="getTaskJournal")
+async def get_task_journal(payload: schemas.TaskJournalQuery, db: AnySession = Depends(get_read_db)):
+    """
+    Gets a task's journal entries, newest first, one page of `limit` at a
+    time. Pass `next_before_id` as `before_id` to get the next page.
+    """
+    return await run_db(db, tools.get_task_journal, payload)
+
+@app.post("/tools/getInconsistentTasks", response_model=schemas.InconsistentTaskList, tags=["General Agent Tools"], operation_id="getInconsistentTasks")
+async def get_inconsistent_tasks(payload: Optional[schemas.InconsistentTasksQuery] = None, db: AnySession = Depends(get_read_db)):
+    """
+    Lists tasks whose status disagrees with their last journal event:
+    RUNNING without a last STARTING event, COMPLETED without a last FINISHED
+    event, or PENDING with any event other than LEASE_EXPIRED. One page of `limit` at a time; pass
+    `next_after_task_id` as `after_task_id` to get the next page.
+    """
+    return await run_db(db, tools.get_inconsistent_tasks, payload or schemas.InconsistentTasksQuery())
+
+@app.post("/tools/listTasks", response_model=schemas.TaskList, tags=["General Agent Tools"], operation_id="listTasks")
+async def list_tasks(payload: Optional[schemas.ListTasksQuery] = None, db: AnySession = Depends(get_read_db)):
+    """
+    Lists tasks by last update, most recent first (or oldest first with
+    `order: "asc"`), optionally filtered by status, type, assignee_role and
+    `updated_since`. One page of `limit` at a time; pass `next_cursor` as
+    `cursor` to get the next page. `fields` selects what is returned besides
+    task_id and updated_at, e.g. to skip `details`.
+    """
+    return await run_db(db, tools.list_tasks, payload or schemas.ListTasksQuery())
+
+@app.post("/tools/getTaskGraph", response_model=schemas.TaskGraph, tags=["General Agent Tools"], operation_id="getTaskGraph")
+async def get_task_graph(payload: schemas.TaskGraphQuery, db: AnySession = Depends(get_read_db)):
+    """
+    Gets the dependency graph around a task in one call: the tasks it
+    transitively depends on (what blocks it) and the tasks that transitively
+    depend on it (what it unblocks), each with its distance and
+    dependencies; the unfinished tasks on the longest dependency chain
+    through it (critical path); and the tasks among them that are ready now.
+    Each direction is walked nearest first up to `max_tasks` tasks, which
+    keeps the call fast on large graphs.
+    """
+    return await run_db(db, tools.get_task_graph, payload)
+
+@app.post("/tools/searchMemory", response_model=schemas.SearchResults, tags=["General Agent Tools"], operation_id="searchMemory")
+async def search_memory(payload: schemas.SearchMemoryQuery, db: AnySession = Depends(get_read_db)):
+    """
+    Full-text search over task descriptions and details ("task") and the
+    system patterns and active context ("context"). Returns the best
+    `limit` matches with a short snippet each, so earlier related work can
+    be found without reading whole contexts. Matches any of the words in
+    `query`, ranking rows that match more of them (and rarer ones) higher.
+    """
+    return await run_db(db, tools.search_memory, payload)
 
 # -------------------
 # Transactional Tools (for Developer)
 # -------------------
 
 @app.post("/tools/startWorkOnTask", response_model=schemas.Task, tags=["Transactional Tools"], operation_id="startWorkOnTask")
-def start_work_on_task(payload: schemas.TaskIdPayload, db: Session = Depends(get_db)):
+async def start_work_on_task(payload: schemas.TaskIdPayload, db: AnySession = Depends(get_db)):
     """
     Atomically declares that work is starting on a task.
-    - Updates task status to 'RUNNING'.
+    - Updates task status to 'RUNNING' and leases it (see heartbeatTask).
     - Creates a 'STARTING' journal entry.
     """
-    task = services.start_work_on_task(db, task_id=payload.task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if task.dependencies:
-        try:
-            task.dependencies = json.loads(task.dependencies)
-        except json.JSONDecodeError:
-            task.dependencies = []
-    else:
-        task.dependencies = []
-    return task
+    return await run_write(db, tools.start_work_on_task, payload)
 
-@app.post("/tools/finishWorkOnTask", response_model=schemas.Task, tags=["Transactional Tools"], operation_id="finishWorkOnTask")
-def finish_work_on_task(payload: schemas.TaskIdPayload, db: Session = Depends(get_db)):
+@app.post("/tools/finishWorkOnTask", response_model=schemas.FinishedTask, tags=["Transactional Tools"], operation_id="finishWorkOnTask")
+async def finish_work_on_task(payload: schemas.TaskIdPayload, db: AnySession = Depends(get_db)):
     """
     Atomically declares that work is finished on a task.
     - Updates task status to 'COMPLETED'.
     - Creates a 'FINISHED' journal entry.
+    Returns the task with `unblocked_task_ids`: the dependents that became
+    ready, so they can be dispatched without polling getNextReadyTask.
+    Fails with 409 if the task's lease expired and it was not started again.
     """
-    task = services.finish_work_on_task(db, task_id=payload.task_id)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if task.dependencies:
-        try:
-            task.dependencies = json.loads(task.dependencies)
-        except json.JSONDecodeError:
-            task.dependencies = []
-    else:
-        task.dependencies = []
-    return task
+    return await run_write(db, tools.finish_work_on_task, payload)
+
+@app.post("/tools/claimNextReadyTask", response_model=List[schemas.Task], tags=["Transactional Tools"], operation_id="claimNextReadyTask")
+async def claim_next_ready_task(payload: schemas.ClaimTasksPayload, db: AnySession = Depends(get_db)):
+    """
+    Atomically claims up to `max_tasks` ready tasks, optionally only those for
+    `assignee_role`.
+    - Updates each task status to 'RUNNING' and leases it.
+    - Creates a 'STARTING' journal entry for each task.
+    Concurrent callers never receive the same task. Returns an empty list if
+    no task is ready.
+    """
+    return await run_write(db, tools.claim_next_ready_task, payload)
+
+@app.post("/tools/heartbeatTask", response_model=schemas.TaskLease, tags=["Transactional Tools"], operation_id="heartbeatTask")
+async def heartbeat_task(payload: schemas.TaskIdPayload, db: AnySession = Depends(get_db)):
+    """
+    Extends the lease of a RUNNING task by MEMORYBANK_TASK_LEASE_S seconds.
+    Call it periodically while working on a started or claimed task: when
+    the lease runs out the task goes back to 'PENDING' for another agent.
+    Fails with 409 if the task is no longer RUNNING.
+    """
+    return await run_write(db, tools.heartbeat_task, payload)
 
 # -------------------
 # Context Tools (for Guardian/Developer)
 # -------------------
 
 @app.post("/tools/getSystemPatterns", response_model=schemas.SystemPatterns, tags=["Context Tools"], operation_id="getSystemPatterns")
-def get_system_patterns(db: Session = Depends(get_db)):
+async def get_system_patterns(payload: Optional[schemas.SystemPatternsQuery] = None, db: AnySession = Depends(get_read_db)):
     """
     Gets the system coding patterns.
+    Pass the `etag` of an earlier response as `if_none_match` to get
+    `not_modified: true` and no patterns if they have not changed.
     """
-    context = crud.get_project_context(db, key="system_patterns")
-    if not context or not context.value:
-        return schemas.SystemPatterns(patterns="")
-    return schemas.SystemPatterns(patterns=context.value)
+    return await run_db(db, tools.get_system_patterns, payload or schemas.SystemPatternsQuery())
 
-@app.post("/tools/getActiveContext", response_model=schemas.ActiveContext, tags=["Context Tools"], operation_id="getActiveContext")
-def get_active_context(db: Session = Depends(get_db)):
+@app.post("/tools/getActiveContext", response_model=schemas.ActiveContextRead, tags=["Context Tools"], operation_id="getActiveContext")
+async def get_active_context(payload: Optional[schemas.ActiveContextQuery] = None, db: AnySession = Depends(get_read_db)):
     """
     Gets the active context, such as failure reports.
+    Pass the `cursor` of an earlier response as `since` to get only what was
+    appended after it (or `not_modified: true`). Optionally limited to the
+    newest `last_segments` appended messages or to at most `max_bytes` bytes.
     """
-    context = crud.get_project_context(db, key="active_context")
-    if not context or not context.value:
-        return schemas.ActiveContext(context="")
-    return schemas.ActiveContext(context=context.value)
+    return await run_db(db, tools.get_active_context, payload or schemas.ActiveContextQuery())
 
 @app.post("/tools/updateTaskStatus", response_model=schemas.Task, tags=["General Agent Tools"], operation_id="updateTaskStatus")
-def update_task_status(payload: schemas.TaskStatusUpdate, db: Session = Depends(get_db)):
+async def update_task_status(payload: schemas.TaskStatusUpdate, db: AnySession = Depends(get_db)):
     """
     Updates the status of a task.
     If a context_message is provided, it's appended to the active_context.
+    Fails with 409 for RUNNING or COMPLETED if the task's lease expired and
+    it was not started again; other statuses (e.g. CANCELLED) are accepted.
     """
-    task = services.update_task_status(
-        db,
-        task_id=payload.task_id,
-        status=payload.status,
-        context_message=payload.context_message
-    )
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if task.dependencies:
-        try:
-            task.dependencies = json.loads(task.dependencies)
-        except json.JSONDecodeError:
-            task.dependencies = []
-    else:
-        task.dependencies = []
-    return task
+    return await run_write(db, tools.update_task_status, payload)
 
 @app.post("/tools/updateSystemPatterns", response_model=schemas.ProjectContext, tags=["Context Tools"], operation_id="updateSystemPatterns")
-def update_system_patterns(payload: schemas.SystemPatternsUpdate, db: Session = Depends(get_db)):
+async def update_system_patterns(payload: schemas.SystemPatternsUpdate, db: AnySession = Depends(get_db)):
     """
     Updates or creates the system coding patterns.
     """
-    context_to_update = schemas.ProjectContextCreate(key="system_patterns", value=payload.patterns)
-    return crud.create_or_update_project_context(db=db, context=context_to_update)
+    return await run_db(db, tools.update_system_patterns, payload)
+
+@app.post("/tools/appendActiveContext", response_model=schemas.ContextSegment, tags=["Context Tools"], operation_id="appendActiveContext")
+async def append_active_context(payload: schemas.ActiveContext, db: AnySession = Depends(get_db)):
+    """
+    Appends a message to the active context as a new segment and returns it.
+    """
+    return await run_write(db, tools.append_active_context, payload)
+
+# -------------------
+# Batch
+# -------------------
+
+@app.post("/tools/batch", response_model=schemas.BatchResponse, tags=["General Agent Tools"], operation_id="batch")
+async def batch(payload: schemas.BatchRequest, db: AnySession = Depends(get_db)):
+    """
+    Runs an ordered list of tool calls (`tool` is the operation_id, e.g.
+    startWorkOnTask, and `arguments` its usual payload) in one request and
+    one transaction, and returns a result or error for each call.
+    - `atomic: true`: all calls commit together; the first failure rolls
+      back the whole batch and the remaining calls are not run.
+    - `atomic: false` (default): each call commits or rolls back on its own.
+    """
+    return await run_db(db, tools.batch, payload)
+
+# -------------------
+# Event stream (not an MCP tool)
+# -------------------
+
+@app.get("/events/tasks", include_in_schema=False)
+async def task_events():
+    """
+    Server-Sent Events stream of task state changes: created, started,
+    finished, status_updated and ready. Each event's data is a TaskEvent.
+    """
+    return StreamingResponse(events.sse_stream(events.bus), media_type="text/event-stream")
+
+# -------------------
+# Bulk export / import (not MCP tools)
+# -------------------
+
+# The transfers always use sync sessions, which stream rows as SQLite steps
+# through a statement, in the threadpool.
+@app.get("/export", include_in_schema=False)
+async def export_memory_bank(db: Session = Depends(get_sync_read_db)):
+    """
+    The whole memory bank as NDJSON (see app/transfer.py), streamed from a
+    single read transaction.
+    """
+    return StreamingResponse(transfer.export_lines(db), media_type="application/x-ndjson")
+
+@app.post("/import", include_in_schema=False, response_model=Dict[str, int])
+async def import_memory_bank(request: Request, db: Session = Depends(get_sync_db)):
+    """
+    Loads an NDJSON export, sent as the request body, into an empty memory
+    bank. Returns the number of rows imported per table.
+    """
+    # The body is received in full before the import takes the write lock,
+    # so a slow upload does not hold up the other writers. Up to
+    # transfer.SPOOL_BYTES of it are kept in memory, the rest in a temp file.
+    with tempfile.SpooledTemporaryFile(max_size=transfer.SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            await run_in_threadpool(spool.write, chunk)
+        spool.seek(0)
+        try:
+            return await run_in_threadpool(transfer.import_lines, db, (line.decode() for line in spool))
+        except transfer.MemoryBankNotEmpty as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+# -------------------
+# Debugging (not MCP tools)
+# -------------------
+
+@app.get("/debug/queries", include_in_schema=False)
+async def debug_queries(reset: bool = False):
+    """
+    Statement count, total time and the slowest statements since startup
+    (or the last `reset=true`).
+    """
+    snapshot = instrumentation.slow_queries.snapshot()
+    if reset:
+        instrumentation.slow_queries.reset()
+    return snapshot
 
-@app.post("/tools/appendActiveContext", response_model=schemas.ProjectContext, tags=["Context Tools"], operation_id="appendActiveContext")
-def append_active_context(payload: schemas.ActiveContext, db: Session = Depends(get_db)):
+@app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+async def prometheus_metrics(db: AnySession = Depends(get_read_db)):
     """
-    Appends a message to the active context.
+    Metrics in the Prometheus text format: per-tool latency histograms,
+    request and error counts, gauges of the task, journal and
+    active_context sizes read from the trigger-maintained counters, and the
+    context cache's hits, misses and size in this worker.
     """
-    return crud.append_project_context(db=db, key="active_context", content_to_append=payload.context)
+    counters = await run_db(db, crud.get_stats_counters)
+    lines = metrics.tool_metrics.render()
+    lines += metrics.render_domain_gauges(counters, writer.queue_depth if writer is not None else None)
+    lines += metrics.render_context_cache(context_cache.stats())
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=metrics.CONTENT_TYPE)
 
 # Setup MCP server after all endpoints are defined
 mcp.setup_server()
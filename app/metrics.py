@@ -0,0 +1,176 @@
+"""
+Prometheus metrics for the /metrics endpoint, in the text exposition format.
+
+ToolMetricsMiddleware records, for every /tools/* request, the latency
+histogram and the request and error counts, labelled by the route's
+operation_id, and the number of requests in flight. The domain gauges are rendered from
+the trigger-maintained counters (see app/counters.py) at scrape time.
+"""
+import threading
+import time
+
+from . import config
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class ToolMetrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # operation -> [bucket counts..., +Inf count], latency sum
+            self._histograms = {}
+            self._sums = {}
+            self._requests = {}
+            self._errors = {}
+            self.in_flight = 0
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, operation: str, seconds: float, error: bool):
+        with self._lock:
+            self.in_flight -= 1
+            counts = self._histograms.setdefault(operation, [0] * (len(self.buckets) + 1))
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            counts[-1] += 1
+            self._sums[operation] = self._sums.get(operation, 0.0) + seconds
+            self._requests[operation] = self._requests.get(operation, 0) + 1
+            if error:
+                self._errors[operation] = self._errors.get(operation, 0) + 1
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP memorybank_tool_requests_total Tool requests handled.",
+                "# TYPE memorybank_tool_requests_total counter",
+            ]
+            lines += [_sample("memorybank_tool_requests_total", value, operation=op)
+                      for op, value in sorted(self._requests.items())]
+            lines += [
+                "# HELP memorybank_tool_errors_total Tool requests that failed (status >= 400).",
+                "# TYPE memorybank_tool_errors_total counter",
+            ]
+            lines += [_sample("memorybank_tool_errors_total", self._errors.get(op, 0), operation=op)
+                      for op in sorted(self._requests)]
+            lines += [
+                "# HELP memorybank_tool_requests_in_flight Tool requests being handled.",
+                "# TYPE memorybank_tool_requests_in_flight gauge",
+                _sample("memorybank_tool_requests_in_flight", self.in_flight),
+                "# HELP memorybank_tool_latency_seconds Tool request latency.",
+                "# TYPE memorybank_tool_latency_seconds histogram",
+            ]
+            for op, counts in sorted(self._histograms.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append(_sample("memorybank_tool_latency_seconds_bucket", count, operation=op, le=f"{bound:g}"))
+                lines.append(_sample("memorybank_tool_latency_seconds_bucket", counts[-1], operation=op, le="+Inf"))
+                lines.append(_sample("memorybank_tool_latency_seconds_sum", round(self._sums[op], 6), operation=op))
+                lines.append(_sample("memorybank_tool_latency_seconds_count", counts[-1], operation=op))
+            return lines
+
+
+tool_metrics = ToolMetrics()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name: str, value, **labels) -> str:
+    if labels:
+        label_text = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+        return f"{name}{{{label_text}}} {value}"
+    return f"{name} {value}"
+
+
+def render_domain_gauges(counters, group_commit_queue_depth=None):
+    """
+    Renders the gauges for {name: value} from crud.get_stats_counters.
+    """
+    statuses = sorted(
+        (name.partition(":")[2], value) for name, value in counters.items()
+        if name.startswith("tasks_status:")
+    )
+    lines = [
+        "# HELP memorybank_tasks Tasks per status.",
+        "# TYPE memorybank_tasks gauge",
+    ]
+    lines += [_sample("memorybank_tasks", value, status=status) for status, value in statuses]
+    lines += [
+        "# HELP memorybank_tasks_ready PENDING tasks whose dependencies are all COMPLETED.",
+        "# TYPE memorybank_tasks_ready gauge",
+        _sample("memorybank_tasks_ready", counters.get("tasks_ready", 0)),
+        "# HELP memorybank_active_context_bytes Size of active_context, base value and segments.",
+        "# TYPE memorybank_active_context_bytes gauge",
+        _sample("memorybank_active_context_bytes", counters.get("context_bytes:active_context", 0)),
+        "# HELP memorybank_journal_entries Rows in the journal table.",
+        "# TYPE memorybank_journal_entries gauge",
+        _sample("memorybank_journal_entries", counters.get("journal_rows", 0)),
+    ]
+    if group_commit_queue_depth is not None:
+        lines += [
+            "# HELP memorybank_group_commit_queue_depth Calls waiting for the group-commit writer.",
+            "# TYPE memorybank_group_commit_queue_depth gauge",
+            _sample("memorybank_group_commit_queue_depth", group_commit_queue_depth),
+        ]
+    return lines
+
+
+def render_context_cache(stats):
+    """
+    Renders the context cache's stats() (see app/cache.py).
+    """
+    return [
+        "# HELP memorybank_context_cache_hits_total Context reads served from the cache.",
+        "# TYPE memorybank_context_cache_hits_total counter",
+        _sample("memorybank_context_cache_hits_total", stats["hits"]),
+        "# HELP memorybank_context_cache_misses_total Context reads that went to the database.",
+        "# TYPE memorybank_context_cache_misses_total counter",
+        _sample("memorybank_context_cache_misses_total", stats["misses"]),
+        "# HELP memorybank_context_cache_entries Values in the context cache.",
+        "# TYPE memorybank_context_cache_entries gauge",
+        _sample("memorybank_context_cache_entries", stats["entries"]),
+        "# HELP memorybank_context_cache_bytes UTF-8 size of the values in the context cache.",
+        "# TYPE memorybank_context_cache_bytes gauge",
+        _sample("memorybank_context_cache_bytes", stats["bytes"]),
+    ]
+
+
+class ToolMetricsMiddleware:
+    """
+    ASGI middleware that records tool_metrics for /tools/* requests, under
+    the operation_id of the route that handled them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.METRICS or not scope["path"].startswith("/tools/"):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        tool_metrics.started()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Set by the router; requests that matched no route share a label
+            operation = getattr(scope.get("route"), "operation_id", None) or "unmatched"
+            tool_metrics.finished(operation, time.perf_counter() - started, status_code >= 400)
\ No newline at end of file
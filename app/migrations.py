@@ -0,0 +1,205 @@
+"""
+Idempotent schema migrations applied at startup.
+
+`models.Base.metadata.create_all` only creates missing tables. Columns, indexes
+and backfills that existing `memorybank.db` files need are handled here.
+"""
+import json
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from . import counters, models
+
+
+def run_migrations(engine: Engine):
+    _add_unmet_dependencies(engine)
+    _migrate_json_dependencies(engine)
+    _add_project_context_version(engine)
+    _add_journal_index(engine)
+    _add_last_event(engine)
+    _add_task_leases(engine)
+    _add_task_priority(engine)
+    _add_task_list_indexes(engine)
+    _add_journal_events(engine)
+    _install_stats_counters(engine)
+
+
+def _column_names(conn, table: str):
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+def _add_unmet_dependencies(engine: Engine):
+    """
+    Adds `tasks.unmet_dependencies` and computes it for existing rows.
+    """
+    with engine.begin() as conn:
+        if "unmet_dependencies" in _column_names(conn, "tasks"):
+            return
+        conn.execute(text(
+            "ALTER TABLE tasks ADD COLUMN unmet_dependencies INTEGER NOT NULL DEFAULT 0"
+        ))
+        rows = conn.execute(text("SELECT task_id, status, dependencies FROM tasks")).all()
+        statuses = {task_id: status for task_id, status, _ in rows}
+        for task_id, _, dependencies in rows:
+            try:
+                dependency_ids = set(json.loads(dependencies)) if dependencies else set()
+                unmet = sum(1 for dep_id in dependency_ids if statuses.get(dep_id) != 'COMPLETED')
+            except (json.JSONDecodeError, TypeError):
+                unmet = 1 # Malformed dependencies were never considered ready
+            if unmet:
+                conn.execute(
+                    text("UPDATE tasks SET unmet_dependencies = :unmet WHERE task_id = :task_id"),
+                    {"unmet": unmet, "task_id": task_id}
+                )
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_tasks_ready "
+            "ON tasks (status, unmet_dependencies, created_at)"
+        ))
+
+
+def _migrate_json_dependencies(engine: Engine):
+    """
+    Moves dependencies stored as JSON in the legacy `tasks.dependencies`
+    column into `task_dependencies`. Migrated rows are set to NULL, so this
+    is a no-op once everything has been moved.
+    """
+    with engine.begin() as conn:
+        if "dependencies" not in _column_names(conn, "tasks"):
+            return
+        rows = conn.execute(text(
+            "SELECT task_id, dependencies FROM tasks WHERE dependencies IS NOT NULL"
+        )).all()
+        for task_id, dependencies in rows:
+            try:
+                dependency_ids = json.loads(dependencies) or []
+            except json.JSONDecodeError:
+                continue # Leave malformed values in place for inspection
+            for dep_id in dict.fromkeys(dependency_ids):
+                conn.execute(
+                    text(
+                        "INSERT OR IGNORE INTO task_dependencies (task_id, depends_on_id) "
+                        "VALUES (:task_id, :depends_on_id)"
+                    ),
+                    {"task_id": task_id, "depends_on_id": dep_id}
+                )
+            conn.execute(
+                text("UPDATE tasks SET dependencies = NULL WHERE task_id = :task_id"),
+                {"task_id": task_id}
+            )
+
+
+def _add_project_context_version(engine: Engine):
+    with engine.begin() as conn:
+        if "version" in _column_names(conn, "project_context"):
+            return
+        conn.execute(text(
+            "ALTER TABLE project_context ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+        ))
+
+
+
+def _add_journal_index(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_journal_task_id_id ON journal (task_id, id)"))
+
+
+def _add_last_event(engine: Engine):
+    """
+    Adds `tasks.last_event`, fills it from the journal and installs the
+    trigger and index that keep it queryable.
+    """
+    with engine.begin() as conn:
+        if "last_event" not in _column_names(conn, "tasks"):
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN last_event VARCHAR(50)"))
+            conn.execute(text(
+                "UPDATE tasks SET last_event = ("
+                "SELECT event_type FROM journal WHERE journal.task_id = tasks.task_id "
+                "ORDER BY id DESC LIMIT 1)"
+            ))
+        conn.execute(text(models.JOURNAL_LAST_EVENT_TRIGGER))
+        _sync_task_index(conn, "ix_tasks_last_event_mismatch")
+
+
+def _add_task_leases(engine: Engine):
+    with engine.begin() as conn:
+        if "lease_expires_at" not in _column_names(conn, "tasks"):
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN lease_expires_at TIMESTAMP"))
+        _sync_task_index(conn, "ix_tasks_lease_expires_at")
+
+
+def _add_task_priority(engine: Engine):
+    """
+    Adds `tasks.priority` and orders the ready queue indexes by it.
+    """
+    with engine.begin() as conn:
+        if "priority" not in _column_names(conn, "tasks"):
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN priority INTEGER NOT NULL DEFAULT 0"))
+        _sync_task_index(conn, "ix_tasks_ready")
+        _sync_task_index(conn, "ix_tasks_role_ready")
+
+
+def _add_task_list_indexes(engine: Engine):
+    with engine.begin() as conn:
+        for name in ("ix_tasks_updated", "ix_tasks_status_updated", "ix_tasks_type_updated", "ix_tasks_role_updated"):
+            _sync_task_index(conn, name)
+
+
+def _add_journal_events(engine: Engine):
+    """
+    Adds `tasks.journal_events`, counts the existing entries and installs
+    the triggers that keep it up to date (see models.Task).
+    """
+    with engine.begin() as conn:
+        if "journal_events" not in _column_names(conn, "tasks"):
+            conn.execute(text("ALTER TABLE tasks ADD COLUMN journal_events INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(text(
+                "UPDATE tasks SET journal_events = ("
+                "SELECT count(*) FROM journal WHERE journal.task_id = tasks.task_id)"
+            ))
+        for statement in (models.JOURNAL_LAST_EVENT_TRIGGER, models.JOURNAL_EVENT_DELETE_TRIGGER):
+            _sync_trigger(conn, statement)
+        _sync_task_index(conn, "ix_tasks_journal_events")
+
+
+def _sync_trigger(conn, statement: str):
+    """
+    Creates the trigger of a "CREATE TRIGGER IF NOT EXISTS <name> ..."
+    statement, replacing a trigger of that name with an older definition.
+    """
+    expected = statement.replace(" IF NOT EXISTS", "", 1)
+    name = expected.split()[2]
+    installed = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {"name": name}
+    ).scalar()
+    if installed == expected:
+        return
+    if installed is not None:
+        conn.execute(text(f"DROP TRIGGER {name}"))
+    conn.execute(text(expected))
+
+
+def _sync_task_index(conn, name: str):
+    """
+    Creates the index `name` of models.Task, replacing an index of that
+    name created with an older definition.
+    """
+    index = next(index for index in models.Task.__table__.indexes if index.name == name)
+    expected = str(CreateIndex(index).compile(dialect=conn.dialect))
+    installed = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'index' AND name = :name"), {"name": name}
+    ).scalar()
+    if installed == expected:
+        return
+    if installed is not None:
+        conn.execute(text(f"DROP INDEX {name}"))
+    index.create(conn)
+
+
+def _install_stats_counters(engine: Engine):
+    """
+    Installs the triggers behind the /metrics gauges once the columns they
+    use exist (see app/counters.py).
+    """
+    with engine.begin() as conn:
+        counters.install_triggers(conn)
\ No newline at end of file
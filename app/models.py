@@ -1,7 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, func
+from sqlalchemy import DDL, Column, Integer, String, Text, TIMESTAMP, ForeignKey, Index, event, func, text
 from sqlalchemy.orm import relationship
 from .database import Base
 
+# Tasks whose status disagrees with their last journal event: RUNNING without
+# a last STARTING event, COMPLETED without a last FINISHED event, or PENDING
+# with an event other than LEASE_EXPIRED. Other statuses are not journaled and
+# never match. Queries must repeat this exact clause for SQLite to use
+# ix_tasks_last_event_mismatch.
+LAST_EVENT_MISMATCH = (
+    "(status = 'PENDING' AND last_event IS NOT NULL AND last_event IS NOT 'LEASE_EXPIRED')"
+    " OR (status = 'RUNNING' AND last_event IS NOT 'STARTING')"
+    " OR (status = 'COMPLETED' AND last_event IS NOT 'FINISHED')"
+)
+
 class Task(Base):
     __tablename__ = "tasks"
 
@@ -10,12 +21,66 @@ class Task(Base):
     details = Column(Text)
     type = Column(String(50), nullable=False)
     status = Column(String(50), nullable=False, default='PENDING')
-    dependencies = Column(Text)  # Storing as a JSON string, e.g., '["TASK-001"]'
+    # Number of dependencies that are not 'COMPLETED' yet. A PENDING task is
+    # ready when this drops to 0; kept up to date by crud.set_task_status.
+    unmet_dependencies = Column(Integer, nullable=False, default=0, server_default="0")
     assignee_role = Column(String(100))
+    # Ready tasks are handed out highest priority first, then oldest first.
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
+    # event_type of the task's newest journal entry and the number of its
+    # entries in `journal`, kept up to date by the journal_last_event and
+    # journal_event_delete triggers.
+    last_event = Column(String(50))
+    journal_events = Column(Integer, nullable=False, default=0, server_default="0")
+    # When a RUNNING task's lease runs out (UTC); NULL in any other status.
+    lease_expires_at = Column(TIMESTAMP)
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     journal_entries = relationship("Journal", back_populates="task")
+    dependency_links = relationship(
+        "TaskDependency",
+        cascade="all, delete-orphan",
+        order_by="TaskDependency.depends_on_id",
+    )
+
+    @property
+    def dependencies(self):
+        # IDs of the tasks this one depends on, as exposed by the API.
+        return [link.depends_on_id for link in self.dependency_links]
+
+    __table_args__ = (
+        # Serve crud.get_next_ready_task with a single index lookup, in ready
+        # queue order, without and with an assignee_role filter.
+        Index("ix_tasks_ready", "status", "unmet_dependencies", priority.desc(), "created_at"),
+        Index("ix_tasks_role_ready", "assignee_role", "status", "unmet_dependencies", priority.desc(), "created_at"),
+        # Partial index of the inconsistent tasks, for getInconsistentTasks.
+        Index("ix_tasks_last_event_mismatch", "task_id", sqlite_where=text(f"({LAST_EVENT_MISMATCH})")),
+        # Only leased tasks are indexed, so a sweep reads just the expired ones.
+        Index("ix_tasks_lease_expires_at", "lease_expires_at", sqlite_where=text("lease_expires_at IS NOT NULL")),
+        # Serve listTasks pages in (updated_at, task_id) order with a range
+        # scan, unfiltered or filtered by one of status, type and role.
+        Index("ix_tasks_updated", "updated_at", "task_id"),
+        Index("ix_tasks_status_updated", "status", "updated_at", "task_id"),
+        Index("ix_tasks_type_updated", "type", "updated_at", "task_id"),
+        Index("ix_tasks_role_updated", "assignee_role", "updated_at", "task_id"),
+        # Tasks with more journal entries than the retention policy keeps,
+        # for the journal compactor (see app/retention.py).
+        Index("ix_tasks_journal_events", "status", "journal_events"),
+    )
+
+class TaskDependency(Base):
+    __tablename__ = "task_dependencies"
+
+    # The primary key doubles as the forward index (task -> its dependencies).
+    task_id = Column(String(255), ForeignKey("tasks.task_id"), primary_key=True)
+    # Not a foreign key: a dependency may reference a task that is created later.
+    depends_on_id = Column(String(255), primary_key=True)
+
+    __table_args__ = (
+        # Reverse index (task -> its dependents), used to unblock dependents.
+        Index("ix_task_dependencies_depends_on_id", "depends_on_id", "task_id"),
+    )
 
 class Journal(Base):
     __tablename__ = "journal"
@@ -27,9 +92,68 @@ class Journal(Base):
 
     task = relationship("Task", back_populates="journal_entries")
 
+    __table_args__ = (
+        # A task's journal in order, for the newest entries and for paging.
+        Index("ix_journal_task_id_id", "task_id", "id"),
+    )
+
+JOURNAL_LAST_EVENT_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS journal_last_event AFTER INSERT ON journal BEGIN "
+    "UPDATE tasks SET last_event = NEW.event_type, journal_events = journal_events + 1 "
+    "WHERE task_id = NEW.task_id; END"
+)
+# Compaction keeps each task's newest entries, so last_event is unchanged.
+JOURNAL_EVENT_DELETE_TRIGGER = (
+    "CREATE TRIGGER IF NOT EXISTS journal_event_delete AFTER DELETE ON journal BEGIN "
+    "UPDATE tasks SET journal_events = journal_events - 1 WHERE task_id = OLD.task_id; END"
+)
+for trigger in (JOURNAL_LAST_EVENT_TRIGGER, JOURNAL_EVENT_DELETE_TRIGGER):
+    event.listen(Journal.__table__, "after_create", DDL(trigger).execute_if(dialect="sqlite"))
+
+class JournalSummary(Base):
+    __tablename__ = "journal_summaries"
+
+    # What the journal compactor moved from `journal` to the archive, per task.
+    task_id = Column(String(255), primary_key=True)
+    archived_entries = Column(Integer, nullable=False, default=0)
+    # JSON object of {event_type: number of archived entries}
+    event_counts = Column(Text, nullable=False, default="{}")
+    # Timestamps of the oldest and newest archived entries
+    first_timestamp = Column(TIMESTAMP)
+    last_timestamp = Column(TIMESTAMP)
+    archived_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
 class ProjectContext(Base):
     __tablename__ = "project_context"
 
     key = Column(String(255), primary_key=True, index=True)
     value = Column(Text)
-    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    # Incremented whenever `value` is replaced; part of the read cursor.
+    # Starts at 1 so that a new key differs from a missing one (version 0).
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class ProjectContextSegment(Base):
+    __tablename__ = "project_context_segments"
+
+    # AUTOINCREMENT keeps sequence numbers monotonic even after deletes.
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    key = Column(String(255), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_project_context_segments_key_seq", "key", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+class StatsCounter(Base):
+    __tablename__ = "stats_counters"
+
+    # Maintained by the triggers in app/counters.py; read by /metrics.
+    name = Column(String(255), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+# Registers the triggers that maintain stats_counters and the full-text
+# indexes with create_all.
+from . import counters, search  # noqa: E402,F401
\ No newline at end of file
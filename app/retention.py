@@ -0,0 +1,178 @@
+"""
+Journal retention: compaction into per-task summaries and cold archival.
+
+Every start, finish and status change adds a journal entry, so without
+retention the journal grows forever. With MEMORYBANK_JOURNAL_KEEP_LAST set,
+tasks in one of MEMORYBANK_JOURNAL_RETENTION_STATUSES (COMPLETED by default)
+keep only their newest entries in the journal. The compactor moves the older
+ones out in the background:
+1. It reads a small batch of them without taking the write lock and appends
+   them to the day's archive file, journal-YYYY-MM-DD.ndjson.gz in
+   MEMORYBANK_JOURNAL_ARCHIVE_DIR, one JSON object per line.
+2. In one short write transaction it deletes them and adds them to the
+   task's row in journal_summaries (counts per event type and the archived
+   time range), which getTaskJournal returns with the last page.
+
+Each batch is a separate gzip member written with a single append and
+fsynced before the entries are deleted, so a crash loses no entry; at worst
+an entry is archived twice. The newest entry of a task is always kept, so
+`last_event` and getInconsistentTasks are unaffected.
+
+Archived entries can be loaded back with their original IDs and timestamps:
+
+    python -m app.retention load journal-archive/journal-2026-10-17.ndjson.gz
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+from datetime import datetime, timezone
+
+from starlette.concurrency import run_in_threadpool
+
+from . import config, migrations, models, services
+from .database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+
+def write_archive(directory: str, rows) -> str:
+    """
+    Appends (id, task_id, event_type, timestamp) rows to the day's archive
+    file in `directory` as one gzip member, and fsyncs it. Returns its path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"journal-{datetime.now(timezone.utc):%Y-%m-%d}.ndjson.gz")
+    lines = "".join(
+        json.dumps({"id": id, "task_id": task_id, "event_type": event_type, "timestamp": timestamp}) + "\n"
+        for id, task_id, event_type, timestamp in rows
+    )
+    # One write on an O_APPEND descriptor, so members appended concurrently by
+    # other workers never interleave.
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, gzip.compress(lines.encode()))
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    return path
+
+
+def read_archive(path: str):
+    """
+    Yields the entries of an archive file as dicts.
+    """
+    with gzip.open(path, "rt") as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+class JournalCompactor:
+    def __init__(self, session_factory, archive_dir: str, keep: int, statuses,
+                 interval_s: float = 60.0, batch_size: int = 500):
+        self.session_factory = session_factory
+        self.archive_dir = archive_dir
+        # At least the newest entry is kept, which last_event refers to.
+        self.keep = max(keep, 1)
+        self.statuses = tuple(statuses)
+        self.interval = interval_s
+        self.batch_size = batch_size
+        self.compacted = 0
+
+    def archive(self, rows):
+        write_archive(self.archive_dir, rows)
+
+    def sweep(self) -> int:
+        """
+        Compacts every entry the retention policy no longer keeps,
+        `batch_size` entries per write transaction. Returns the number of
+        entries moved to the archive.
+        """
+        total = 0
+        while True:
+            db = self.session_factory()
+            try:
+                compacted = services.compact_journal(
+                    db, self.statuses, self.keep, self.batch_size, self.archive
+                )
+            finally:
+                db.close()
+            total += len(compacted)
+            # An empty batch means nothing is left; a partial one may have
+            # raced another compactor, which then finishes the rest.
+            if len(compacted) < self.batch_size:
+                break
+        self.compacted += total
+        return total
+
+    async def run_forever(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_in_threadpool(self.sweep)
+            except Exception:
+                # e.g. the database is locked for longer than busy_timeout or
+                # the archive directory is not writable; the next sweep retries.
+                logger.exception("Journal compaction failed")
+
+
+def create_compactor():
+    """
+    Returns the compactor configured by MEMORYBANK_JOURNAL_*, or None if
+    journal retention is disabled.
+    """
+    if config.JOURNAL_KEEP_LAST <= 0 or config.JOURNAL_COMPACTION_INTERVAL_S <= 0:
+        return None
+    return JournalCompactor(
+        SessionLocal,
+        archive_dir=config.JOURNAL_ARCHIVE_DIR,
+        keep=config.JOURNAL_KEEP_LAST,
+        statuses=config.JOURNAL_RETENTION_STATUSES,
+        interval_s=config.JOURNAL_COMPACTION_INTERVAL_S,
+        batch_size=config.JOURNAL_COMPACTION_BATCH,
+    )
+
+
+def load_archive(session_factory, path: str, batch_size: int = 1000) -> int:
+    """
+    Loads the entries of an archive file back into the journal,
+    `batch_size` entries per transaction. Returns the number restored.
+    """
+    restored, batch = 0, []
+    for entry in read_archive(path):
+        batch.append(entry)
+        if len(batch) == batch_size:
+            restored += _restore(session_factory, batch)
+            batch = []
+    if batch:
+        restored += _restore(session_factory, batch)
+    return restored
+
+
+def _restore(session_factory, entries) -> int:
+    db = session_factory()
+    try:
+        return services.restore_journal_entries(db, entries)
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.retention")
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="Load archived journal entries back into the journal")
+    load.add_argument("files", nargs="+")
+    args = parser.parse_args(argv)
+
+    # The database may predate retention (no journal_summaries table yet).
+    models.Base.metadata.create_all(bind=engine)
+    migrations.run_migrations(engine)
+    for path in args.files:
+        print(f"{path}: {load_archive(SessionLocal, path)} entries restored")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Any
+from pydantic import BaseModel, Field, model_serializer
+from typing import List, Literal, Optional, Any
 from datetime import datetime
 
 # ===================
@@ -18,6 +18,15 @@ class ProjectContext(ProjectContextBase):
     class Config:
         from_attributes = True
 
+class ContextSegment(BaseModel):
+    key: str
+    seq: int
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
 # ===================
 # Journal
 # ===================
@@ -44,8 +53,10 @@ class TaskBase(BaseModel):
     details: Optional[str] = None
     type: str
     status: str = 'PENDING'
-    dependencies: Optional[List[str]] = [] # Handled as a JSON string in DB, but list in API
+    dependencies: Optional[List[str]] = [] # Stored as rows of the task_dependencies table
     assignee_role: Optional[str] = None
+    # Ready tasks are handed out highest priority first
+    priority: int = 0
 
 class TaskCreate(TaskBase):
     pass
@@ -53,7 +64,12 @@ class TaskCreate(TaskBase):
 class Task(TaskBase):
     created_at: datetime
     updated_at: datetime
+    # The newest entries (MEMORYBANK_TASK_JOURNAL_LIMIT), oldest first; see
+    # getTaskJournal for the rest.
     journal_entries: List[Journal] = []
+    journal_entry_count: int = 0
+    # When the lease of a RUNNING task expires (UTC); see heartbeatTask
+    lease_expires_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -62,6 +78,36 @@ class Task(TaskBase):
 class TaskIdPayload(BaseModel):
     task_id: str
 
+# For tool: getTaskJournal
+class TaskJournalQuery(BaseModel):
+    task_id: str
+    limit: int = Field(default=50, ge=1, le=500)
+    # `next_before_id` of the previous page
+    before_id: Optional[int] = None
+
+class JournalSummary(BaseModel):
+    # Older entries moved to the journal archive by retention (see
+    # app/retention.py)
+    archived_entries: int
+    # {event_type: number of archived entries}
+    event_counts: dict
+    first_timestamp: Optional[datetime] = None
+    last_timestamp: Optional[datetime] = None
+
+class TaskJournalPage(BaseModel):
+    # Newest first
+    entries: List[Journal]
+    # Pass as `before_id` to get the next (older) page; null on the last page
+    next_before_id: Optional[int] = None
+    # Set on the last page if older entries of the task were archived
+    archived: Optional[JournalSummary] = None
+
+# For tool: finishWorkOnTask
+class FinishedTask(Task):
+    # Dependents that became ready because this task completed, in the
+    # order getNextReadyTask would return them.
+    unblocked_task_ids: List[str] = []
+
 # ===================
 # MCP Tool Schemas
 # ===================
@@ -75,14 +121,162 @@ class NextReadyTask(BaseModel):
     task_id: str
     type: str
     assignee_role: Optional[str] = None
+    priority: int = 0
+
+class ReadyTaskQuery(BaseModel):
+    # Only tasks for this role
+    assignee_role: Optional[str] = None
+
+# For tool: waitForReadyTask
+class WaitForReadyTaskPayload(ReadyTaskQuery):
+    # Seconds to wait for a task to become ready
+    timeout: float = Field(default=30, ge=0, le=300)
+
+# For the /events/tasks stream: created, started, finished, status_updated, ready
+class TaskEvent(BaseModel):
+    event: str
+    task_id: str
+    status: Optional[str] = None
+
+# For tool: claimNextReadyTask
+class ClaimTasksPayload(BaseModel):
+    max_tasks: int = Field(default=1, ge=1, le=100)
+    assignee_role: Optional[str] = None
+
+# For tool: heartbeatTask
+class TaskLease(BaseModel):
+    task_id: str
+    # Null if leases are disabled
+    lease_expires_at: Optional[datetime] = None
 
 # For tool: getInconsistentTasks
+class InconsistentTasksQuery(BaseModel):
+    limit: int = Field(default=100, ge=1, le=1000)
+    # `next_after_task_id` of the previous page
+    after_task_id: Optional[str] = None
+
 class InconsistentTask(BaseModel):
     task_id: str
-    last_event: str
+    status: str
+    # event_type of the task's newest journal entry; null if it has none
+    last_event: Optional[str] = None
 
 class InconsistentTaskList(BaseModel):
+    # Ordered by task_id
     inconsistent_tasks: List[InconsistentTask]
+    # Pass as `after_task_id` to get the next page; null on the last page
+    next_after_task_id: Optional[str] = None
+
+# For tool: getTaskGraph
+class TaskGraphQuery(BaseModel):
+    task_id: str
+    # Most tasks listed in each of ancestors, descendants, critical_path and
+    # ready_frontier; the counts cover all the tasks walked.
+    limit: int = Field(default=200, ge=0, le=50000)
+    # Most ancestors and most descendants walked, nearest first. Bounds the
+    # cost of the call on large graphs; everything else is computed over the
+    # tasks walked.
+    max_tasks: int = Field(default=2000, ge=1, le=50000)
+
+class TaskGraphNode(BaseModel):
+    task_id: str
+    # Null if the task does not exist (yet)
+    status: Optional[str] = None
+    # Dependency edges between this task and the requested one
+    distance: int
+    dependencies: List[str] = []
+
+class TaskGraph(BaseModel):
+    task_id: str
+    status: str
+    # The tasks it transitively depends on, nearest first
+    ancestors: List[TaskGraphNode]
+    ancestor_count: int
+    # Whether there are more than max_tasks, so some were left out
+    ancestors_truncated: bool
+    # The tasks that transitively depend on it, nearest first
+    descendants: List[TaskGraphNode]
+    descendant_count: int
+    descendants_truncated: bool
+    # Unfinished tasks on the longest dependency chain through it, in the
+    # order they have to be done
+    critical_path: List[str]
+    critical_path_length: int
+    # Ready tasks among it, its ancestors and its descendants, in the order
+    # getNextReadyTask would return them
+    ready_frontier: List[str]
+
+# For tool: listTasks
+TASK_LIST_FIELDS = (
+    "description", "details", "type", "status", "dependencies", "assignee_role", "priority",
+    "created_at", "lease_expires_at",
+)
+
+class ListTasksQuery(BaseModel):
+    status: Optional[str] = None
+    type: Optional[str] = None
+    assignee_role: Optional[str] = None
+    # Only tasks updated at or after this time (UTC)
+    updated_since: Optional[datetime] = None
+    # "desc": most recently updated first; "asc": oldest update first
+    order: Literal["desc", "asc"] = "desc"
+    limit: int = Field(default=50, ge=1, le=500)
+    # `next_cursor` of the previous page
+    cursor: Optional[str] = None
+    # Fields to return besides task_id and updated_at; all if omitted
+    fields: Optional[List[Literal[TASK_LIST_FIELDS]]] = None
+
+class TaskListItem(BaseModel):
+    task_id: str
+    updated_at: datetime
+    description: Optional[str] = None
+    details: Optional[str] = None
+    type: Optional[str] = None
+    status: Optional[str] = None
+    dependencies: Optional[List[str]] = None
+    assignee_role: Optional[str] = None
+    priority: Optional[int] = None
+    created_at: Optional[datetime] = None
+    lease_expires_at: Optional[datetime] = None
+
+    @model_serializer(mode="wrap")
+    def _requested_fields_only(self, handler):
+        # Fields left out by the `fields` projection are omitted, not null.
+        return {name: value for name, value in handler(self).items() if name in self.model_fields_set}
+
+class TaskList(BaseModel):
+    tasks: List[TaskListItem]
+    # Pass as `cursor` to get the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+# For tool: searchMemory
+class SearchMemoryQuery(BaseModel):
+    # Words to look for; rows matching more of them rank higher. A word
+    # ending in "*" matches as a prefix.
+    query: str = Field(min_length=1)
+    # "task": task descriptions and details; "context": system_patterns and
+    # active_context, including the context messages of updateTaskStatus
+    kinds: List[Literal["task", "context"]] = ["task", "context"]
+    limit: int = Field(default=10, ge=1, le=100)
+    # Approximate length of each snippet, in words
+    snippet_tokens: int = Field(default=24, ge=1, le=64)
+
+class SearchHit(BaseModel):
+    kind: str
+    # Set for kind "task"
+    task_id: Optional[str] = None
+    # Set for kind "context"; `seq` is the appended segment that matched,
+    # null if the base value did
+    key: Optional[str] = None
+    seq: Optional[int] = None
+    # Text around the matches, which are wrapped in [ and ]
+    snippet: str
+    # Higher is a better match (negated FTS5 bm25)
+    score: float
+
+class SearchResults(BaseModel):
+    # Best match first
+    hits: List[SearchHit]
 
 # For tool: updateTaskStatus
 class TaskStatusUpdate(BaseModel):
@@ -95,9 +289,54 @@ class SystemPatternsUpdate(BaseModel):
     patterns: str
 
 # For tool: getSystemPatterns
+class SystemPatternsQuery(BaseModel):
+    # ETag from an earlier response; unchanged patterns are not sent again.
+    if_none_match: Optional[str] = None
+
 class SystemPatterns(BaseModel):
     patterns: str
+    etag: Optional[str] = None
+    not_modified: bool = False
 
 # For tool: getActiveContext / appendActiveContext
 class ActiveContext(BaseModel):
-    context: str
\ No newline at end of file
+    context: str
+
+# For tool: getActiveContext
+class ActiveContextQuery(BaseModel):
+    # Cursor from an earlier response; only newer segments are returned.
+    since: Optional[str] = None
+    last_segments: Optional[int] = Field(default=None, ge=1)
+    max_bytes: Optional[int] = Field(default=None, ge=0)
+
+class ActiveContextRead(ActiveContext):
+    cursor: str
+    not_modified: bool = False
+
+# For tool: batch
+class ToolCall(BaseModel):
+    # operation_id of the tool, e.g. "startWorkOnTask"
+    tool: str
+    # The tool's usual payload
+    arguments: dict = {}
+
+class BatchRequest(BaseModel):
+    calls: List[ToolCall] = Field(min_length=1, max_length=100)
+    # True: all calls commit together or not at all, and the first failure
+    # stops the batch. False: each call commits or rolls back on its own.
+    atomic: bool = False
+
+class ToolCallError(BaseModel):
+    status_code: int
+    detail: Any
+
+class ToolCallResult(BaseModel):
+    tool: str
+    ok: bool
+    result: Any = None
+    error: Optional[ToolCallError] = None
+
+class BatchResponse(BaseModel):
+    results: List[ToolCallResult]
+    # False if an atomic batch was rolled back
+    committed: bool
\ No newline at end of file
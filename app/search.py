@@ -0,0 +1,128 @@
+"""
+SQLite FTS5 full-text index behind searchMemory.
+
+Three external-content FTS5 tables index the text agents write, without
+storing a second copy of it:
+- tasks_fts: tasks.description and tasks.details
+- project_context_fts: project_context.value (e.g. system_patterns)
+- project_context_segments_fts: each appended segment (active_context
+  entries, including updateTaskStatus context messages)
+
+Triggers on the content tables keep the indexes in sync in the same
+transaction as each write; status changes and other column updates do not
+touch them. The tables and triggers are installed, and the indexes built
+from the existing rows, the first time the tables are created in a database,
+and again whenever their definitions below change.
+
+FTS5 is part of the SQLite bundled with CPython; if the linked SQLite lacks
+it, nothing is installed and searchMemory reports that search is unavailable.
+"""
+import logging
+import re
+
+from sqlalchemy import event, text
+
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+# name -> (content table, content rowid, indexed columns)
+_INDEXES = {
+    "tasks_fts": ("tasks", "rowid", ("description", "details")),
+    "project_context_fts": ("project_context", "rowid", ("value",)),
+    "project_context_segments_fts": ("project_context_segments", "seq", ("content",)),
+}
+
+
+def _create_table(name: str) -> str:
+    content, content_rowid, columns = _INDEXES[name]
+    return (
+        f"CREATE VIRTUAL TABLE {name} USING fts5({', '.join(columns)}, content='{content}', "
+        f"content_rowid='{content_rowid}', tokenize='{TOKENIZER}', prefix='3')"
+    )
+
+
+def _insert(name: str, row: str) -> str:
+    _, content_rowid, columns = _INDEXES[name]
+    values = ", ".join(f"{row}.{column}" for column in columns)
+    return f"INSERT INTO {name} (rowid, {', '.join(columns)}) VALUES ({row}.{content_rowid}, {values});"
+
+
+def _delete(name: str, row: str) -> str:
+    _, content_rowid, columns = _INDEXES[name]
+    values = ", ".join(f"{row}.{column}" for column in columns)
+    return (
+        f"INSERT INTO {name} ({name}, rowid, {', '.join(columns)}) "
+        f"VALUES ('delete', {row}.{content_rowid}, {values});"
+    )
+
+
+def _triggers(name: str):
+    content, _, columns = _INDEXES[name]
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+    return {
+        f"{name}_insert": f"AFTER INSERT ON {content} BEGIN {_insert(name, 'NEW')} END",
+        f"{name}_delete": f"AFTER DELETE ON {content} BEGIN {_delete(name, 'OLD')} END",
+        f"{name}_update": (
+            f"AFTER UPDATE OF {', '.join(columns)} ON {content} WHEN {changed} "
+            f"BEGIN {_delete(name, 'OLD')} {_insert(name, 'NEW')} END"
+        ),
+    }
+
+
+_TRIGGERS = {trigger: body for name in _INDEXES for trigger, body in _triggers(name).items()}
+
+
+def is_available(connection) -> bool:
+    return bool(connection.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar())
+
+
+def install_search_index(connection):
+    """
+    Creates the FTS5 tables and their triggers and builds the indexes from
+    the existing rows, unless the current definitions are already installed.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    if not is_available(connection):
+        logger.warning("SQLite was built without FTS5; searchMemory is disabled")
+        return
+    expected = {name: _create_table(name) for name in _INDEXES}
+    expected.update({name: f"CREATE TRIGGER {name} {body}" for name, body in _TRIGGERS.items()})
+    installed = dict(connection.execute(text(
+        "SELECT name, sql FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN ("
+        + ", ".join(f"'{name}'" for name in expected) + ")"
+    )).all())
+    if installed == expected:
+        return
+    for name in _TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    for name in _INDEXES:
+        connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        connection.execute(text(expected[name]))
+        connection.execute(text(f"INSERT INTO {name} ({name}) VALUES ('rebuild')"))
+    for name in _TRIGGERS:
+        connection.execute(text(expected[name]))
+
+
+def match_expression(query: str) -> str:
+    """
+    Turns free text into an FTS5 query that matches any of its words, so
+    that punctuation in agents' queries (e.g. "user-auth", "C++") is never
+    an FTS5 syntax error. A word ending in "*" matches as a prefix. Rows
+    that match more of the words rank higher.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        tokens = re.findall(r"\w+", word)
+        if tokens:
+            terms.append('"' + " ".join(tokens) + '"' + ("*" if prefix else ""))
+    return " OR ".join(terms)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _install_after_create(target, connection, **kw):
+    install_search_index(connection)
@@ -1,11 +1,162 @@
+from collections import deque
+from typing import List
+from sqlalchemy import insert, select, update
 from sqlalchemy.orm import Session
-from . import models, schemas, crud
+from . import config, models, schemas, crud, events
+from .database import begin_transaction
 import json
 
+def _commit(db: Session):
+    """
+    Commits the service's transaction. On a session in deferred-commit mode
+    (see app/group_commit.py) the changes are only flushed: the caller runs
+    each service call in a SAVEPOINT and commits a whole batch at once.
+    """
+    if db.info.get("deferred_commit"):
+        db.flush()
+    else:
+        db.commit()
+
+def _rollback(db: Session):
+    # In deferred-commit mode the caller rolls back to its SAVEPOINT.
+    if not db.info.get("deferred_commit"):
+        db.rollback()
+
+def _begin_write(db: Session):
+    """
+    Takes the write lock before anything is read, so what the service checks
+    cannot change before it writes. In deferred-commit mode the caller
+    already holds it.
+    """
+    if not db.info.get("deferred_commit"):
+        begin_transaction(db)
+
+# Statuses that only the agent working on a task reports
+_WORKER_STATUSES = ('RUNNING', 'COMPLETED')
+
+class TaskNotRunning(Exception):
+    """
+    The task's lease expired and it went back to PENDING, so the agent that
+    was working on it can no longer finish it or report progress on it,
+    until the task is started again. Other status changes, e.g. cancelling
+    it, are still allowed.
+    """
+
+    def __init__(self, task_id: str, status: str):
+        super().__init__(f"Task is {status}, not RUNNING; its lease may have expired")
+        self.task_id = task_id
+        self.status = status
+
+def create_task_chain(db: Session, tasks: List[schemas.TaskCreate]):
+    """
+    Atomically:
+    1. Validate the whole chain up front. Duplicate or existing task IDs,
+       dependencies on unknown tasks and dependency cycles raise ValueError
+       before anything is written.
+    2. Insert all tasks and their dependency edges with bulk statements.
+    3. Commit once.
+    """
+    task_ids = [task.task_id for task in tasks]
+    seen = set()
+    for task_id in task_ids:
+        if task_id in seen:
+            raise ValueError(f"Task ID '{task_id}' appears more than once in the chain.")
+        seen.add(task_id)
+
+    dependencies = {
+        task.task_id: list(dict.fromkeys(task.dependencies or [])) for task in tasks
+    }
+    referenced_ids = seen.union(*dependencies.values())
+    # The write lock is taken before the lookup, so a concurrent chain with
+    # the same IDs is validated after this one commits instead of failing
+    # at the INSERT.
+    _begin_write(db)
+    try:
+        # One round-trip covers both the duplicate check and the dependency lookup.
+        statuses = crud.get_task_statuses(db, referenced_ids)
+        for task_id in task_ids:
+            if task_id in statuses:
+                raise ValueError(f"Task with ID '{task_id}' already exists.")
+        unknown_ids = sorted(referenced_ids - seen - statuses.keys())
+        if unknown_ids:
+            raise ValueError(f"Unknown dependencies: {', '.join(unknown_ids)}")
+        _check_for_cycles(dependencies)
+    except ValueError:
+        _rollback(db)
+        raise
+
+    statuses.update((task.task_id, task.status) for task in tasks)
+    task_rows = [
+        {
+            **task.model_dump(exclude={'dependencies'}),
+            'unmet_dependencies': sum(
+                1 for dep_id in dependencies[task.task_id] if statuses[dep_id] != 'COMPLETED'
+            ),
+            # Tasks created RUNNING are leased like started ones.
+            'lease_expires_at': crud.new_lease_expiry() if task.status == 'RUNNING' else None,
+        }
+        for task in tasks
+    ]
+    edge_rows = [
+        {'task_id': task_id, 'depends_on_id': dep_id}
+        for task_id, dep_ids in dependencies.items()
+        for dep_id in dep_ids
+    ]
+
+    try:
+        completed_ids = [task.task_id for task in tasks if task.status == 'COMPLETED']
+        unblocked_task_ids = []
+        if completed_ids:
+            # Tasks that already referenced these IDs counted them as unmet.
+            unblocked_task_ids = crud.adjust_unmet_dependencies(db, completed_ids, -1)
+        if task_rows:
+            db.execute(insert(models.Task), task_rows)
+        if edge_rows:
+            db.execute(insert(models.TaskDependency), edge_rows)
+        for row in task_rows:
+            events.queue_event(db, events.CREATED, row['task_id'], row['status'])
+            if row['status'] == 'PENDING' and row['unmet_dependencies'] == 0:
+                events.queue_event(db, events.READY, row['task_id'], 'PENDING')
+        for task_id in unblocked_task_ids:
+            events.queue_event(db, events.READY, task_id, 'PENDING')
+        _commit(db)
+    except Exception as e:
+        _rollback(db)
+        raise e
+    return crud.get_tasks_by_ids(db, task_ids)
+
+def _check_for_cycles(dependencies):
+    """
+    Topologically sorts the tasks of a chain (Kahn's algorithm) and raises
+    ValueError if their dependencies form a cycle. Dependencies on tasks
+    outside the chain already exist and cannot be part of a cycle.
+    """
+    pending_counts = {task_id: 0 for task_id in dependencies}
+    dependents = {task_id: [] for task_id in dependencies}
+    for task_id, dep_ids in dependencies.items():
+        for dep_id in dep_ids:
+            if dep_id in dependencies:
+                pending_counts[task_id] += 1
+                dependents[dep_id].append(task_id)
+
+    queue = deque(task_id for task_id, count in pending_counts.items() if count == 0)
+    sorted_count = 0
+    while queue:
+        task_id = queue.popleft()
+        sorted_count += 1
+        for dependent_id in dependents[task_id]:
+            pending_counts[dependent_id] -= 1
+            if pending_counts[dependent_id] == 0:
+                queue.append(dependent_id)
+
+    if sorted_count < len(dependencies):
+        cyclic_ids = sorted(task_id for task_id, count in pending_counts.items() if count > 0)
+        raise ValueError(f"Dependency cycle detected; tasks that cannot be ordered: {', '.join(cyclic_ids)}")
+
 def start_work_on_task(db: Session, task_id: str):
     """
     Atomically:
-    1. Update task status to 'RUNNING'.
+    1. Update task status to 'RUNNING' and lease it.
     2. Create a 'STARTING' journal entry.
     """
     try:
@@ -15,7 +166,7 @@ def start_work_on_task(db: Session, task_id: str):
             return None # Or raise an exception
 
         # 2. Update status
-        db_task.status = 'RUNNING'
+        crud.set_task_status(db, db_task, 'RUNNING')
 
         # 3. Create journal entry
         journal_entry = schemas.JournalCreate(task_id=task_id, event_type='STARTING')
@@ -23,10 +174,169 @@ def start_work_on_task(db: Session, task_id: str):
         
         db.add(db_task)
         db.add(db_journal_entry)
+        events.queue_event(db, events.STARTED, task_id, 'RUNNING')
         
-        db.commit()
+        _commit(db)
         db.refresh(db_task)
         return db_task
+    except Exception as e:
+        _rollback(db)
+        raise e
+
+def claim_next_ready_tasks(db: Session, max_tasks: int = 1, assignee_role: str = None):
+    """
+    Atomically:
+    1. Pick up to `max_tasks` ready tasks in ready queue order (optionally
+       only for `assignee_role`; otherwise split across roles with
+       MEMORYBANK_FAIR_SHARE, see crud.plan_fair_share).
+    2. Update their status to 'RUNNING' and lease them.
+    3. Create a 'STARTING' journal entry for each of them.
+
+    Picking and marking happen in a single UPDATE statement, so two
+    concurrent callers can never claim the same task. The write lock is
+    taken before the fair-share plan is read, so the plan cannot go stale
+    before the claim and the claim waits for other writers rather than
+    failing to upgrade a read transaction.
+    """
+    try:
+        _begin_write(db)
+        if assignee_role is not None:
+            batches = [(models.Task.assignee_role == assignee_role, max_tasks)]
+        elif config.FAIR_SHARE:
+            batches = [
+                (crud.role_condition(role), count)
+                for role, count in crud.plan_fair_share(db, max_tasks).items()
+            ]
+        else:
+            batches = [(None, max_tasks)]
+
+        claimed_ids = []
+        for role_condition, count in batches:
+            ready_tasks = select(models.Task.task_id).where(
+                models.Task.status == 'PENDING',
+                models.Task.unmet_dependencies == 0
+            )
+            if role_condition is not None:
+                ready_tasks = ready_tasks.where(role_condition)
+            ready_tasks = ready_tasks.order_by(*crud.READY_QUEUE_ORDER).limit(count)
+            claimed_ids += db.execute(
+                update(models.Task)
+                .where(models.Task.task_id.in_(ready_tasks), models.Task.status == 'PENDING')
+                .values(status='RUNNING', lease_expires_at=crud.new_lease_expiry())
+                .returning(models.Task.task_id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+        if not claimed_ids:
+            _rollback(db)
+            return []
+
+        # One multi-row INSERT for all journal entries
+        db.execute(insert(models.Journal), [
+            schemas.JournalCreate(task_id=task_id, event_type='STARTING').model_dump()
+            for task_id in claimed_ids
+        ])
+        for task_id in claimed_ids:
+            events.queue_event(db, events.STARTED, task_id, 'RUNNING')
+
+        _commit(db)
+        return db.query(models.Task).filter(
+            models.Task.task_id.in_(claimed_ids)
+        ).order_by(*crud.READY_QUEUE_ORDER).all()
+    except Exception as e:
+        _rollback(db)
+        raise e
+
+def heartbeat_task(db: Session, task_id: str):
+    """
+    Extends the lease of a RUNNING task. Returns (task_id, lease_expires_at),
+    or None if the task does not exist or is not RUNNING, e.g. because its
+    lease already expired.
+    """
+    try:
+        lease = crud.extend_lease(db, task_id)
+        if lease is None:
+            _rollback(db)
+            return None
+        _commit(db)
+        return lease
+    except Exception as e:
+        _rollback(db)
+        raise e
+
+def expire_leases(db: Session, now=None, limit: int = 500):
+    """
+    Atomically:
+    1. Return up to `limit` RUNNING tasks whose lease has expired to 'PENDING'.
+    2. Create a 'LEASE_EXPIRED' journal entry for each of them.
+    Returns the IDs of the expired tasks.
+    """
+    try:
+        expired = crud.expire_leases(db, now or crud.utcnow(), limit)
+        if not expired:
+            _rollback(db)
+            return []
+
+        db.execute(insert(models.Journal), [
+            schemas.JournalCreate(task_id=task_id, event_type='LEASE_EXPIRED').model_dump()
+            for task_id, _ in expired
+        ])
+        for task_id, unmet_dependencies in expired:
+            events.queue_event(db, events.STATUS_UPDATED, task_id, 'PENDING')
+            if unmet_dependencies == 0:
+                events.queue_event(db, events.READY, task_id, 'PENDING')
+
+        _commit(db)
+        return [task_id for task_id, _ in expired]
+    except Exception as e:
+        _rollback(db)
+        raise e
+
+def compact_journal(db: Session, statuses, keep: int, limit: int, archive):
+    """
+    Moves up to `limit` journal entries that the retention policy no longer
+    keeps (see crud.get_compactable_journal_entries) out of the journal:
+    1. Read them without taking the write lock and pass them to `archive`,
+       which has to store them durably before it returns.
+    2. Atomically delete them and add them to their tasks' journal summaries.
+    Returns the deleted (id, task_id, event_type, timestamp) rows; entries
+    deleted meanwhile by another compactor are archived twice but counted once.
+    """
+    try:
+        rows = crud.get_compactable_journal_entries(db, statuses, keep, limit)
+        db.rollback()
+        if not rows:
+            return []
+        archive(rows)
+
+        begin_transaction(db)
+        deleted = crud.delete_journal_entries(db, [row[0] for row in rows])
+        crud.add_to_journal_summaries(db, deleted)
+        db.commit()
+        return deleted
+    except Exception as e:
+        db.rollback()
+        raise e
+
+def restore_journal_entries(db: Session, entries):
+    """
+    Atomically:
+    1. Insert archived journal entries back with their original IDs; entries
+       already in the journal, or of tasks that no longer exist, are skipped.
+    2. Take the restored entries out of their tasks' journal summaries.
+    3. Set the tasks' last_event from their newest entry again.
+    Returns the number of entries restored.
+    """
+    try:
+        begin_transaction(db)
+        restored = [
+            (entry["id"], entry["task_id"], entry["event_type"], entry["timestamp"])
+            for entry in entries if crud.restore_journal_entry(db, entry)
+        ]
+        if restored:
+            crud.remove_from_journal_summaries(db, restored)
+            crud.refresh_last_events(db, {row[1] for row in restored})
+        db.commit()
+        return len(restored)
     except Exception as e:
         db.rollback()
         raise e
@@ -34,45 +344,70 @@ def start_work_on_task(db: Session, task_id: str):
 def update_task_status(db: Session, task_id: str, status: str, context_message: str = None):
     """
     Atomically:
-    1. Update task status.
+    1. Update task status; raises TaskNotRunning for RUNNING or COMPLETED
+       if the task's lease expired since it was last started.
     2. If context_message is provided, append it to the 'active_context'.
     """
     try:
+        _begin_write(db)
         db_task = crud.get_task(db, task_id=task_id)
         if not db_task:
+            _rollback(db)
             return None
+        # The agent that was working on it is too late: it was put back
+        # because its lease expired.
+        if (status in _WORKER_STATUSES and db_task.status != 'RUNNING'
+                and db_task.last_event == 'LEASE_EXPIRED'):
+            raise TaskNotRunning(task_id, db_task.status)
 
-        db_task.status = status
+        previous_status = db_task.status
+        unblocked_task_ids = crud.set_task_status(db, db_task, status)
         db.add(db_task)
+        events.queue_event(db, events.STATUS_UPDATED, task_id, status)
+        if status == 'PENDING' and previous_status != 'PENDING' and db_task.unmet_dependencies == 0:
+            events.queue_event(db, events.READY, task_id, status)
+        for unblocked_task_id in unblocked_task_ids:
+            events.queue_event(db, events.READY, unblocked_task_id, 'PENDING')
 
         if context_message:
-            crud.append_project_context(
+            crud.add_project_context_segment(
                 db=db,
                 key="active_context",
-                content_to_append=f"Context for task {task_id} (status: {status}): {context_message}"
+                content=f"Context for task {task_id} (status: {status}): {context_message}"
             )
         
-        db.commit()
+        _commit(db)
         db.refresh(db_task)
         return db_task
     except Exception as e:
-        db.rollback()
+        _rollback(db)
         raise e
 
 def finish_work_on_task(db: Session, task_id: str):
     """
     Atomically:
     1. Update task status to 'COMPLETED'.
-    2. Create a 'FINISHED' journal entry.
+    2. Decrement the unmet dependency counts of its dependents.
+    3. Create a 'FINISHED' journal entry.
+    Returns the task and the IDs of the dependents that became ready, or
+    (None, []) if the task does not exist. Raises TaskNotRunning if the
+    task's lease expired since it was last started.
     """
     try:
         # 1. Find the task
+        _begin_write(db)
         db_task = crud.get_task(db, task_id=task_id)
         if not db_task:
-            return None # Or raise an exception
+            _rollback(db)
+            return None, []
+        # The agent that was working on it is too late: it was put back
+        # because its lease expired.
+        if db_task.status != 'RUNNING' and db_task.last_event == 'LEASE_EXPIRED':
+            raise TaskNotRunning(task_id, db_task.status)
 
-        # 2. Update status
-        db_task.status = 'COMPLETED'
+        # 2. Update status; this walks the reverse dependencies and reports
+        # the tasks it unblocked.
+        unblocked_task_ids = crud.set_task_status(db, db_task, 'COMPLETED')
 
         # 3. Create journal entry
         journal_entry = schemas.JournalCreate(task_id=task_id, event_type='FINISHED')
@@ -80,10 +415,40 @@ def finish_work_on_task(db: Session, task_id: str):
         
         db.add(db_task)
         db.add(db_journal_entry)
+        events.queue_event(db, events.FINISHED, task_id, 'COMPLETED')
+        for unblocked_task_id in unblocked_task_ids:
+            events.queue_event(db, events.READY, unblocked_task_id, 'PENDING')
         
-        db.commit()
+        _commit(db)
         db.refresh(db_task)
-        return db_task
+        return db_task, unblocked_task_ids
     except Exception as e:
-        db.rollback()
+        _rollback(db)
+        raise e
+
+def append_project_context(db: Session, key: str, content: str):
+    """
+    Atomically appends `content` to a context key as a new segment.
+    """
+    try:
+        db_segment = crud.add_project_context_segment(db, key, content)
+        _commit(db)
+        db.refresh(db_segment)
+        return db_segment
+    except Exception as e:
+        _rollback(db)
+        raise e
+
+def update_project_context(db: Session, context: schemas.ProjectContextCreate):
+    """
+    Atomically replaces the value of a context key, dropping its appended
+    segments.
+    """
+    try:
+        db_context = crud.set_project_context(db, context)
+        _commit(db)
+        db.refresh(db_context)
+        return db_context
+    except Exception as e:
+        _rollback(db)
         raise e
\ No newline at end of file
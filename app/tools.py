@@ -0,0 +1,378 @@
+"""
+Synchronous implementations of the MCP tools.
+
+Each function takes a Session and the tool's payload and returns the response
+schema. Responses are built before returning, while the session can still
+load what they need, so app/main.py can run these functions either in the
+threadpool (sync mode) or on an AsyncSession via aio.run_db (async mode).
+"""
+import json
+from contextlib import nullcontext
+from datetime import timezone
+from typing import List, Optional
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import config, crud, events, graph, models, schemas, search, services
+from .database import begin_transaction
+
+
+def _task_responses(db: Session, tasks) -> List[schemas.Task]:
+    """
+    Builds Task DTOs from loaded tasks. Dependencies and the newest journal
+    entries of all of them are read with one query each; the ORM objects'
+    relationships are never loaded or modified.
+    """
+    task_ids = [task.task_id for task in tasks]
+    dependencies = crud.get_dependency_ids(db, task_ids)
+    journals = crud.get_recent_journal_entries(db, task_ids, config.TASK_JOURNAL_LIMIT)
+    responses = []
+    for task in tasks:
+        entries, total = journals.get(task.task_id, ([], 0))
+        responses.append(schemas.Task(
+            task_id=task.task_id,
+            description=task.description,
+            details=task.details,
+            type=task.type,
+            status=task.status,
+            dependencies=dependencies.get(task.task_id, []),
+            assignee_role=task.assignee_role,
+            priority=task.priority,
+            created_at=task.created_at,
+            updated_at=task.updated_at,
+            journal_entries=[schemas.Journal.model_validate(entry, from_attributes=True) for entry in entries],
+            journal_entry_count=total,
+            lease_expires_at=task.lease_expires_at,
+        ))
+    return responses
+
+def _task_response(db: Session, task) -> schemas.Task:
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return _task_responses(db, [task])[0]
+
+# -------------------
+# Orchestrator-Architect Tools
+# -------------------
+
+def create_task_chain(db: Session, payload: schemas.TaskChainCreate) -> List[schemas.Task]:
+    try:
+        tasks = services.create_task_chain(db, payload.tasks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _task_responses(db, tasks)
+
+def get_next_ready_task(db: Session, payload: schemas.ReadyTaskQuery) -> Optional[schemas.NextReadyTask]:
+    db_task = crud.get_next_ready_task(db, assignee_role=payload.assignee_role)
+    if db_task is None:
+        return None
+    return schemas.NextReadyTask.model_validate(db_task, from_attributes=True)
+
+def poll_ready_task(db: Session, assignee_role: Optional[str] = None) -> Optional[schemas.NextReadyTask]:
+    """
+    get_next_ready_task for waitForReadyTask. Ends the read transaction
+    afterwards, so the session holds no connection (or stale snapshot) while
+    the caller waits for the next event.
+    """
+    try:
+        return get_next_ready_task(db, schemas.ReadyTaskQuery(assignee_role=assignee_role))
+    finally:
+        db.rollback()
+
+# -------------------
+# General Agent Tools
+# -------------------
+
+def get_task_details(db: Session, payload: schemas.TaskIdPayload) -> schemas.Task:
+    return _task_response(db, crud.get_task(db, task_id=payload.task_id))
+
+def get_task_journal(db: Session, payload: schemas.TaskJournalQuery) -> schemas.TaskJournalPage:
+    if not crud.get_task_statuses(db, [payload.task_id]):
+        raise HTTPException(status_code=404, detail="Task not found")
+    entries = crud.get_journal_page(db, payload.task_id, payload.limit + 1, payload.before_id)
+    page = [schemas.Journal.model_validate(entry, from_attributes=True) for entry in entries[:payload.limit]]
+    if len(entries) > payload.limit:
+        return schemas.TaskJournalPage(entries=page, next_before_id=page[-1].id)
+    summary = crud.get_journal_summary(db, payload.task_id)
+    archived = None
+    if summary is not None:
+        archived = schemas.JournalSummary(
+            archived_entries=summary.archived_entries,
+            event_counts=json.loads(summary.event_counts),
+            first_timestamp=summary.first_timestamp,
+            last_timestamp=summary.last_timestamp,
+        )
+    return schemas.TaskJournalPage(entries=page, archived=archived)
+
+def get_inconsistent_tasks(db: Session, payload: schemas.InconsistentTasksQuery) -> schemas.InconsistentTaskList:
+    rows = crud.get_inconsistent_tasks(db, payload.limit + 1, payload.after_task_id)
+    page = [
+        schemas.InconsistentTask(task_id=task_id, status=status, last_event=last_event)
+        for task_id, status, last_event in rows[:payload.limit]
+    ]
+    next_after_task_id = page[-1].task_id if len(rows) > payload.limit else None
+    return schemas.InconsistentTaskList(inconsistent_tasks=page, next_after_task_id=next_after_task_id)
+
+def _graph_nodes(subgraph: graph.Subgraph, distances, limit: int) -> List[schemas.TaskGraphNode]:
+    nearest = sorted(
+        (distance, task_id) for task_id, distance in distances.items() if distance > 0
+    )[:limit]
+    return [
+        schemas.TaskGraphNode(
+            task_id=task_id,
+            status=subgraph.tasks[task_id][0],
+            distance=distance,
+            dependencies=subgraph.dependencies[task_id],
+        )
+        for distance, task_id in nearest
+    ]
+
+def get_task_graph(db: Session, payload: schemas.TaskGraphQuery) -> schemas.TaskGraph:
+    # One task more than max_tasks tells whether there are more.
+    ancestors, ancestors_truncated = graph.walk(
+        crud.get_task_graph_rows(db, payload.task_id, "ancestors", payload.max_tasks + 1),
+        "ancestors", payload.task_id, payload.max_tasks,
+    )
+    status = ancestors.tasks[payload.task_id][0]
+    if status is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    descendants, descendants_truncated = graph.walk(
+        crud.get_task_graph_rows(db, payload.task_id, "descendants", payload.max_tasks + 1),
+        "descendants", payload.task_id, payload.max_tasks,
+    )
+    ancestor_distances = ancestors.distances(payload.task_id)
+    descendant_distances = descendants.distances(payload.task_id)
+    critical_path = graph.critical_path(payload.task_id, ancestors, descendants)
+    return schemas.TaskGraph(
+        task_id=payload.task_id,
+        status=status,
+        ancestors=_graph_nodes(ancestors, ancestor_distances, payload.limit),
+        ancestor_count=len(ancestor_distances) - 1,
+        ancestors_truncated=ancestors_truncated,
+        descendants=_graph_nodes(descendants, descendant_distances, payload.limit),
+        descendant_count=len(descendant_distances) - 1,
+        descendants_truncated=descendants_truncated,
+        critical_path=critical_path[:payload.limit],
+        critical_path_length=len(critical_path),
+        ready_frontier=graph.ready_frontier(ancestors, descendants)[:payload.limit],
+    )
+
+def _parse_task_cursor(cursor: str):
+    updated_key, separator, task_id = cursor.partition("|")
+    if not separator or not updated_key:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return updated_key, task_id
+
+def list_tasks(db: Session, payload: schemas.ListTasksQuery) -> schemas.TaskList:
+    fields = payload.fields if payload.fields is not None else schemas.TASK_LIST_FIELDS
+    columns = [getattr(models.Task, field) for field in fields if field != "dependencies"]
+    updated_since = None
+    if payload.updated_since is not None:
+        # updated_at is stored as naive UTC text
+        since = payload.updated_since
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        updated_since = since.isoformat(sep=" ")
+    rows = crud.list_tasks(
+        db,
+        columns,
+        payload.limit + 1,
+        status=payload.status,
+        type=payload.type,
+        assignee_role=payload.assignee_role,
+        updated_since=updated_since,
+        after=_parse_task_cursor(payload.cursor) if payload.cursor else None,
+        ascending=payload.order == "asc",
+    )
+    page = rows[:payload.limit]
+    dependencies = {}
+    if "dependencies" in fields:
+        dependencies = crud.get_dependency_ids(db, [row.task_id for row in page])
+    tasks = []
+    for row in page:
+        item = {field: getattr(row, field) for field in fields if field != "dependencies"}
+        if "dependencies" in fields:
+            item["dependencies"] = dependencies.get(row.task_id, [])
+        tasks.append(schemas.TaskListItem(task_id=row.task_id, updated_at=row.updated_key, **item))
+    next_cursor = f"{page[-1].updated_key}|{page[-1].task_id}" if len(rows) > payload.limit else None
+    return schemas.TaskList(tasks=tasks, next_cursor=next_cursor)
+
+def search_memory(db: Session, payload: schemas.SearchMemoryQuery) -> schemas.SearchResults:
+    match = search.match_expression(payload.query)
+    if not match:
+        return schemas.SearchResults(hits=[])
+    try:
+        rows = crud.search_memory(db, match, payload.kinds, payload.limit, payload.snippet_tokens)
+    except OperationalError as e:
+        if "no such table" not in str(e):
+            raise
+        # search.install_search_index skipped the indexes
+        raise HTTPException(status_code=503, detail="Full-text search is unavailable: SQLite lacks FTS5")
+    return schemas.SearchResults(hits=[
+        schemas.SearchHit(kind=kind, task_id=task_id, key=key, seq=seq, snippet=snippet, score=-rank)
+        for kind, task_id, key, seq, snippet, rank in rows
+    ])
+
+def update_task_status(db: Session, payload: schemas.TaskStatusUpdate) -> schemas.Task:
+    try:
+        db_task = services.update_task_status(
+            db,
+            task_id=payload.task_id,
+            status=payload.status,
+            context_message=payload.context_message
+        )
+    except services.TaskNotRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _task_response(db, db_task)
+
+# -------------------
+# Transactional Tools (for Developer)
+# -------------------
+
+def start_work_on_task(db: Session, payload: schemas.TaskIdPayload) -> schemas.Task:
+    return _task_response(db, services.start_work_on_task(db, task_id=payload.task_id))
+
+def finish_work_on_task(db: Session, payload: schemas.TaskIdPayload) -> schemas.FinishedTask:
+    try:
+        db_task, unblocked_task_ids = services.finish_work_on_task(db, task_id=payload.task_id)
+    except services.TaskNotRunning as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    task = _task_response(db, db_task)
+    return schemas.FinishedTask(**task.model_dump(), unblocked_task_ids=unblocked_task_ids)
+
+def heartbeat_task(db: Session, payload: schemas.TaskIdPayload) -> schemas.TaskLease:
+    lease = services.heartbeat_task(db, payload.task_id)
+    if lease is None:
+        statuses = crud.get_task_statuses(db, [payload.task_id])
+        if not statuses:
+            raise HTTPException(status_code=404, detail="Task not found")
+        raise HTTPException(
+            status_code=409,
+            detail=f"Task is {statuses[payload.task_id]}, not RUNNING; its lease may have expired"
+        )
+    task_id, lease_expires_at = lease
+    return schemas.TaskLease(task_id=task_id, lease_expires_at=lease_expires_at)
+
+def claim_next_ready_task(db: Session, payload: schemas.ClaimTasksPayload) -> List[schemas.Task]:
+    tasks = services.claim_next_ready_tasks(
+        db,
+        max_tasks=payload.max_tasks,
+        assignee_role=payload.assignee_role
+    )
+    return _task_responses(db, tasks)
+
+# -------------------
+# Context Tools (for Guardian/Developer)
+# -------------------
+
+def get_system_patterns(db: Session, payload: schemas.SystemPatternsQuery) -> schemas.SystemPatterns:
+    if payload.if_none_match is not None:
+        etag = crud.get_project_context_cursor(db, key="system_patterns")
+        if payload.if_none_match == etag:
+            return schemas.SystemPatterns(patterns="", etag=etag, not_modified=True)
+    patterns, etag, _ = crud.read_project_context(db, key="system_patterns")
+    return schemas.SystemPatterns(patterns=patterns, etag=etag)
+
+def get_active_context(db: Session, payload: schemas.ActiveContextQuery) -> schemas.ActiveContextRead:
+    context, cursor, not_modified = crud.read_project_context(
+        db,
+        key="active_context",
+        since=payload.since,
+        last_segments=payload.last_segments,
+        max_bytes=payload.max_bytes
+    )
+    return schemas.ActiveContextRead(context=context, cursor=cursor, not_modified=not_modified)
+
+def update_system_patterns(db: Session, payload: schemas.SystemPatternsUpdate) -> schemas.ProjectContext:
+    context_to_update = schemas.ProjectContextCreate(key="system_patterns", value=payload.patterns)
+    db_context = services.update_project_context(db, context=context_to_update)
+    return schemas.ProjectContext.model_validate(db_context, from_attributes=True)
+
+def append_active_context(db: Session, payload: schemas.ActiveContext) -> schemas.ContextSegment:
+    db_segment = services.append_project_context(db, key="active_context", content=payload.context)
+    return schemas.ContextSegment.model_validate(db_segment, from_attributes=True)
+
+
+# -------------------
+# Batch
+# -------------------
+
+# operation_id -> (payload schema or None, function, whether it writes)
+TOOLS = {
+    "createTaskChain": (schemas.TaskChainCreate, create_task_chain, True),
+    "getNextReadyTask": (schemas.ReadyTaskQuery, get_next_ready_task, False),
+    "getTaskDetails": (schemas.TaskIdPayload, get_task_details, False),
+    "getTaskJournal": (schemas.TaskJournalQuery, get_task_journal, False),
+    "getInconsistentTasks": (schemas.InconsistentTasksQuery, get_inconsistent_tasks, False),
+    "listTasks": (schemas.ListTasksQuery, list_tasks, False),
+    "getTaskGraph": (schemas.TaskGraphQuery, get_task_graph, False),
+    "searchMemory": (schemas.SearchMemoryQuery, search_memory, False),
+    "startWorkOnTask": (schemas.TaskIdPayload, start_work_on_task, True),
+    "finishWorkOnTask": (schemas.TaskIdPayload, finish_work_on_task, True),
+    "claimNextReadyTask": (schemas.ClaimTasksPayload, claim_next_ready_task, True),
+    "heartbeatTask": (schemas.TaskIdPayload, heartbeat_task, True),
+    "updateTaskStatus": (schemas.TaskStatusUpdate, update_task_status, True),
+    "getSystemPatterns": (schemas.SystemPatternsQuery, get_system_patterns, False),
+    "getActiveContext": (schemas.ActiveContextQuery, get_active_context, False),
+    "updateSystemPatterns": (schemas.SystemPatternsUpdate, update_system_patterns, True),
+    "appendActiveContext": (schemas.ActiveContext, append_active_context, True),
+}
+
+def _call_tool(db: Session, call: schemas.ToolCall):
+    if call.tool not in TOOLS:
+        raise HTTPException(status_code=404, detail=f"Unknown tool '{call.tool}'")
+    payload_schema, fn, _ = TOOLS[call.tool]
+    if payload_schema is None:
+        return fn(db)
+    return fn(db, payload_schema.model_validate(call.arguments))
+
+def _call_error(e: Exception) -> schemas.ToolCallError:
+    if isinstance(e, HTTPException):
+        return schemas.ToolCallError(status_code=e.status_code, detail=e.detail)
+    if isinstance(e, ValidationError):
+        return schemas.ToolCallError(status_code=422, detail=jsonable_encoder(e.errors(include_url=False)))
+    return schemas.ToolCallError(status_code=500, detail=str(e))
+
+def batch(db: Session, payload: schemas.BatchRequest) -> schemas.BatchResponse:
+    """
+    Runs the calls in order on one session and one database transaction.
+    Later calls see the writes of earlier ones. Services only flush
+    (deferred-commit mode) and the transaction is committed once at the end.
+    Non-atomic batches run each call in a SAVEPOINT so a failed call is
+    rolled back alone.
+    """
+    writes = any(TOOLS.get(call.tool, (None, None, False))[2] for call in payload.calls)
+    db.info["deferred_commit"] = True
+    results = []
+    failed = False
+    try:
+        begin_transaction(db, immediate=writes)
+        for call in payload.calls:
+            if failed and payload.atomic:
+                results.append(schemas.ToolCallResult(tool=call.tool, ok=False, error=schemas.ToolCallError(
+                    status_code=424, detail="Not run: an earlier call in the atomic batch failed."
+                )))
+                continue
+            queued_events = events.pending_count(db)
+            try:
+                with nullcontext() if payload.atomic else db.begin_nested():
+                    result = _call_tool(db, call)
+                results.append(schemas.ToolCallResult(tool=call.tool, ok=True, result=jsonable_encoder(result)))
+            except Exception as e:
+                events.discard_since(db, queued_events)
+                results.append(schemas.ToolCallResult(tool=call.tool, ok=False, error=_call_error(e)))
+                failed = True
+        committed = not (failed and payload.atomic)
+        if committed:
+            db.commit()
+        else:
+            db.rollback()
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.info.pop("deferred_commit", None)
+    return schemas.BatchResponse(results=results, committed=committed)
\ No newline at end of file
@@ -0,0 +1,202 @@
+"""
+Streaming NDJSON export and import of the whole memory bank.
+
+An export is a header line followed by one line per row of the tables
+below, table by table and in primary key order:
+
+    {"format": "memorybank", "version": 1}
+    {"table": "tasks", "row": {"task_id": "T1", "status": "PENDING", ...}}
+
+Timestamps are written as stored, so an import reproduces the database
+exactly. Both directions stream in batches and keep memory constant,
+however many journal rows there are:
+- Exports run in one read transaction, so they are a consistent snapshot
+  while agents keep writing. Rows are fetched `batch_size` at a time as
+  SQLite steps through the statement (yield_per), and each batch is sent as
+  one chunk. The read transaction holds back WAL checkpoints until it ends.
+- Imports go into an empty memory bank, in one write transaction of bulk
+  INSERTs of `batch_size` rows, so a failed import leaves nothing behind.
+  The usual triggers run: the metrics counters, the full-text indexes and
+  tasks.last_event / journal_events follow the imported rows. The write
+  lock is held for the whole import, so POST /import first receives the
+  body in full (spooled to a temp file beyond SPOOL_BYTES); only the
+  inserts themselves block other writers.
+
+Over HTTP: GET /export and POST /import. From the command line (".gz"
+files are compressed, "-" is stdin / stdout):
+
+    python -m app.transfer export memorybank.ndjson.gz
+    MEMORYBANK_DATABASE_URL=sqlite:///./copy.db python -m app.transfer import memorybank.ndjson.gz
+"""
+import argparse
+import gzip
+import json
+import sys
+
+from sqlalchemy import TIMESTAMP, String, exists, select, text, type_coerce
+from sqlalchemy.exc import IntegrityError
+
+from . import migrations, models
+from .cache import context_cache
+from .database import SessionLocal, begin_transaction, engine
+
+FORMAT = "memorybank"
+VERSION = 1
+
+# Bytes of an uploaded import kept in memory before it is spooled to disk
+SPOOL_BYTES = 8 * 1024 * 1024
+
+# In dependency order: rows only refer to rows of the tables before them.
+TABLES = {
+    model.__tablename__: model.__table__
+    for model in (
+        models.ProjectContext, models.ProjectContextSegment, models.Task,
+        models.TaskDependency, models.Journal, models.JournalSummary,
+    )
+}
+
+# Recomputed by the journal triggers as the journal is imported
+_DERIVED_COLUMNS = {"tasks": {"journal_events"}}
+
+
+class MemoryBankNotEmpty(Exception):
+    pass
+
+
+def _exported_columns(table):
+    # Stored text rather than datetimes, so timestamps import unchanged.
+    return [
+        type_coerce(column, String).label(column.name) if isinstance(column.type, TIMESTAMP) else column
+        for column in table.columns
+    ]
+
+
+def export_lines(db, batch_size: int = 5000):
+    """
+    Yields the memory bank as NDJSON, one string of up to `batch_size`
+    lines at a time.
+    """
+    begin_transaction(db, immediate=False)
+    try:
+        yield json.dumps({"format": FORMAT, "version": VERSION}) + "\n"
+        for name, table in TABLES.items():
+            result = db.execute(
+                select(*_exported_columns(table)).order_by(*table.primary_key.columns),
+                execution_options={"yield_per": batch_size},
+            )
+            for rows in result.partitions():
+                yield "".join(json.dumps({"table": name, "row": row._asdict()}) + "\n" for row in rows)
+    finally:
+        db.rollback()
+
+
+def is_empty(db) -> bool:
+    return not any(db.execute(select(exists().select_from(table))).scalar() for table in TABLES.values())
+
+
+def _insert(db, name: str, rows):
+    table = TABLES[name]
+    derived = _DERIVED_COLUMNS.get(name, ())
+    columns = [column.name for column in table.columns if column.name in rows[0] and column.name not in derived]
+    # Column names come from the table definition, never from the input.
+    try:
+        db.execute(
+            text(f"INSERT INTO {name} ({', '.join(columns)}) VALUES ({', '.join(':' + column for column in columns)})"),
+            [{column: row.get(column) for column in columns} for row in rows],
+        )
+    except IntegrityError as e:
+        raise ValueError(f"Rows of {name} could not be imported: {e.orig}") from None
+
+
+def import_lines(db, lines, batch_size: int = 5000):
+    """
+    Imports an export, given as an iterable of its lines, into an empty
+    memory bank. Returns {table: rows imported}.
+
+    Raises MemoryBankNotEmpty if the memory bank already has data and
+    ValueError if the input is not an export; nothing is imported then.
+    """
+    lines = iter(lines)
+    try:
+        begin_transaction(db)
+        if not is_empty(db):
+            raise MemoryBankNotEmpty("The memory bank is not empty")
+        header = _parse(next(lines, ""), 1)
+        if header.get("format") != FORMAT or header.get("version") != VERSION:
+            raise ValueError(f"Not a {FORMAT} export of version {VERSION}")
+
+        counts = dict.fromkeys(TABLES, 0)
+        name, batch = None, []
+        for number, line in enumerate(lines, 2):
+            if not line.strip():
+                continue
+            record = _parse(line, number)
+            row = record.get("row")
+            if record.get("table") not in TABLES or not isinstance(row, dict):
+                raise ValueError(f"Line {number}: expected a row of one of {', '.join(TABLES)}")
+            if batch and (record["table"] != name or len(batch) == batch_size):
+                _insert(db, name, batch)
+                counts[name] += len(batch)
+                batch = []
+            name = record["table"]
+            batch.append(row)
+        if batch:
+            _insert(db, name, batch)
+            counts[name] += len(batch)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+    # Values cached for cursors of the previous contents would be stale.
+    context_cache.clear()
+    return counts
+
+
+def _parse(line, number: int) -> dict:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        raise ValueError(f"Line {number}: not valid JSON") from None
+    if not isinstance(record, dict):
+        raise ValueError(f"Line {number}: expected a JSON object")
+    return record
+
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return (sys.stdin if "r" in mode else sys.stdout).buffer
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.transfer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write the memory bank to an NDJSON file")
+    export.add_argument("file", nargs="?", default="-")
+    load = commands.add_parser("import", help="Load an NDJSON export into an empty memory bank")
+    load.add_argument("file", nargs="?", default="-")
+    args = parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=engine)
+    migrations.run_migrations(engine)
+    db = SessionLocal()
+    try:
+        if args.command == "export":
+            output = _open(args.file, "wb")
+            for chunk in export_lines(db):
+                output.write(chunk.encode())
+            output.flush()
+            if output is not sys.stdout.buffer:
+                output.close()
+        else:
+            with _open(args.file, "rb") as source:
+                counts = import_lines(db, (line.decode() for line in source))
+            print(", ".join(f"{name}: {count}" for name, count in counts.items()), file=sys.stderr)
+    except (MemoryBankNotEmpty, ValueError) as e:
+        sys.exit(f"{args.command} failed: {e}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Load test comparing the sync and async database modes (MEMORYBANK_DB_MODE).
+
+For each mode a local uvicorn server is started on a fresh database seeded
+with a task chain, system patterns and active context. Clients then issue a
+read-heavy agent mix (getTaskDetails, getSystemPatterns, getActiveContext,
+getNextReadyTask) at each concurrency level, and requests/sec plus p50/p99
+latency are reported.
+
+Usage:
+    python -m benchmarks.bench_async_vs_sync [--concurrency 50 200 1000] [--calls 10]
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from benchmarks.common import local_server, percentile, run_clients
+
+SEED_TASKS = 200
+
+
+def seed(base_url):
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        client.post("/tools/createTaskChain", json={"tasks": [
+            {"task_id": f"TASK-{i:04d}", "description": f"Task {i}", "type": "CODE",
+             "dependencies": [f"TASK-{i - 1:04d}"] if i % 10 else []}
+            for i in range(SEED_TASKS)
+        ]}).raise_for_status()
+        client.post("/tools/updateSystemPatterns", json={"patterns": "Follow PEP 8.\n" * 50}).raise_for_status()
+        for i in range(20):
+            client.post("/tools/appendActiveContext", json={"context": f"Report {i}"}).raise_for_status()
+
+
+def agent_call(client, i):
+    operation = i % 4
+    if operation == 0:
+        return client.post("/tools/getTaskDetails", json={"task_id": f"TASK-{i % SEED_TASKS:04d}"})
+    if operation == 1:
+        return client.post("/tools/getSystemPatterns", json={})
+    if operation == 2:
+        return client.post("/tools/getActiveContext", json={})
+    return client.post("/tools/getNextReadyTask", json={})
+
+
+def run(modes, concurrency_levels, calls_per_client):
+    print(f"{'mode':>6} {'clients':>8} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    for mode in modes:
+        with local_server(env={"MEMORYBANK_DB_MODE": mode}) as base_url:
+            seed(base_url)
+            for concurrency in concurrency_levels:
+                latencies, elapsed, errors = asyncio.run(
+                    run_clients(base_url, concurrency, calls_per_client, agent_call)
+                )
+                print(f"{mode:>6} {concurrency:>8} {len(latencies) / elapsed:10.1f} "
+                      f"{percentile(latencies, 50):10.1f} {percentile(latencies, 99):10.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--calls", type=int, default=10, help="Calls per client at each level.")
+    args = parser.parse_args()
+    run(args.modes, args.concurrency, args.calls)
+
+
+if __name__ == "__main__":
+    main()
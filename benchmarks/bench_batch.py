@@ -0,0 +1,73 @@
+"""
+Latency of a standard agent turn (startWorkOnTask, getTaskDetails,
+getSystemPatterns, getActiveContext) sent as four separate requests versus
+one /tools/batch request.
+
+Usage:
+    python -m benchmarks.bench_batch [--concurrency 1 20] [--turns 50]
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from benchmarks.common import local_server, percentile, run_clients
+
+
+def seed(base_url, count):
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        client.post("/tools/createTaskChain", json={"tasks": [
+            {"task_id": f"TASK-{i:05d}", "description": f"Task {i}", "type": "CODE"}
+            for i in range(count)
+        ]}).raise_for_status()
+        client.post("/tools/updateSystemPatterns", json={"patterns": "Follow PEP 8.\n" * 50}).raise_for_status()
+        for i in range(20):
+            client.post("/tools/appendActiveContext", json={"context": f"Report {i}"}).raise_for_status()
+
+
+def turn_calls(i):
+    task_id = f"TASK-{i:05d}"
+    return [
+        ("startWorkOnTask", {"task_id": task_id}),
+        ("getTaskDetails", {"task_id": task_id}),
+        ("getSystemPatterns", {}),
+        ("getActiveContext", {"last_segments": 10}),
+    ]
+
+
+async def separate_turn(client, i):
+    for tool, arguments in turn_calls(i):
+        response = await client.post(f"/tools/{tool}", json=arguments)
+        response.raise_for_status()
+    return response
+
+
+async def batched_turn(client, i):
+    return await client.post("/tools/batch", json={
+        "calls": [{"tool": tool, "arguments": arguments} for tool, arguments in turn_calls(i)]
+    })
+
+
+def run(concurrency_levels, turns_per_client):
+    print(f"{'mode':>9} {'clients':>8} {'turns/s':>9} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    for concurrency in concurrency_levels:
+        for label, make_turn in (("separate", separate_turn), ("batch", batched_turn)):
+            with local_server() as base_url:
+                seed(base_url, concurrency * turns_per_client)
+                latencies, elapsed, errors = asyncio.run(
+                    run_clients(base_url, concurrency, turns_per_client, make_turn)
+                )
+                print(f"{label:>9} {concurrency:>8} {len(latencies) / elapsed:9.1f} "
+                      f"{percentile(latencies, 50):10.1f} {percentile(latencies, 99):10.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 20])
+    parser.add_argument("--turns", type=int, default=50, help="Turns per client.")
+    args = parser.parse_args()
+    run(args.concurrency, args.turns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark for createTaskChain: per-task commits versus one bulk transaction.
+
+Each run creates a fresh file-backed SQLite database (so commit/fsync cost is
+included) and a chain in which every task depends on the one before it. The
+legacy path is the previous endpoint body: a `get_task` duplicate check and a
+committing `create_task` call for every task.
+
+Usage:
+    python -m benchmarks.bench_create_task_chain [--sizes 10 1000 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas, services
+from app.database import Base
+
+
+def build_chain(size):
+    return [
+        schemas.TaskCreate(
+            task_id=f"TASK-{i:06d}",
+            description=f"Step {i}",
+            type="CODE",
+            dependencies=[f"TASK-{i - 1:06d}"] if i else [],
+        )
+        for i in range(size)
+    ]
+
+
+def legacy_create_task_chain(db, tasks):
+    created_tasks = []
+    for task_data in tasks:
+        if crud.get_task(db, task_id=task_data.task_id):
+            raise ValueError(f"Task with ID '{task_data.task_id}' already exists.")
+        created_tasks.append(crud.create_task(db=db, task=task_data))
+    return created_tasks
+
+
+def time_create(fn, tasks):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(autocommit=False, autoflush=False, bind=engine)() as db:
+            started = time.perf_counter()
+            created = fn(db, tasks)
+            elapsed = time.perf_counter() - started
+            assert len(created) == len(tasks)
+        engine.dispose()
+    return elapsed * 1000
+
+
+def run(sizes, legacy_limit):
+    print(f"{'tasks':>8} {'bulk (ms)':>12} {'legacy (ms)':>12} {'speedup':>9}")
+    for size in sizes:
+        tasks = build_chain(size)
+        bulk = time_create(services.create_task_chain, tasks)
+        if size <= legacy_limit:
+            legacy = time_create(legacy_create_task_chain, tasks)
+            print(f"{size:>8} {bulk:12.1f} {legacy:12.1f} {legacy / bulk:8.1f}x")
+        else:
+            print(f"{size:>8} {bulk:12.1f} {'skipped':>12} {'':>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 10_000])
+    parser.add_argument("--legacy-limit", type=int, default=1_000,
+                        help="Skip the legacy path above this many tasks (it takes minutes at 10k).")
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_limit)
+
+
+if __name__ == "__main__":
+    main()
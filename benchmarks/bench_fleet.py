@@ -0,0 +1,305 @@
+"""
+Load test simulating a fleet of agents working through a synthetic task DAG.
+
+Each agent repeatedly claims a ready task (claimNextReadyTask), reads it
+(getTaskDetails), reports progress (appendActiveContext) and finishes it
+(finishWorkOnTask). When nothing is ready it blocks on waitForReadyTask.
+The run ends when every task is COMPLETED. DAG shapes:
+- wide: a few layers of many tasks, each depending on two tasks of the
+  layer before
+- deep: a single chain, so at most one task is ready at a time
+- diamond: repeated fan-out/fan-in blocks (source, parallel tasks, sink)
+
+Reports task throughput and p50/p95/p99 latency per tool, and writes them to
+a JSON file (default benchmarks/results/fleet.json) so runs on different
+commits can be compared with --compare.
+
+Usage:
+    python -m benchmarks.bench_fleet [--shapes wide deep diamond] [--tasks 1000]
+        [--agents 20] [--target inprocess|uvicorn] [--output PATH] [--compare PATH]
+
+MEMORYBANK_* settings (e.g. MEMORYBANK_DB_MODE, MEMORYBANK_GROUP_COMMIT) are
+passed through to the server under test.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.common import REPO_ROOT, local_server, percentile
+
+SHAPES = ("wide", "deep", "diamond")
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "benchmarks", "results", "fleet.json")
+# Seconds an idle agent blocks in waitForReadyTask before re-checking
+IDLE_TIMEOUT_S = 1
+
+
+def _task(task_id, dependencies):
+    return {"task_id": task_id, "description": f"Synthetic task {task_id}", "type": "CODE",
+            "dependencies": dependencies}
+
+
+def generate_dag(shape, count, rng, width=None):
+    """
+    Returns `count` task definitions forming a DAG of the given shape, in
+    dependency order.
+    """
+    tasks = []
+    if shape == "deep":
+        for i in range(count):
+            tasks.append(_task(f"T{i:06d}", [f"T{i - 1:06d}"] if i else []))
+    elif shape == "wide":
+        width = width or max(1, count // 4)
+        previous_layer = []
+        for start in range(0, count, width):
+            layer = []
+            for i in range(start, min(start + width, count)):
+                dependencies = rng.sample(previous_layer, min(2, len(previous_layer)))
+                tasks.append(_task(f"T{i:06d}", dependencies))
+                layer.append(f"T{i:06d}")
+            previous_layer = layer
+    elif shape == "diamond":
+        width = width or 8
+        previous_sink = None
+        i = 0
+        while i < count:
+            source = f"T{i:06d}"
+            tasks.append(_task(source, [previous_sink] if previous_sink else []))
+            i += 1
+            middle = []
+            for _ in range(min(width, count - i - 1)):
+                middle.append(f"T{i:06d}")
+                tasks.append(_task(middle[-1], [source]))
+                i += 1
+            if i < count:
+                previous_sink = f"T{i:06d}"
+                tasks.append(_task(previous_sink, middle or [source]))
+                i += 1
+    else:
+        raise ValueError(f"Unknown shape '{shape}'")
+    return tasks
+
+
+class FleetStats:
+    def __init__(self, total_tasks):
+        self.total_tasks = total_tasks
+        self.finished = 0
+        self.last_finished_at = None
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, tool, elapsed_ms, ok):
+        self.latencies.setdefault(tool, []).append(elapsed_ms)
+        if not ok:
+            self.errors[tool] = self.errors.get(tool, 0) + 1
+
+    def summary(self, elapsed):
+        tools = {}
+        for tool, samples in sorted(self.latencies.items()):
+            tools[tool] = {
+                "calls": len(samples),
+                "errors": self.errors.get(tool, 0),
+                "calls_per_s": round(len(samples) / elapsed, 1),
+                "mean_ms": round(sum(samples) / len(samples), 3),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p95_ms": round(percentile(samples, 95), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+            }
+        return tools
+
+
+async def call(client, stats, tool, payload):
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"/tools/{tool}", json=payload)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        response, ok = None, False
+    stats.record(tool, (time.perf_counter() - started) * 1000, ok)
+    return response.json() if ok else None
+
+
+async def agent(client, stats, agent_id, append_every):
+    done = 0
+    while stats.finished < stats.total_tasks:
+        claimed = await call(client, stats, "claimNextReadyTask", {"max_tasks": 1})
+        if not claimed:
+            if stats.finished < stats.total_tasks:
+                await call(client, stats, "waitForReadyTask", {"timeout": IDLE_TIMEOUT_S})
+            continue
+        task_id = claimed[0]["task_id"]
+        await call(client, stats, "getTaskDetails", {"task_id": task_id})
+        done += 1
+        if append_every and done % append_every == 0:
+            await call(client, stats, "appendActiveContext",
+                       {"context": f"agent-{agent_id}: finished {task_id}"})
+        if await call(client, stats, "finishWorkOnTask", {"task_id": task_id}) is not None:
+            stats.finished += 1
+            stats.last_finished_at = time.perf_counter()
+
+
+async def run_fleet(client, tasks, agents, append_every):
+    started = time.perf_counter()
+    response = await client.post("/tools/createTaskChain", json={"tasks": tasks})
+    response.raise_for_status()
+    setup_s = time.perf_counter() - started
+
+    stats = FleetStats(len(tasks))
+    started = time.perf_counter()
+    await asyncio.gather(*(agent(client, stats, n, append_every) for n in range(agents)))
+    # Idle agents may still be waiting out their timeout after the last task
+    elapsed = (stats.last_finished_at or time.perf_counter()) - started
+    return {
+        "tasks": len(tasks),
+        "agents": agents,
+        "create_task_chain_s": round(setup_s, 3),
+        "elapsed_s": round(elapsed, 3),
+        "tasks_per_s": round(stats.finished / elapsed, 1),
+        "tools": stats.summary(elapsed),
+    }
+
+
+@asynccontextmanager
+async def inprocess_client(agents):
+    """
+    Drives app.main in this process through httpx's ASGI transport, on a
+    fresh database in a temporary directory.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["MEMORYBANK_DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'memorybank.db')}"
+        from app.main import app, writer
+
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://fleet", timeout=120) as client:
+                yield client
+        finally:
+            if writer is not None:
+                writer.stop()
+            from app.database import engine, read_engine
+            engine.dispose()
+            read_engine.dispose()
+
+
+@asynccontextmanager
+async def uvicorn_client(agents):
+    with local_server() as base_url:
+        limits = httpx.Limits(max_connections=agents, max_keepalive_connections=agents)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+            yield client
+
+
+async def run_shape(target, shape, count, agents, append_every, seed):
+    tasks = generate_dag(shape, count, random.Random(seed))
+    open_client = inprocess_client if target == "inprocess" else uvicorn_client
+    async with open_client(agents) as client:
+        return await run_fleet(client, tasks, agents, append_every)
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "cpus": os.cpu_count(),
+        "settings": {key: value for key, value in sorted(os.environ.items()) if key.startswith("MEMORYBANK_")},
+    }
+
+
+def print_run(shape, result):
+    print(f"\n{shape}: {result['tasks']} tasks, {result['agents']} agents, "
+          f"{result['elapsed_s']:.1f} s, {result['tasks_per_s']:.1f} tasks/s "
+          f"(createTaskChain {result['create_task_chain_s'] * 1000:.0f} ms)")
+    print(f"  {'tool':<20} {'calls':>7} {'errors':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}")
+    for tool, row in result["tools"].items():
+        print(f"  {tool:<20} {row['calls']:>7} {row['errors']:>7} "
+              f"{row['p50_ms']:9.2f} {row['p95_ms']:9.2f} {row['p99_ms']:9.2f}")
+
+
+def print_comparison(baseline, results):
+    print(f"\nCompared with {baseline['environment'].get('git_commit')} ({baseline['environment'].get('timestamp')}):")
+    for shape, result in results["runs"].items():
+        before = baseline["runs"].get(shape)
+        if before is None:
+            continue
+        print(f"  {shape}: tasks/s {before['tasks_per_s']:.1f} -> {result['tasks_per_s']:.1f}")
+        for tool, row in result["tools"].items():
+            old = before["tools"].get(tool)
+            if old is None:
+                continue
+            print(f"    {tool:<20} p50 {old['p50_ms']:8.2f} -> {row['p50_ms']:8.2f}   "
+                  f"p99 {old['p99_ms']:8.2f} -> {row['p99_ms']:8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--tasks", type=int, default=1000, help="Tasks per DAG.")
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--append-every", type=int, default=1,
+                        help="Tasks between appendActiveContext calls per agent (0 disables them).")
+    parser.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", help="Results file of an earlier run to compare against.")
+    # Used for the per-shape child processes of an in-process run
+    parser.add_argument("--runs-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.target == "inprocess" and len(args.shapes) > 1:
+        # app.main binds its database at import, so each in-process shape
+        # runs in a fresh interpreter.
+        runs = {}
+        for shape in args.shapes:
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as output:
+                path = output.name
+            try:
+                subprocess.run([sys.executable, "-m", "benchmarks.bench_fleet", "--shapes", shape,
+                                "--tasks", str(args.tasks), "--agents", str(args.agents),
+                                "--append-every", str(args.append_every), "--seed", str(args.seed),
+                                "--output", path, "--runs-only"], cwd=REPO_ROOT, check=True)
+                with open(path) as f:
+                    runs.update(json.load(f)["runs"])
+            finally:
+                os.unlink(path)
+    else:
+        runs = {}
+        for shape in args.shapes:
+            runs[shape] = asyncio.run(run_shape(args.target, shape, args.tasks, args.agents,
+                                                args.append_every, args.seed))
+            print_run(shape, runs[shape])
+    if args.runs_only:
+        with open(args.output, "w") as f:
+            json.dump({"runs": runs}, f)
+        return
+
+    results = {"benchmark": "fleet", "target": args.target, "environment": environment(), "runs": runs}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Throughput of task state transitions with and without group commit
+(MEMORYBANK_GROUP_COMMIT).
+
+Each client alternates startWorkOnTask and finishWorkOnTask on its own
+tasks, so every call is a status change plus a journal entry. Without group
+commit every call is its own transaction; with it, calls arriving within the
+window share one. The gain grows with the cost of a commit, so run with
+--synchronous FULL to include an fsync per commit.
+
+Usage:
+    python -m benchmarks.bench_group_commit [--concurrency 50] [--calls 40]
+        [--windows 1 2 5] [--max-batch 8 64] [--synchronous NORMAL]
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from benchmarks.common import local_server, percentile, run_clients
+
+
+def seed(base_url, count):
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        client.post("/tools/createTaskChain", json={"tasks": [
+            {"task_id": f"TASK-{i:05d}", "description": f"Task {i}", "type": "CODE"}
+            for i in range(count)
+        ]}).raise_for_status()
+
+
+def transition_call(client, i):
+    task_id = f"TASK-{i // 2:05d}"
+    operation = "startWorkOnTask" if i % 2 == 0 else "finishWorkOnTask"
+    return client.post(f"/tools/{operation}", json={"task_id": task_id})
+
+
+def run(concurrency, calls_per_client, windows, max_batches, synchronous):
+    print(f"{'mode':>16} {'transitions/s':>14} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    settings = [("per-call commit", {"MEMORYBANK_GROUP_COMMIT": "0"})]
+    for window in windows:
+        for max_batch in max_batches:
+            settings.append((f"group {window:g}ms/{max_batch}", {
+                "MEMORYBANK_GROUP_COMMIT": "1",
+                "MEMORYBANK_GROUP_COMMIT_WINDOW_MS": str(window),
+                "MEMORYBANK_GROUP_COMMIT_MAX_BATCH": str(max_batch),
+            }))
+    for label, env in settings:
+        env["MEMORYBANK_SQLITE_SYNCHRONOUS"] = synchronous
+        with local_server(env=env) as base_url:
+            seed(base_url, concurrency * calls_per_client // 2 + 1)
+            latencies, elapsed, errors = asyncio.run(
+                run_clients(base_url, concurrency, calls_per_client, transition_call)
+            )
+            print(f"{label:>16} {len(latencies) / elapsed:14.1f} "
+                  f"{percentile(latencies, 50):10.1f} {percentile(latencies, 99):10.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=40, help="Calls per client (kept even).")
+    parser.add_argument("--windows", type=float, nargs="+", default=[1, 2, 5], help="Group commit windows in ms.")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[8, 64], help="Group commit batch limits.")
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"])
+    args = parser.parse_args()
+    run(args.concurrency, args.calls - args.calls % 2, args.windows, args.max_batch, args.synchronous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Load an idle fleet puts on the server: agents waiting for work by
+busy-polling getNextReadyTask versus blocking in waitForReadyTask.
+
+No task is ever ready, so every request is wasted work. Each agent loops
+for --duration seconds; the report is the number of requests (and so ready
+queue queries) served per second, and how quickly a waiting agent notices a
+task that becomes ready at the end.
+
+Usage:
+    python -m benchmarks.bench_idle_fleet [--agents 200] [--duration 10] [--wait-timeout 30]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from benchmarks.common import local_server
+
+
+async def idle_fleet(base_url, agents, duration, mode, wait_timeout):
+    limits = httpx.Limits(max_connections=agents + 1, max_keepalive_connections=agents + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=wait_timeout + 60) as client:
+        requests = 0
+        pickup_latencies = []
+        released_at = None
+        stop_at = time.perf_counter() + duration
+
+        async def agent():
+            nonlocal requests
+            while True:
+                if mode == "poll":
+                    response = await client.post("/tools/getNextReadyTask", json={})
+                else:
+                    response = await client.post("/tools/waitForReadyTask", json={"timeout": wait_timeout})
+                requests += 1
+                if response.json() is not None:
+                    pickup_latencies.append(time.perf_counter() - released_at)
+                    return
+
+        async def release_task():
+            nonlocal released_at
+            await asyncio.sleep(duration)
+            released_at = time.perf_counter()
+            response = await client.post("/tools/createTaskChain", json={"tasks": [
+                {"task_id": "WAKE-UP", "description": "First real work", "type": "CODE"}
+            ]})
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(release_task(), *(agent() for _ in range(agents)))
+        idle_seconds = stop_at - started
+        return requests / idle_seconds, max(pickup_latencies) * 1000
+
+
+def run(agents, duration, wait_timeout):
+    print(f"{'mode':>6} {'agents':>7} {'idle req/s':>11} {'pickup (ms)':>12}")
+    for mode in ("poll", "wait"):
+        with local_server() as base_url:
+            rate, pickup = asyncio.run(idle_fleet(base_url, agents, duration, mode, wait_timeout))
+            print(f"{mode:>6} {agents:>7} {rate:11.1f} {pickup:12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds before a task becomes ready.")
+    parser.add_argument("--wait-timeout", type=float, default=30)
+    args = parser.parse_args()
+    run(args.agents, args.duration, args.wait_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark for journal compaction (see app/retention.py).
+
+Seeds a file database in WAL mode with `n` COMPLETED tasks of `entries`
+journal entries each, then compacts them to the newest `keep` per task.
+Reports the archived entries per second and how long each batch held the
+write lock (from BEGIN IMMEDIATE to COMMIT), which is what concurrent tool
+calls wait for, and the size of the database before and after VACUUM.
+
+Usage:
+    python -m benchmarks.bench_journal_compaction [--tasks 20000] [--entries 10]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from app import models, services
+from app.database import Base
+from app.retention import JournalCompactor
+
+
+class TimedCompactor(JournalCompactor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock_ms = []
+        self._archived_at = None
+
+    def archive(self, rows):
+        super().archive(rows)
+        self._archived_at = time.perf_counter()
+
+    def sweep(self):
+        total = 0
+        while True:
+            db = self.session_factory()
+            try:
+                compacted = services.compact_journal(db, self.statuses, self.keep, self.batch_size, self.archive)
+            finally:
+                db.close()
+            if compacted:
+                self.lock_ms.append((time.perf_counter() - self._archived_at) * 1000)
+            total += len(compacted)
+            if len(compacted) < self.batch_size:
+                return total
+
+
+def seed(session_factory, n, entries):
+    db = session_factory()
+    for start in range(0, n, 5000):
+        task_ids = [f"T{i:06d}" for i in range(start, min(start + 5000, n))]
+        db.execute(insert(models.Task), [
+            {"task_id": task_id, "description": "synthetic", "type": "CODE", "status": "COMPLETED"}
+            for task_id in task_ids
+        ])
+        db.execute(insert(models.Journal), [
+            {"task_id": task_id, "event_type": "NOTE"} for task_id in task_ids for _ in range(entries)
+        ])
+        db.commit()
+    db.close()
+
+
+def database_size(engine, path):
+    """
+    Size of the database file once the WAL is checkpointed into it; in WAL
+    mode recent writes (including VACUUM's) are still in the -wal file.
+    """
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    return os.path.getsize(path)
+
+
+def run(n, entries, keep, batch_size):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "memorybank.db")
+        engine = create_engine(f"sqlite:///{path}")
+
+        @event.listens_for(engine, "connect")
+        def _pragmas(dbapi_connection, _):
+            dbapi_connection.execute("PRAGMA journal_mode=WAL")
+            dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(session_factory, n, entries)
+        size_before = database_size(engine, path)
+
+        compactor = TimedCompactor(
+            session_factory, os.path.join(directory, "archive"), keep, ["COMPLETED"], batch_size=batch_size
+        )
+        started = time.perf_counter()
+        archived = compactor.sweep()
+        elapsed = time.perf_counter() - started
+        with engine.connect() as conn:
+            conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("VACUUM"))
+        size_after = database_size(engine, path)
+        archive_size = sum(entry.stat().st_size for entry in os.scandir(os.path.join(directory, "archive")))
+
+        print(f"tasks={n} entries/task={entries} keep={keep} batch={batch_size}")
+        print(f"archived {archived} entries in {elapsed:.2f} s ({archived / elapsed:,.0f} entries/s)")
+        print(f"write lock per batch: median {statistics.median(compactor.lock_ms):.1f} ms, "
+              f"max {max(compactor.lock_ms):.1f} ms")
+        print(f"database {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB after VACUUM; "
+              f"archive {archive_size / 1e6:.1f} MB")
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    parser.add_argument("--entries", type=int, default=10)
+    parser.add_argument("--keep", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    run(args.tasks, args.entries, args.keep, args.batch)
+
+
+if __name__ == "__main__":
+    main()
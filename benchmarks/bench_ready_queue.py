@@ -0,0 +1,100 @@
+"""
+Benchmark for getNextReadyTask as the number of PENDING tasks grows.
+
+Every size is seeded with one RUNNING blocker, `n - 1` older PENDING tasks that
+wait on it and a single ready task created last, which is the worst case for a
+scan in `created_at` order. The legacy full-scan implementation is timed next
+to the indexed ready queue for comparison.
+
+Usage:
+    python -m benchmarks.bench_ready_queue [--sizes 100 1000 10000 100000]
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models
+from app.database import Base
+
+
+def legacy_get_next_ready_task(db):
+    # The pre-index implementation, kept here as the baseline.
+    pending_tasks = db.query(models.Task).filter(models.Task.status == 'PENDING').order_by(models.Task.created_at).all()
+    for task in pending_tasks:
+        if all(
+            (dep := crud.get_task(db, dep_id)) is not None and dep.status == 'COMPLETED'
+            for dep_id in task.dependencies
+        ):
+            return task
+    return None
+
+
+def seed(db, n):
+    start = datetime(2024, 1, 1)
+    rows = [{
+        "task_id": "BLOCKER", "description": "blocker", "type": "CODE",
+        "status": "RUNNING", "unmet_dependencies": 0,
+        "created_at": start,
+    }]
+    rows.extend({
+        "task_id": f"BLOCKED-{i:06d}", "description": "blocked", "type": "CODE",
+        "status": "PENDING", "unmet_dependencies": 1,
+        "created_at": start + timedelta(seconds=i + 1),
+    } for i in range(n - 1))
+    rows.append({
+        "task_id": "READY", "description": "ready", "type": "CODE",
+        "status": "PENDING", "unmet_dependencies": 0,
+        "created_at": start + timedelta(seconds=n + 1),
+    })
+    db.execute(insert(models.Task), rows)
+    db.execute(insert(models.TaskDependency), [
+        {"task_id": f"BLOCKED-{i:06d}", "depends_on_id": "BLOCKER"} for i in range(n - 1)
+    ])
+    db.commit()
+
+
+def time_calls(fn, db, repeats):
+    samples = []
+    for _ in range(repeats):
+        db.expire_all()
+        started = time.perf_counter()
+        task = fn(db)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert task is not None and task.task_id == "READY"
+    return statistics.median(samples)
+
+
+def run(sizes, repeats, legacy_limit):
+    print(f"{'pending':>10} {'indexed (ms)':>14} {'legacy (ms)':>14}")
+    for n in sizes:
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+        seed(db, n)
+
+        indexed = time_calls(crud.get_next_ready_task, db, repeats)
+        legacy = time_calls(legacy_get_next_ready_task, db, 3) if n <= legacy_limit else None
+        legacy_text = f"{legacy:14.3f}" if legacy is not None else f"{'skipped':>14}"
+        print(f"{n:>10} {indexed:14.3f} {legacy_text}")
+
+        db.close()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--legacy-limit", type=int, default=10_000,
+                        help="Skip the legacy scan above this many pending tasks.")
+    args = parser.parse_args()
+    run(args.sizes, args.repeats, args.legacy_limit)
+
+
+if __name__ == "__main__":
+    main()
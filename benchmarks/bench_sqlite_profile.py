@@ -0,0 +1,75 @@
+"""
+Mixed read/write load test for the SQLite profiles (MEMORYBANK_SQLITE_PROFILE).
+
+"legacy" is the original setup: one pool, rollback journal and
+synchronous=FULL. "tuned" enables WAL, synchronous=NORMAL, busy_timeout,
+mmap and a larger page cache, and splits reads and writes into separate
+pools. Half of the calls are reads (getTaskDetails, getSystemPatterns,
+getActiveContext) and half are writes (appendActiveContext, updateTaskStatus
+with a context message, claimNextReadyTask). Failed calls, such as
+"database is locked" errors, are counted separately.
+
+Usage:
+    python -m benchmarks.bench_sqlite_profile [--concurrency 20 100] [--calls 30]
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from benchmarks.common import local_server, percentile, run_clients
+
+SEED_TASKS = 5000
+
+
+def seed(base_url):
+    with httpx.Client(base_url=base_url, timeout=120) as client:
+        client.post("/tools/createTaskChain", json={"tasks": [
+            {"task_id": f"TASK-{i:05d}", "description": f"Task {i}", "type": "CODE"}
+            for i in range(SEED_TASKS)
+        ]}).raise_for_status()
+        client.post("/tools/updateSystemPatterns", json={"patterns": "Follow PEP 8.\n" * 50}).raise_for_status()
+
+
+def mixed_call(client, i):
+    task_id = f"TASK-{(i * 7919) % SEED_TASKS:05d}"
+    operation = i % 6
+    if operation == 0:
+        return client.post("/tools/getTaskDetails", json={"task_id": task_id})
+    if operation == 1:
+        return client.post("/tools/getSystemPatterns", json={})
+    if operation == 2:
+        return client.post("/tools/getActiveContext", json={"last_segments": 20})
+    if operation == 3:
+        return client.post("/tools/appendActiveContext", json={"context": f"Report {i}"})
+    if operation == 4:
+        return client.post("/tools/updateTaskStatus", json={
+            "task_id": task_id, "status": "BLOCKED", "context_message": f"Blocked by call {i}"
+        })
+    return client.post("/tools/claimNextReadyTask", json={})
+
+
+def run(profiles, concurrency_levels, calls_per_client):
+    print(f"{'profile':>8} {'clients':>8} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>7}")
+    for profile in profiles:
+        with local_server(env={"MEMORYBANK_SQLITE_PROFILE": profile}) as base_url:
+            seed(base_url)
+            for concurrency in concurrency_levels:
+                latencies, elapsed, errors = asyncio.run(
+                    run_clients(base_url, concurrency, calls_per_client, mixed_call)
+                )
+                print(f"{profile:>8} {concurrency:>8} {len(latencies) / elapsed:10.1f} "
+                      f"{percentile(latencies, 50):10.1f} {percentile(latencies, 99):10.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["legacy", "tuned"], choices=["legacy", "tuned"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--calls", type=int, default=30, help="Calls per client at each level.")
+    args = parser.parse_args()
+    run(args.profiles, args.concurrency, args.calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark for getTaskGraph on large dependency graphs.
+
+Each shape is seeded with `n` tasks, half of them COMPLETED, and the graph
+around a task in the middle is requested:
+- chain: one long chain, so the task has ~n/2 ancestors and descendants
+- layered: layers of 100 tasks, each depending on two tasks of the layer
+  before (shared dependencies are walked once)
+
+Reports the time of the two recursive CTEs and of the whole tool call
+(including the critical path and the response) separately. Each walk stops
+after `--max-tasks` tasks (the tool's default), so the time should stay flat
+once the subgraph is larger than that; pass --max-tasks 50000 to walk
+everything.
+
+Usage:
+    python -m benchmarks.bench_task_graph [--sizes 1000 10000 50000] [--max-tasks 2000]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, models, schemas, tools
+from app.database import Base
+
+LAYER_WIDTH = 100
+
+
+def seed(db, shape, n, rng):
+    task_ids = [f"T{i:06d}" for i in range(n)]
+    edges = []
+    for i in range(1, n):
+        if shape == "chain":
+            edges.append((task_ids[i], task_ids[i - 1]))
+        else:
+            layer = i // LAYER_WIDTH
+            if layer:
+                previous = task_ids[(layer - 1) * LAYER_WIDTH:layer * LAYER_WIDTH]
+                edges.extend((task_ids[i], dep) for dep in rng.sample(previous, 2))
+    db.execute(insert(models.Task), [{
+        "task_id": task_id, "description": "synthetic", "type": "CODE",
+        "status": "COMPLETED" if i < n // 2 else "PENDING",
+        "unmet_dependencies": 0 if i <= n // 2 else 1,
+    } for i, task_id in enumerate(task_ids)])
+    db.execute(insert(models.TaskDependency), [
+        {"task_id": task_id, "depends_on_id": depends_on_id} for task_id, depends_on_id in edges
+    ])
+    db.commit()
+    return task_ids[n // 2]
+
+
+def median_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(shapes, sizes, max_tasks, repeats):
+    print(f"{'shape':>8} {'tasks':>8} {'ancestors':>10} {'descendants':>12} {'CTEs (ms)':>10} {'tool (ms)':>10}")
+    for shape in shapes:
+        for n in sizes:
+            engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+            Base.metadata.create_all(bind=engine)
+            db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+            task_id = seed(db, shape, n, random.Random(1))
+            payload = schemas.TaskGraphQuery(task_id=task_id, max_tasks=max_tasks)
+
+            def ctes():
+                crud.get_task_graph_rows(db, task_id, "ancestors", max_tasks)
+                crud.get_task_graph_rows(db, task_id, "descendants", max_tasks)
+
+            cte_ms = median_ms(ctes, repeats)
+            tool_ms = median_ms(lambda: tools.get_task_graph(db, payload), repeats)
+            graph = tools.get_task_graph(db, payload)
+            print(f"{shape:>8} {n:>8} {graph.ancestor_count:>10} {graph.descendant_count:>12} "
+                  f"{cte_ms:10.1f} {tool_ms:10.1f}")
+            db.close()
+            engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shapes", nargs="+", choices=("chain", "layered"), default=["chain", "layered"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--max-tasks", type=int, default=schemas.TaskGraphQuery.model_fields["max_tasks"].default)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.shapes, args.sizes, args.max_tasks, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark for the NDJSON export and import (see app/transfer.py).
+
+Seeds a file database with `tasks` tasks, a dependency chain between them,
+`journal` journal rows and some active_context segments, then runs
+`python -m app.transfer export` and `python -m app.transfer import` (into a
+fresh database) as separate processes. Reports rows per second and the peak
+RSS of each process, which should stay flat as the journal grows. With the
+default tuned profile that RSS also includes SQLite's memory map and page
+cache, which grow up to MEMORYBANK_SQLITE_MMAP_SIZE and
+MEMORYBANK_SQLITE_CACHE_SIZE_KB; set both low to see the transfer's own
+memory use.
+
+Usage:
+    python -m benchmarks.bench_transfer [--tasks 50000] [--journal 1000000]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app import migrations, models
+from app.database import Base
+from benchmarks.common import REPO_ROOT
+
+BATCH = 10_000
+
+
+def seed(url, tasks, journal):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    migrations.run_migrations(engine)
+    db = sessionmaker(bind=engine)()
+    task_ids = [f"T{i:07d}" for i in range(tasks)]
+    for start in range(0, tasks, BATCH):
+        db.execute(insert(models.Task), [
+            {"task_id": task_id, "description": f"Synthetic task {task_id}", "type": "CODE", "status": "COMPLETED"}
+            for task_id in task_ids[start:start + BATCH]
+        ])
+        db.execute(insert(models.TaskDependency), [
+            {"task_id": task_ids[i], "depends_on_id": task_ids[i - 1]}
+            for i in range(max(start, 1), min(start + BATCH, tasks))
+        ])
+    for start in range(0, journal, BATCH):
+        db.execute(insert(models.Journal), [
+            {"task_id": task_ids[i % tasks], "event_type": ("STARTING", "FINISHED")[i // tasks % 2]}
+            for i in range(start, min(start + BATCH, journal))
+        ])
+    db.execute(insert(models.ProjectContextSegment), [
+        {"key": "active_context", "content": f"Decision {i}: keep it simple."} for i in range(1000)
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+    return tasks * 2 - 1 + journal + 1000
+
+
+def run_cli(url, *args):
+    """
+    Runs the transfer CLI; returns (seconds, peak RSS in MB).
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.transfer", *args], cwd=REPO_ROOT,
+        env={**os.environ, "MEMORYBANK_DATABASE_URL": url}, stderr=subprocess.DEVNULL,
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if status != 0:
+        raise RuntimeError(f"app.transfer {args[0]} failed")
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--journal", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = f"sqlite:///{os.path.join(directory, 'source.db')}"
+        target = f"sqlite:///{os.path.join(directory, 'target.db')}"
+        dump = os.path.join(directory, "memorybank.ndjson")
+        rows = seed(source, args.tasks, args.journal)
+
+        print(f"{'step':>8} {'rows':>10} {'seconds':>8} {'rows/s':>10} {'peak RSS (MB)':>14}")
+        for step, url, cli_args in (("export", source, ("export", dump)), ("import", target, ("import", dump))):
+            elapsed, rss = run_cli(url, *cli_args)
+            print(f"{step:>8} {rows:>10} {elapsed:8.2f} {rows / elapsed:10,.0f} {rss:14.1f}")
+        print(f"export size: {os.path.getsize(dump) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
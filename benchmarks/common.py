@@ -0,0 +1,99 @@
+"""
+Helpers shared by the benchmarks that drive a local uvicorn server over HTTP.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(env=None, workers=1):
+    """
+    Starts `uvicorn app.main:app` on a fresh SQLite database in a temporary
+    directory and yields its base URL. `env` adds MEMORYBANK_* settings.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        server_env = {
+            **os.environ,
+            "MEMORYBANK_DATABASE_URL": f"sqlite:///{os.path.join(directory, 'memorybank.db')}",
+            **(env or {}),
+        }
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+            cwd=REPO_ROOT,
+            env=server_env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            _wait_until_up(base_url, process)
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+def _wait_until_up(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            httpx.get(f"{base_url}/openapi.json", timeout=1).raise_for_status()
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start in time")
+
+
+def percentile(samples, p):
+    """
+    Nearest-rank percentile of `samples` (0 < p <= 100).
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def run_clients(base_url, concurrency, calls_per_client, make_call):
+    """
+    Runs `concurrency` clients that each await `make_call(client, i)` for
+    i in range(calls_per_client). Returns (latencies in ms, elapsed seconds, errors).
+    """
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker(worker_id):
+            nonlocal errors
+            for i in range(calls_per_client):
+                started = time.perf_counter()
+                try:
+                    response = await make_call(client, worker_id * calls_per_client + i)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed, errors
@@ -45,16 +45,22 @@ def main():
     call_tool("createTaskChain", task_chain_payload)
 
     # Process tasks until no more are ready
+    # Tasks unblocked by finishWorkOnTask are dispatched directly; the ready
+    # queue is only polled when none are known.
+    unblocked = []
     while True:
-        # Step 2: Get the next ready task
-        print_step("2. Getting Next Ready Task")
-        next_task = call_tool("getNextReadyTask", {})
-        
-        if not next_task:
-            print("\nNo more ready tasks. Workflow complete.")
-            break
+        if unblocked:
+            task_id = unblocked.pop(0)
+        else:
+            # Step 2: Get the next ready task
+            print_step("2. Getting Next Ready Task")
+            next_task = call_tool("getNextReadyTask", {})
 
-        task_id = next_task["task_id"]
+            if not next_task:
+                print("\nNo more ready tasks. Workflow complete.")
+                break
+
+            task_id = next_task["task_id"]
 
         # Step 3: Start work on the task
         print_step(f"3. Starting Work on {task_id}")
@@ -63,10 +69,14 @@ def main():
         # Step 4: Get task details
         print_step(f"4. Getting Details for {task_id}")
         call_tool("getTaskDetails", {"task_id": task_id})
+        # Extend the task's lease between steps, so it is not handed to
+        # another agent while this one is still working on it.
+        call_tool("heartbeatTask", {"task_id": task_id})
 
         # Step 5: Finish work on the task
         print_step(f"5. Finishing Work on {task_id}")
-        call_tool("finishWorkOnTask", {"task_id": task_id})
+        finished = call_tool("finishWorkOnTask", {"task_id": task_id})
+        unblocked.extend(finished["unblocked_task_ids"])
 
     # Final verification
     print_step("6. Final Verification")
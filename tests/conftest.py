@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import instrumentation
+from app.main import app, get_db, get_read_db
+from app.cache import context_cache
+from app.database import Base
+
+# Use an in-memory SQLite database for testing
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+instrumentation.instrument_engine(engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Override the get_db / get_read_db dependencies to use the test database
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+
+
+@pytest.fixture(scope="function")
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture(scope="function")
+def db_session():
+    """
+    Fixture to provide a clean database session for each test function.
+    It creates all tables before the test and drops them afterwards.
+    """
+    Base.metadata.create_all(bind=engine)
+    context_cache.clear()
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def query_budget():
+    """
+    `with query_budget(n): ...` fails the test if the block runs more than
+    `n` SQL statements, listing the statements it ran. An explicit BEGIN
+    (see database.begin_transaction) is not counted: it replaces the one
+    pysqlite issues on its own, which never shows up as a statement.
+    """
+    @contextmanager
+    def budget(max_queries: int):
+        with instrumentation.capture() as stats:
+            yield stats
+        counted = [
+            (statement, elapsed_ms) for statement, elapsed_ms in stats.statements
+            if not statement.startswith("BEGIN")
+        ]
+        statements = "\n".join(
+            f"  {elapsed_ms:7.3f} ms  {statement.splitlines()[0][:120]}"
+            for statement, elapsed_ms in counted
+        )
+        assert len(counted) <= max_queries, (
+            f"Ran {len(counted)} SQL statements, over the budget of {max_queries}:\n{statements}"
+        )
+
+    return budget
\ No newline at end of file
@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+import pytest
+
+from app import crud, schemas
+from app.models import ProjectContext, ProjectContextSegment, Task
+from app.services import update_task_status
+
+
+def append(client, message):
+    response = client.post("/tools/appendActiveContext", json={"context": message})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_appends_are_stored_as_ordered_segments(client, db_session):
+    db_session.add(ProjectContext(key="active_context", value="legacy blob"))
+    db_session.commit()
+
+    first = append(client, "one")
+    second = append(client, "two")
+
+    assert first["content"] == "one"
+    assert second["seq"] > first["seq"]
+    # The base value is never rewritten by an append.
+    assert db_session.query(ProjectContext.value).filter(ProjectContext.key == "active_context").scalar() == "legacy blob"
+    response = client.post("/tools/getActiveContext", json={})
+    assert response.json()["context"] == "legacy blob\none\ntwo"
+
+
+@pytest.mark.parametrize("query, expected", [
+    ({"last_segments": 2}, "two\nthree"),
+    ({"last_segments": 4}, "base\none\ntwo\nthree"),
+    ({"max_bytes": 9}, "two\nthree"),
+    ({"max_bytes": 3}, ""),
+    ({"last_segments": 1, "max_bytes": 100}, "three"),
+])
+def test_active_context_can_be_limited(client, db_session, query, expected):
+    db_session.add(ProjectContext(key="active_context", value="base"))
+    db_session.commit()
+    for message in ("one", "two", "three"):
+        append(client, message)
+
+    response = client.post("/tools/getActiveContext", json=query)
+
+    assert response.json()["context"] == expected
+
+
+def test_replacing_a_value_discards_its_segments(client, db_session):
+    crud.append_project_context(db_session, "system_patterns", "old rule")
+
+    client.post("/tools/updateSystemPatterns", json={"patterns": "new rules"})
+
+    assert db_session.query(ProjectContextSegment).count() == 0
+    assert client.post("/tools/getSystemPatterns").json()["patterns"] == "new rules"
+
+
+def test_status_update_and_context_message_are_atomic(db_session):
+    db_session.add(Task(task_id="TASK-001", description="t", type="CODE"))
+    db_session.commit()
+
+    with patch.object(db_session, "commit", side_effect=Exception("Simulated DB crash")):
+        with pytest.raises(Exception, match="Simulated DB crash"):
+            update_task_status(db_session, "TASK-001", "FAILED", context_message="boom")
+
+    assert db_session.query(Task.status).filter(Task.task_id == "TASK-001").scalar() == "PENDING"
+    assert db_session.query(ProjectContextSegment).count() == 0
+
+
+def test_since_cursor_returns_only_new_segments(client, db_session):
+    db_session.add(ProjectContext(key="active_context", value="base"))
+    db_session.commit()
+    append(client, "one")
+
+    first = client.post("/tools/getActiveContext", json={}).json()
+    assert first["context"] == "base\none"
+
+    unchanged = client.post("/tools/getActiveContext", json={"since": first["cursor"]}).json()
+    assert unchanged == {"context": "", "cursor": first["cursor"], "not_modified": True}
+
+    append(client, "two")
+    append(client, "three")
+    delta = client.post("/tools/getActiveContext", json={"since": first["cursor"]}).json()
+    assert delta["context"] == "two\nthree"
+    assert delta["not_modified"] is False
+
+    # Replacing the value invalidates old cursors: the next read is a full one.
+    crud.create_or_update_project_context(db_session, schemas.ProjectContextCreate(key="active_context", value="reset"))
+    reset = client.post("/tools/getActiveContext", json={"since": delta["cursor"]}).json()
+    assert reset["context"] == "reset"
+    assert reset["cursor"] != delta["cursor"]
+
+
+def test_system_patterns_support_conditional_fetch(client, db_session):
+    empty = client.post("/tools/getSystemPatterns", json={}).json()
+    client.post("/tools/updateSystemPatterns", json={"patterns": "use black"})
+    first = client.post("/tools/getSystemPatterns", json={"if_none_match": empty["etag"]}).json()
+    assert first["patterns"] == "use black"
+
+    cached = client.post("/tools/getSystemPatterns", json={"if_none_match": first["etag"]}).json()
+    assert cached == {"patterns": "", "etag": first["etag"], "not_modified": True}
+
+    client.post("/tools/updateSystemPatterns", json={"patterns": "use ruff"})
+    changed = client.post("/tools/getSystemPatterns", json={"if_none_match": first["etag"]}).json()
+    assert changed["patterns"] == "use ruff"
+    assert changed["not_modified"] is False
+    assert changed["etag"] != first["etag"]
@@ -0,0 +1,75 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import aio, schemas
+from app.database import Base
+from app.main import app, get_db, get_read_db
+
+
+def create_database(tmp_path):
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    # NullPool: aiosqlite connections must not outlive the event loop that opened them.
+    return create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+
+
+def test_async_crud_and_services(tmp_path):
+    async_engine = create_database(tmp_path)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await aio.services.create_task_chain(db, [
+                schemas.TaskCreate(task_id="A", description="a", type="CODE"),
+                schemas.TaskCreate(task_id="B", description="b", type="CODE", dependencies=["A"]),
+            ])
+            assert (await aio.crud.get_next_ready_task(db)).task_id == "A"
+            await aio.services.finish_work_on_task(db, "A")
+            assert (await aio.crud.get_next_ready_task(db)).task_id == "B"
+
+    asyncio.run(scenario())
+
+
+def test_endpoints_run_on_async_sessions(tmp_path):
+    async_engine = create_database(tmp_path)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    previous_overrides = dict(app.dependency_overrides)
+    app.dependency_overrides[get_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
+    try:
+        with TestClient(app) as client:
+            response = client.post("/tools/createTaskChain", json={"tasks": [
+                {"task_id": "A", "description": "a", "type": "CODE"},
+                {"task_id": "B", "description": "b", "type": "CODE", "dependencies": ["A"]},
+            ]})
+            assert response.status_code == 200
+
+            claimed = client.post("/tools/claimNextReadyTask", json={}).json()
+            assert [task["task_id"] for task in claimed] == ["A"]
+            finished = client.post("/tools/finishWorkOnTask", json={"task_id": "A"}).json()
+            assert [entry["event_type"] for entry in finished["journal_entries"]] == ["STARTING", "FINISHED"]
+
+            client.post("/tools/appendActiveContext", json={"context": "note"})
+            assert client.post("/tools/getActiveContext", json={}).json()["context"] == "note"
+            assert client.post("/tools/getTaskDetails", json={"task_id": "B"}).json()["dependencies"] == ["A"]
+            assert client.post("/tools/getTaskDetails", json={"task_id": "X"}).status_code == 404
+
+            batch = client.post("/tools/batch", json={"atomic": True, "calls": [
+                {"tool": "startWorkOnTask", "arguments": {"task_id": "B"}},
+                {"tool": "getTaskDetails", "arguments": {"task_id": "B"}},
+            ]}).json()
+            assert batch["committed"] is True
+            assert batch["results"][1]["result"]["status"] == "RUNNING"
+    finally:
+        app.dependency_overrides.update(previous_overrides)
@@ -0,0 +1,75 @@
+from app.models import Journal, ProjectContextSegment, Task
+
+
+def create_chain(client, tasks):
+    response = client.post("/tools/createTaskChain", json={"tasks": tasks})
+    assert response.status_code == 200
+
+
+def test_agent_turn_in_one_batch(client, db_session):
+    create_chain(client, [{"task_id": "T1", "description": "d", "type": "CODE"}])
+    client.post("/tools/updateSystemPatterns", json={"patterns": "Use type hints."})
+
+    response = client.post("/tools/batch", json={"calls": [
+        {"tool": "startWorkOnTask", "arguments": {"task_id": "T1"}},
+        {"tool": "getTaskDetails", "arguments": {"task_id": "T1"}},
+        {"tool": "getSystemPatterns"},
+        {"tool": "getActiveContext", "arguments": {"last_segments": 5}},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["committed"] is True
+    assert [result["ok"] for result in body["results"]] == [True] * 4
+    details = body["results"][1]["result"]
+    assert details["status"] == "RUNNING" # Sees the earlier call's write
+    assert [entry["event_type"] for entry in details["journal_entries"]] == ["STARTING"]
+    assert body["results"][2]["result"]["patterns"] == "Use type hints."
+    assert body["results"][3]["result"]["context"] == ""
+
+
+def test_independent_calls_fail_alone(client, db_session):
+    create_chain(client, [{"task_id": "T1", "description": "d", "type": "CODE"}])
+
+    response = client.post("/tools/batch", json={"calls": [
+        {"tool": "appendActiveContext", "arguments": {"context": "kept"}},
+        {"tool": "startWorkOnTask", "arguments": {"task_id": "MISSING"}},
+        {"tool": "startWorkOnTask", "arguments": {}},
+        {"tool": "noSuchTool"},
+        {"tool": "finishWorkOnTask", "arguments": {"task_id": "T1"}},
+    ]})
+
+    body = response.json()
+    assert body["committed"] is True
+    assert [result["ok"] for result in body["results"]] == [True, False, False, False, True]
+    assert [result["error"]["status_code"] for result in body["results"] if not result["ok"]] == [404, 422, 404]
+    assert db_session.query(Task).filter(Task.task_id == "T1").one().status == "COMPLETED"
+    assert db_session.query(ProjectContextSegment.content).scalar() == "kept"
+
+
+def test_atomic_batch_rolls_back_on_first_failure(client, db_session):
+    create_chain(client, [{"task_id": "T1", "description": "d", "type": "CODE"}])
+
+    response = client.post("/tools/batch", json={"atomic": True, "calls": [
+        {"tool": "startWorkOnTask", "arguments": {"task_id": "T1"}},
+        {"tool": "appendActiveContext", "arguments": {"context": "rolled back"}},
+        {"tool": "getActiveContext"},
+        {"tool": "createTaskChain", "arguments": {"tasks": [
+            {"task_id": "T2", "description": "d", "type": "CODE", "dependencies": ["NOPE"]}
+        ]}},
+        {"tool": "finishWorkOnTask", "arguments": {"task_id": "T1"}},
+    ]})
+
+    body = response.json()
+    assert body["committed"] is False
+    assert [result["ok"] for result in body["results"]] == [True, True, True, False, False]
+    assert body["results"][2]["result"]["context"] == "rolled back"
+    assert body["results"][3]["error"]["status_code"] == 400
+    assert body["results"][4]["error"]["status_code"] == 424
+    assert db_session.query(Task).filter(Task.task_id == "T1").one().status == "PENDING"
+    assert db_session.query(Journal).count() == 0
+    assert db_session.query(ProjectContextSegment).count() == 0
+
+    # A rolled-back append must not leave a stale cached value behind.
+    client.post("/tools/appendActiveContext", json={"context": "real"})
+    assert client.post("/tools/getActiveContext", json={}).json()["context"] == "real"
@@ -0,0 +1,113 @@
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import config, crud, schemas
+from app.database import Base
+from app.models import Journal, Task
+from app.services import claim_next_ready_tasks
+
+
+def test_claim_batch_filtered_by_role(client, db_session):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "DEV-1", "description": "d1", "type": "CODE", "assignee_role": "developer"},
+        {"task_id": "QA-1", "description": "q1", "type": "QA", "assignee_role": "qa"},
+        {"task_id": "DEV-2", "description": "d2", "type": "CODE", "assignee_role": "developer"},
+        {"task_id": "DEV-3", "description": "d3", "type": "CODE", "assignee_role": "developer",
+         "dependencies": ["DEV-1"]},
+    ]})
+
+    response = client.post("/tools/claimNextReadyTask", json={"max_tasks": 5, "assignee_role": "developer"})
+
+    assert response.status_code == 200
+    assert sorted(task["task_id"] for task in response.json()) == ["DEV-1", "DEV-2"]
+    assert all(task["status"] == "RUNNING" for task in response.json())
+    journal = db_session.query(Journal.task_id, Journal.event_type).all()
+    assert sorted(journal) == [("DEV-1", "STARTING"), ("DEV-2", "STARTING")]
+
+    # Nothing left for developers; the QA task is untouched.
+    response = client.post("/tools/claimNextReadyTask", json={"assignee_role": "developer"})
+    assert response.json() == []
+    assert db_session.query(Task).filter(Task.task_id == "QA-1").one().status == "PENDING"
+
+
+def test_concurrent_claims_never_share_a_task(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        for i in range(300):
+            crud.create_task(db, schemas.TaskCreate(task_id=f"T-{i:03d}", description="t", type="CODE"))
+
+    claimed = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker(batch_size):
+        try:
+            with SessionLocal() as db:
+                while True:
+                    tasks = claim_next_ready_tasks(db, max_tasks=batch_size)
+                    if not tasks:
+                        return
+                    with lock:
+                        claimed.extend(task.task_id for task in tasks)
+        except Exception as e:  # pragma: no cover - surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(1 + i % 3,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(claimed) == 300
+    assert len(set(claimed)) == 300
+    with SessionLocal() as db:
+        assert db.query(Journal).count() == 300
+        assert db.query(Task).filter(Task.status != "RUNNING").count() == 0
+    engine.dispose()
+
+
+def test_concurrent_fair_share_claims_wait_for_the_write_lock(tmp_path, monkeypatch):
+    # Planning the split across roles reads before the claim writes.
+    monkeypatch.setattr(config, "FAIR_SHARE", True)
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'claims.db'}", connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA journal_mode=WAL"))
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        for i in range(300):
+            crud.create_task(db, schemas.TaskCreate(
+                task_id=f"T-{i:03d}", description="t", type="CODE", assignee_role=("dev", "qa", None)[i % 3]
+            ))
+
+    claimed = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        try:
+            with SessionLocal() as db:
+                while True:
+                    tasks = claim_next_ready_tasks(db, max_tasks=3)
+                    if not tasks:
+                        return
+                    with lock:
+                        claimed.extend(task.task_id for task in tasks)
+        except Exception as e:  # pragma: no cover - surfaced by the assertion below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(claimed) == [f"T-{i:03d}" for i in range(300)]
+    engine.dispose()
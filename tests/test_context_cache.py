@@ -0,0 +1,76 @@
+import multiprocessing
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas
+from app.cache import ContextCache, context_cache
+from app.database import Base
+
+
+def test_lru_eviction_respects_entry_and_byte_bounds():
+    cache = ContextCache(max_entries=2, max_bytes=10)
+    cache.put("a", "1:0", "aaaa")
+    cache.put("b", "1:0", "bbbb")
+    assert cache.get("a", "1:0") == "aaaa" # "b" is now least recently used
+
+    cache.put("c", "1:0", "cccc")
+    assert cache.get("b", "1:0") is None
+    cache.put("d", "1:0", "dddddddd")  # Over the byte budget with "a" and "c"
+    assert cache.stats()["entries"] == 1
+    assert cache.get("d", "1:0") == "dddddddd"
+    assert cache.get("d", "2:0") is None # Stale cursor
+
+
+def test_byte_bound_counts_utf8_bytes():
+    cache = ContextCache(max_entries=10, max_bytes=10)
+    cache.put("a", "1:0", "编码规范") # 4 characters, 12 bytes
+    assert cache.get("a", "1:0") is None
+
+    cache.put("b", "1:0", "规范")
+    cache.put("c", "1:0", "ok")
+    assert cache.stats()["bytes"] == 8
+    cache.put("b", "2:0", "b")
+    assert cache.stats()["bytes"] == 3
+
+
+def test_reads_are_served_from_cache_until_the_cursor_changes(client, db_session):
+    client.post("/tools/updateSystemPatterns", json={"patterns": "use black"})
+
+    for _ in range(3):
+        assert client.post("/tools/getSystemPatterns", json={}).json()["patterns"] == "use black"
+    assert context_cache.stats()["hits"] == 2
+
+    client.post("/tools/updateSystemPatterns", json={"patterns": "use ruff"})
+    assert client.post("/tools/getSystemPatterns", json={}).json()["patterns"] == "use ruff"
+
+
+def _append_from_other_process(url):
+    engine = create_engine(url)
+    with sessionmaker(bind=engine)() as db:
+        crud.append_project_context(db, "active_context", "written by another process")
+    engine.dispose()
+
+
+def test_write_in_another_process_is_visible_at_next_read(tmp_path):
+    url = f"sqlite:///{tmp_path / 'shared.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    context_cache.clear()
+    with SessionLocal() as db:
+        crud.create_or_update_project_context(db, schemas.ProjectContextCreate(key="active_context", value="base"))
+        assert crud.get_project_context_value(db, "active_context") == "base"
+        assert crud.get_project_context_value(db, "active_context") == "base"
+    assert context_cache.stats()["hits"] == 1
+
+    process = multiprocessing.get_context("spawn").Process(target=_append_from_other_process, args=(url,))
+    process.start()
+    process.join(timeout=30)
+    assert process.exitcode == 0
+
+    with SessionLocal() as db:
+        assert crud.get_project_context_value(db, "active_context") == "base\nwritten by another process"
+    assert context_cache.stats()["misses"] == 2
+    context_cache.clear()
+    engine.dispose()
@@ -0,0 +1,52 @@
+from sqlalchemy import create_engine, text
+
+from app import crud, migrations
+from app.database import Base
+from app.models import TaskDependency
+
+
+def test_dependencies_are_stored_as_edges(client, db_session):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "A", "description": "a", "type": "CODE"},
+        {"task_id": "B", "description": "b", "type": "CODE"},
+        {"task_id": "C", "description": "c", "type": "CODE", "dependencies": ["B", "A", "B"]},
+    ]})
+
+    edges = db_session.query(TaskDependency.task_id, TaskDependency.depends_on_id).all()
+    assert sorted(edges) == [("C", "A"), ("C", "B")]
+    assert crud.get_dependent_task_ids(db_session, "A") == ["C"]
+
+    response = client.post("/tools/getTaskDetails", json={"task_id": "C"})
+    assert response.json()["dependencies"] == ["A", "B"]
+
+
+def test_json_dependencies_are_migrated_on_startup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE tasks (task_id VARCHAR(255) PRIMARY KEY, description TEXT NOT NULL, "
+            "details TEXT, type VARCHAR(50) NOT NULL, status VARCHAR(50) NOT NULL, "
+            "dependencies TEXT, assignee_role VARCHAR(100), "
+            "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "INSERT INTO tasks (task_id, description, type, status, dependencies) VALUES "
+            "('A', 'a', 'CODE', 'COMPLETED', '[]'), "
+            "('B', 'b', 'CODE', 'PENDING', '[\"A\"]'), "
+            "('C', 'c', 'CODE', 'PENDING', '[\"A\", \"B\"]')"
+        ))
+    Base.metadata.create_all(bind=engine)
+
+    migrations.run_migrations(engine)
+    migrations.run_migrations(engine) # Running twice must be harmless
+
+    with engine.connect() as conn:
+        edges = conn.execute(text("SELECT task_id, depends_on_id FROM task_dependencies")).all()
+        tasks = conn.execute(text(
+            "SELECT task_id, unmet_dependencies, dependencies FROM tasks ORDER BY task_id"
+        )).all()
+        ready = conn.execute(text("SELECT value FROM stats_counters WHERE name = 'tasks_ready'")).scalar()
+    assert sorted(edges) == [("B", "A"), ("C", "A"), ("C", "B")]
+    assert tasks == [("A", 0, None), ("B", 0, None), ("C", 1, None)]
+    assert ready == 1
+    engine.dispose()
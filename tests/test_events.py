@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import events, schemas, services
+from app.events import EventBus, sse_stream
+
+
+def create_chain(client, tasks):
+    response = client.post("/tools/createTaskChain", json={"tasks": tasks})
+    assert response.status_code == 200
+
+
+def test_events_are_published_after_commit(db_session):
+    async def scenario():
+        with events.bus.subscribe() as subscription:
+            await asyncio.to_thread(services.create_task_chain, db_session, [
+                schemas.TaskCreate(task_id="A", description="a", type="CODE"),
+                schemas.TaskCreate(task_id="B", description="b", type="CODE", dependencies=["A"]),
+            ])
+            with pytest.raises(ValueError):
+                # Rejected before anything is written or published
+                await asyncio.to_thread(services.create_task_chain, db_session, [
+                    schemas.TaskCreate(task_id="C", description="c", type="CODE", dependencies=["X"]),
+                ])
+            await asyncio.to_thread(services.start_work_on_task, db_session, "A")
+            await asyncio.to_thread(services.finish_work_on_task, db_session, "A")
+
+            received = []
+            while (task_event := await subscription.get(0.5)) is not None:
+                received.append((task_event.event, task_event.task_id))
+            return received
+
+    assert asyncio.run(scenario()) == [
+        ("created", "A"), ("ready", "A"), ("created", "B"),
+        ("started", "A"),
+        ("finished", "A"), ("ready", "B"),
+    ]
+
+
+def test_rolled_back_events_are_discarded(db_session):
+    async def scenario():
+        with events.bus.subscribe() as subscription:
+            def fail_after_queueing():
+                events.queue_event(db_session, events.READY, "GHOST")
+                db_session.rollback()
+            await asyncio.to_thread(fail_after_queueing)
+            return await subscription.get(0.2)
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_wait_for_ready_task_times_out(client, db_session):
+    started = time.monotonic()
+    response = client.post("/tools/waitForReadyTask", json={"timeout": 0.3})
+    assert response.status_code == 200
+    assert response.json() is None
+    assert time.monotonic() - started >= 0.3
+
+
+def test_wait_for_ready_task_wakes_when_a_task_is_unblocked(client, db_session):
+    create_chain(client, [
+        {"task_id": "A", "description": "a", "type": "CODE", "status": "RUNNING"},
+        {"task_id": "B", "description": "b", "type": "QA", "assignee_role": "qa", "dependencies": ["A"]},
+    ])
+    result = {}
+
+    def wait():
+        result["response"] = client.post("/tools/waitForReadyTask", json={"timeout": 10, "assignee_role": "qa"})
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    time.sleep(0.3)
+    assert waiter.is_alive()
+    started = time.monotonic()
+    client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+    waiter.join(timeout=10)
+
+    assert time.monotonic() - started < 5
+    assert result["response"].json() == {"task_id": "B", "type": "QA", "assignee_role": "qa", "priority": 0}
+
+
+def test_sse_stream_formats_events():
+    bus = EventBus()
+
+    async def scenario():
+        stream = sse_stream(bus, keepalive=0.1)
+        assert await anext(stream) == ": connected\n\n"
+        bus.publish([schemas.TaskEvent(event="finished", task_id="A", status="COMPLETED")])
+        message = await anext(stream)
+        keepalive = await anext(stream)
+        await stream.aclose()
+        return message, keepalive
+
+    message, keepalive = asyncio.run(scenario())
+    assert message == 'event: finished\ndata: {"event":"finished","task_id":"A","status":"COMPLETED"}\n\n'
+    assert keepalive == ": keepalive\n\n"
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, events, schemas, tools
+from app.database import Base
+from app.group_commit import GroupCommitWriter
+from app.models import Journal, ProjectContextSegment, Task
+
+
+@pytest.fixture
+def file_sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'group.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        for i in range(20):
+            crud.create_task(db, schemas.TaskCreate(task_id=f"T-{i:02d}", description="t", type="CODE"))
+    commits.clear()
+    yield SessionLocal, commits
+    engine.dispose()
+
+
+def test_calls_share_one_commit(file_sessions):
+    SessionLocal, commits = file_sessions
+    writer = GroupCommitWriter(SessionLocal, window_ms=200, max_batch=64)
+
+    futures = [
+        writer.submit(tools.start_work_on_task, schemas.TaskIdPayload(task_id=f"T-{i:02d}"))
+        for i in range(20)
+    ]
+    futures.append(writer.submit(tools.append_active_context, schemas.ActiveContext(context="note")))
+    results = [future.result(timeout=10) for future in futures]
+    writer.stop()
+
+    assert [task.status for task in results[:20]] == ["RUNNING"] * 20
+    assert results[20].content == "note"
+    assert writer.calls == 21
+    assert writer.batches < 21
+    assert len(commits) == writer.batches
+    with SessionLocal() as db:
+        assert db.query(Journal).count() == 20
+        assert db.query(Task).filter(Task.status != "RUNNING").count() == 0
+        assert db.query(ProjectContextSegment).count() == 1
+
+
+def fail_after_writing(db):
+    tools.update_task_status(db, schemas.TaskStatusUpdate(
+        task_id="T-01", status="COMPLETED", context_message="should be rolled back"))
+    raise RuntimeError("boom")
+
+
+def test_failing_call_does_not_affect_its_batch(file_sessions):
+    SessionLocal, commits = file_sessions
+    writer = GroupCommitWriter(SessionLocal, window_ms=200, max_batch=64)
+
+    ok = writer.submit(tools.start_work_on_task, schemas.TaskIdPayload(task_id="T-00"))
+    missing = writer.submit(tools.start_work_on_task, schemas.TaskIdPayload(task_id="NOPE"))
+    invalid = writer.submit(fail_after_writing)
+    also_ok = writer.submit(tools.finish_work_on_task, schemas.TaskIdPayload(task_id="T-02"))
+
+    assert ok.result(timeout=10).status == "RUNNING"
+    assert also_ok.result(timeout=10).status == "COMPLETED"
+    with pytest.raises(HTTPException):
+        missing.result(timeout=10)
+    with pytest.raises(RuntimeError):
+        invalid.result(timeout=10)
+    writer.stop()
+
+    assert len(commits) == 1
+    with SessionLocal() as db:
+        statuses = dict(db.query(Task.task_id, Task.status).filter(Task.task_id.in_(["T-00", "T-01", "T-02"])))
+        assert statuses == {"T-00": "RUNNING", "T-01": "PENDING", "T-02": "COMPLETED"}
+        assert sorted(db.query(Journal.task_id, Journal.event_type)) == [
+            ("T-00", "STARTING"), ("T-02", "FINISHED")
+        ]
+        assert db.query(ProjectContextSegment).count() == 0
+
+
+def test_events_of_a_failed_call_are_not_published(file_sessions):
+    SessionLocal, commits = file_sessions
+    writer = GroupCommitWriter(SessionLocal, window_ms=200, max_batch=64)
+
+    async def scenario():
+        with events.bus.subscribe() as subscription:
+            failed = writer.submit(fail_after_writing)
+            ok = writer.submit(tools.start_work_on_task, schemas.TaskIdPayload(task_id="T-00"))
+            await asyncio.wait([asyncio.wrap_future(failed), asyncio.wrap_future(ok)])
+            received = []
+            while (task_event := await subscription.get(0.2)) is not None:
+                received.append((task_event.event, task_event.task_id))
+            return received
+
+    assert asyncio.run(scenario()) == [("started", "T-00")]
+    writer.stop()
@@ -0,0 +1,89 @@
+from sqlalchemy import create_engine, text
+
+from app import migrations
+from app.database import Base
+
+
+def _create(client, *task_ids):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": task_id, "description": task_id, "type": "CODE"} for task_id in task_ids
+    ]})
+
+
+def _set_status(client, task_id, status):
+    client.post("/tools/updateTaskStatus", json={"task_id": task_id, "status": status})
+
+
+def test_finds_tasks_whose_status_disagrees_with_the_journal(client, db_session):
+    _create(client, "A", "B", "C", "D", "E", "F")
+    client.post("/tools/startWorkOnTask", json={"task_id": "A"})   # RUNNING, STARTING
+    client.post("/tools/startWorkOnTask", json={"task_id": "B"})
+    client.post("/tools/finishWorkOnTask", json={"task_id": "B"})  # COMPLETED, FINISHED
+    _set_status(client, "C", "COMPLETED")                          # COMPLETED, no event
+    _set_status(client, "D", "RUNNING")                            # RUNNING, no event
+    client.post("/tools/startWorkOnTask", json={"task_id": "E"})
+    _set_status(client, "E", "PENDING")                            # PENDING, STARTING
+    _set_status(client, "F", "BLOCKED")                            # not journaled
+
+    response = client.post("/tools/getInconsistentTasks", json={})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "inconsistent_tasks": [
+            {"task_id": "C", "status": "COMPLETED", "last_event": None},
+            {"task_id": "D", "status": "RUNNING", "last_event": None},
+            {"task_id": "E", "status": "PENDING", "last_event": "STARTING"},
+        ],
+        "next_after_task_id": None,
+    }
+
+
+def test_pages_by_task_id(client, db_session):
+    task_ids = [f"T{i:02d}" for i in range(7)]
+    _create(client, *task_ids)
+    for task_id in task_ids:
+        _set_status(client, task_id, "RUNNING")
+
+    seen, after_task_id = [], None
+    while True:
+        page = client.post("/tools/getInconsistentTasks", json={"limit": 3, "after_task_id": after_task_id}).json()
+        seen.append([task["task_id"] for task in page["inconsistent_tasks"]])
+        after_task_id = page["next_after_task_id"]
+        if after_task_id is None:
+            break
+
+    assert seen == [task_ids[0:3], task_ids[3:6], task_ids[6:]]
+
+
+def test_last_event_is_backfilled_on_startup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE tasks (task_id VARCHAR(255) PRIMARY KEY, description TEXT NOT NULL, "
+            "details TEXT, type VARCHAR(50) NOT NULL, status VARCHAR(50) NOT NULL, "
+            "unmet_dependencies INTEGER NOT NULL DEFAULT 0, assignee_role VARCHAR(100), "
+            "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE journal (id INTEGER PRIMARY KEY AUTOINCREMENT, task_id VARCHAR(255) NOT NULL, "
+            "event_type VARCHAR(50) NOT NULL, timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "INSERT INTO tasks (task_id, description, type, status) VALUES "
+            "('A', 'a', 'CODE', 'COMPLETED'), ('B', 'b', 'CODE', 'COMPLETED'), ('C', 'c', 'CODE', 'PENDING')"
+        ))
+        conn.execute(text(
+            "INSERT INTO journal (task_id, event_type) VALUES "
+            "('A', 'STARTING'), ('A', 'FINISHED'), ('B', 'STARTING')"
+        ))
+    Base.metadata.create_all(bind=engine)
+
+    migrations.run_migrations(engine)
+    migrations.run_migrations(engine) # Running twice must be harmless
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO journal (task_id, event_type) VALUES ('C', 'STARTING')"))
+
+    with engine.connect() as conn:
+        tasks = conn.execute(text("SELECT task_id, last_event FROM tasks ORDER BY task_id")).all()
+    assert tasks == [("A", "FINISHED"), ("B", "STARTING"), ("C", "STARTING")]
+    engine.dispose()
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import config, crud, models, services
+from app.leases import LeaseSweeper
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def leases_enabled(monkeypatch):
+    monkeypatch.setattr(config, "TASK_LEASE_S", 300)
+
+
+def _create(client, *task_ids):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": task_id, "description": task_id, "type": "CODE"} for task_id in task_ids
+    ]})
+
+
+def _lease(response):
+    return datetime.fromisoformat(response.json()["lease_expires_at"])
+
+
+def test_running_tasks_hold_a_lease_that_heartbeats_extend(client, db_session, query_budget):
+    _create(client, "A")
+    before = crud.utcnow()
+
+    started = client.post("/tools/startWorkOnTask", json={"task_id": "A"})
+    with query_budget(1):
+        heartbeat = client.post("/tools/heartbeatTask", json={"task_id": "A"})
+    finished = client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+
+    assert _lease(started) >= before + timedelta(seconds=config.TASK_LEASE_S)
+    assert heartbeat.status_code == 200
+    assert _lease(heartbeat) >= _lease(started)
+    assert finished.json()["lease_expires_at"] is None
+
+
+def test_heartbeat_fails_unless_the_task_is_running(client, db_session):
+    _create(client, "A")
+
+    assert client.post("/tools/heartbeatTask", json={"task_id": "A"}).status_code == 409
+    assert client.post("/tools/heartbeatTask", json={"task_id": "missing"}).status_code == 404
+
+
+def test_expired_leases_return_tasks_to_pending(client, db_session):
+    _create(client, "A", "B", "C")
+    client.post("/tools/claimNextReadyTask", json={"max_tasks": 2})
+    client.post("/tools/startWorkOnTask", json={"task_id": "C"})
+    client.post("/tools/heartbeatTask", json={"task_id": "C"})
+    # A and B expire; C's lease is pushed past the sweep.
+    db_session.query(models.Task).filter(models.Task.task_id == "C").update(
+        {"lease_expires_at": crud.utcnow() + timedelta(days=1)}
+    )
+    db_session.commit()
+
+    expired = services.expire_leases(db_session, now=crud.utcnow() + timedelta(seconds=config.TASK_LEASE_S + 1))
+
+    assert sorted(expired) == ["A", "B"]
+    details = client.post("/tools/getTaskDetails", json={"task_id": "A"}).json()
+    assert details["status"] == "PENDING"
+    assert details["lease_expires_at"] is None
+    assert [entry["event_type"] for entry in details["journal_entries"]] == ["STARTING", "LEASE_EXPIRED"]
+    assert client.post("/tools/getNextReadyTask").json()["task_id"] == "A"
+    assert client.post("/tools/heartbeatTask", json={"task_id": "A"}).status_code == 409
+    assert client.post("/tools/getInconsistentTasks", json={}).json()["inconsistent_tasks"] == []
+
+
+def test_sweeper_drains_expired_leases_in_batches(client, db_session):
+    _create(client, *[f"T{i}" for i in range(5)])
+    client.post("/tools/claimNextReadyTask", json={"max_tasks": 5})
+    db_session.query(models.Task).update({"lease_expires_at": crud.utcnow() - timedelta(seconds=1)})
+    db_session.commit()
+
+    sweeper = LeaseSweeper(TestingSessionLocal, batch_size=2)
+
+    assert sweeper.sweep() == 5
+    assert sweeper.sweep() == 0
+    assert db_session.query(models.Task).filter(models.Task.status == "PENDING").count() == 5
+
+
+def test_tasks_created_running_are_leased(client, db_session):
+    before = crud.utcnow()
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "A", "description": "a", "type": "CODE", "status": "RUNNING"},
+        {"task_id": "B", "description": "b", "type": "CODE"},
+    ]})
+
+    running = client.post("/tools/getTaskDetails", json={"task_id": "A"})
+    pending = client.post("/tools/getTaskDetails", json={"task_id": "B"})
+
+    assert _lease(running) >= before + timedelta(seconds=config.TASK_LEASE_S)
+    assert pending.json()["lease_expires_at"] is None
+    assert services.expire_leases(db_session, now=crud.utcnow() + timedelta(seconds=config.TASK_LEASE_S + 1)) == ["A"]
+
+
+def test_late_agent_cannot_finish_a_task_after_its_lease_expired(client, db_session):
+    _create(client, "A")
+    client.post("/tools/startWorkOnTask", json={"task_id": "A"})
+    services.expire_leases(db_session, now=crud.utcnow() + timedelta(seconds=config.TASK_LEASE_S + 1))
+
+    finished = client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+    updated = client.post("/tools/updateTaskStatus", json={"task_id": "A", "status": "COMPLETED"})
+
+    assert finished.status_code == 409
+    assert updated.status_code == 409
+    assert client.post("/tools/getTaskDetails", json={"task_id": "A"}).json()["status"] == "PENDING"
+    # Whoever starts it again can finish it.
+    client.post("/tools/startWorkOnTask", json={"task_id": "A"})
+    assert client.post("/tools/finishWorkOnTask", json={"task_id": "A"}).json()["status"] == "COMPLETED"
+
+
+def test_expired_task_can_still_be_cancelled(client, db_session):
+    _create(client, "A")
+    client.post("/tools/startWorkOnTask", json={"task_id": "A"})
+    services.expire_leases(db_session, now=crud.utcnow() + timedelta(seconds=config.TASK_LEASE_S + 1))
+
+    cancelled = client.post("/tools/updateTaskStatus", json={"task_id": "A", "status": "CANCELLED"})
+
+    assert cancelled.status_code == 200
+    assert cancelled.json()["status"] == "CANCELLED"
+
+
+def test_finish_is_unchanged_when_leases_are_disabled(client, db_session, monkeypatch):
+    monkeypatch.setattr(config, "TASK_LEASE_S", 0)
+    _create(client, "A")
+
+    # Neither a task that was never started nor a second finish is refused.
+    assert client.post("/tools/finishWorkOnTask", json={"task_id": "A"}).status_code == 200
+    assert client.post("/tools/finishWorkOnTask", json={"task_id": "A"}).status_code == 200
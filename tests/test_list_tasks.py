@@ -0,0 +1,73 @@
+from sqlalchemy import text
+
+
+def _seed(client, db_session, count):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": f"T{i:02d}", "description": f"task {i}", "details": "long details",
+         "type": "QA" if i % 3 == 0 else "CODE", "assignee_role": "qa" if i % 3 == 0 else None}
+        for i in range(count)
+    ]})
+    # Several tasks share each second, so pages must break ties on task_id.
+    db_session.execute(text(
+        "UPDATE tasks SET updated_at = '2024-01-01 00:00:0' || (CAST(substr(task_id, 2) AS INTEGER) / 4)"
+    ))
+    db_session.commit()
+
+
+def _pages(client, **payload):
+    pages, cursor = [], None
+    while True:
+        response = client.post("/tools/listTasks", json={**payload, "cursor": cursor})
+        assert response.status_code == 200
+        page = response.json()
+        pages.append([task["task_id"] for task in page["tasks"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_pages_by_update_time_and_task_id(client, db_session, query_budget):
+    _seed(client, db_session, 10)
+
+    assert _pages(client, limit=4) == [["T09", "T08", "T07", "T06"], ["T05", "T04", "T03", "T02"], ["T01", "T00"]]
+    assert _pages(client, limit=4, order="asc") == [["T00", "T01", "T02", "T03"], ["T04", "T05", "T06", "T07"], ["T08", "T09"]]
+    with query_budget(2):
+        page = client.post("/tools/listTasks", json={"limit": 1}).json()
+    assert page["tasks"] == [{
+        "task_id": "T09", "updated_at": "2024-01-01T00:00:02", "description": "task 9", "details": "long details",
+        "type": "QA", "status": "PENDING", "dependencies": [], "assignee_role": "qa", "priority": 0,
+        "created_at": page["tasks"][0]["created_at"], "lease_expires_at": None,
+    }]
+
+
+def test_filters_and_projection(client, db_session, query_budget):
+    _seed(client, db_session, 10)
+    client.post("/tools/startWorkOnTask", json={"task_id": "T03"})
+
+    # T03 was updated last
+    assert _pages(client, type="QA", order="asc") == [["T00", "T06", "T09", "T03"]]
+    assert _pages(client, assignee_role="qa", status="PENDING", order="asc") == [["T00", "T06", "T09"]]
+    assert _pages(client, updated_since="2024-01-01T00:00:02Z") == [["T03", "T09", "T08"]]
+    with query_budget(1):
+        page = client.post("/tools/listTasks", json={"status": "RUNNING", "fields": ["status"]}).json()
+    assert page == {"tasks": [{"task_id": "T03", "updated_at": page["tasks"][0]["updated_at"], "status": "RUNNING"}],
+                    "next_cursor": None}
+    assert client.post("/tools/listTasks", json={"cursor": "nonsense"}).status_code == 400
+
+
+def test_pages_are_range_scans_of_the_matching_index(client, db_session):
+    from app import crud, models
+    from tests.conftest import engine
+
+    for filters, index in (({}, "ix_tasks_updated"), ({"status": "PENDING"}, "ix_tasks_status_updated"),
+                           ({"type": "CODE"}, "ix_tasks_type_updated"), ({"assignee_role": "qa"}, "ix_tasks_role_updated")):
+        statements = []
+        execute = db_session.execute
+        db_session.execute = lambda statement, *args: statements.append(statement) or execute(statement, *args)
+        crud.list_tasks(db_session, [models.Task.details], 50, after=("2024-01-01 00:00:00", "T05"), **filters)
+        del db_session.execute
+        sql = str(statements[0].compile(engine, compile_kwargs={"literal_binds": True}))
+        plan = " ".join(row[3] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert f"USING INDEX {index} " in plan or f"USING COVERING INDEX {index} " in plan
+        assert "(updated_at,task_id)<(?,?)" in plan
+        assert "TEMP B-TREE" not in plan
@@ -0,0 +1,74 @@
+from sqlalchemy import func
+
+from app import crud, models
+from app.cache import context_cache
+from app.metrics import tool_metrics
+
+
+def _gauges(text):
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines() if line and not line.startswith("#")
+    }
+
+
+def _create_chain(client):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "A", "description": "a", "type": "CODE"},
+        {"task_id": "B", "description": "b", "type": "CODE", "dependencies": ["A"]},
+        {"task_id": "C", "description": "c", "type": "CODE", "dependencies": ["A", "B"]},
+        {"task_id": "D", "description": "d", "type": "CODE"},
+    ]})
+
+
+def test_counters_match_the_tables(client, db_session):
+    _create_chain(client)
+    client.post("/tools/startWorkOnTask", json={"task_id": "A"})
+    client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+    client.post("/tools/claimNextReadyTask", json={"max_tasks": 1})
+    client.post("/tools/updateTaskStatus", json={"task_id": "D", "status": "BLOCKED", "context_message": "waiting"})
+    client.post("/tools/appendActiveContext", json={"context": "first"})
+    client.post("/tools/appendActiveContext", json={"context": "second ✓"})
+
+    counters = crud.get_stats_counters(db_session)
+
+    statuses = dict(db_session.query(models.Task.status, func.count()).group_by(models.Task.status))
+    assert {name.split(":")[1]: value for name, value in counters.items()
+            if name.startswith("tasks_status:") and value} == {str(k): v for k, v in statuses.items()}
+    ready = db_session.query(models.Task).filter(
+        models.Task.status == "PENDING", models.Task.unmet_dependencies == 0
+    ).count()
+    assert counters["tasks_ready"] == ready
+    assert counters["journal_rows"] == db_session.query(models.Journal).count()
+    segments = db_session.query(models.ProjectContextSegment).filter_by(key="active_context").all()
+    base = db_session.query(models.ProjectContext).filter_by(key="active_context").one_or_none()
+    expected = sum(len(segment.content.encode()) for segment in segments)
+    expected += len(base.value.encode()) if base is not None and base.value else 0
+    assert expected > 0
+    assert counters["context_bytes:active_context"] == expected
+
+
+def test_metrics_endpoint(client, db_session):
+    tool_metrics.reset()
+    _create_chain(client)
+    client.post("/tools/getTaskDetails", json={"task_id": "A"})
+    client.post("/tools/getTaskDetails", json={"task_id": "missing"})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    gauges = _gauges(response.text)
+    assert gauges['memorybank_tool_requests_total{operation="getTaskDetails"}'] == 2
+    assert gauges['memorybank_tool_errors_total{operation="getTaskDetails"}'] == 1
+    assert gauges['memorybank_tool_errors_total{operation="createTaskChain"}'] == 0
+    assert gauges['memorybank_tool_latency_seconds_count{operation="getTaskDetails"}'] == 2
+    assert gauges['memorybank_tool_latency_seconds_bucket{operation="getTaskDetails",le="+Inf"}'] == 2
+    assert gauges["memorybank_tool_requests_in_flight"] == 0
+    assert gauges['memorybank_tasks{status="PENDING"}'] == 4
+    assert gauges["memorybank_tasks_ready"] == 2
+    assert gauges["memorybank_journal_entries"] == 0
+    cache = context_cache.stats()
+    assert gauges["memorybank_context_cache_hits_total"] == cache["hits"]
+    assert gauges["memorybank_context_cache_misses_total"] == cache["misses"]
+    assert gauges["memorybank_context_cache_bytes"] == cache["bytes"]
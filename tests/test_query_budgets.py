@@ -0,0 +1,71 @@
+import pytest
+
+from app.instrumentation import slow_queries
+
+# Statements each tool may run against a small seeded database. Raise a
+# budget only together with the change that needs it.
+BUDGETS = [
+    ("createTaskChain", {"tasks": [
+        {"task_id": "NEW-1", "description": "d", "type": "CODE", "dependencies": ["A"]},
+        {"task_id": "NEW-2", "description": "d", "type": "CODE", "dependencies": ["NEW-1"]},
+    ]}, 6),
+    ("getNextReadyTask", {}, 1),
+    ("waitForReadyTask", {"timeout": 0}, 1),
+    ("getTaskDetails", {"task_id": "B"}, 3),
+    ("getTaskJournal", {"task_id": "A"}, 3),
+    ("getInconsistentTasks", {}, 1),
+    ("listTasks", {"limit": 2}, 2),
+    ("getTaskGraph", {"task_id": "B"}, 2),
+    ("searchMemory", {"query": "type hints"}, 1),
+    ("startWorkOnTask", {"task_id": "A"}, 6),
+    ("finishWorkOnTask", {"task_id": "A"}, 7),
+    ("claimNextReadyTask", {"max_tasks": 5}, 5),
+    ("updateTaskStatus", {"task_id": "B", "status": "BLOCKED", "context_message": "waiting"}, 6),
+    ("getSystemPatterns", {}, 3),
+    ("getActiveContext", {}, 3),
+    ("updateSystemPatterns", {"patterns": "PEP 8"}, 4),
+    ("appendActiveContext", {"context": "note"}, 2),
+    ("batch", {"calls": [
+        {"tool": "startWorkOnTask", "arguments": {"task_id": "A"}},
+        {"tool": "getTaskDetails", "arguments": {"task_id": "A"}},
+    ]}, 14),
+]
+
+
+@pytest.fixture
+def seeded(client, db_session):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "A", "description": "a", "type": "CODE"},
+        {"task_id": "B", "description": "b", "type": "CODE", "dependencies": ["A"]},
+        {"task_id": "C", "description": "c", "type": "CODE", "dependencies": ["A", "B"]},
+    ]})
+    client.post("/tools/updateSystemPatterns", json={"patterns": "Use type hints."})
+    client.post("/tools/appendActiveContext", json={"context": "first"})
+
+
+@pytest.mark.parametrize("tool, payload, budget", BUDGETS, ids=[tool for tool, _, _ in BUDGETS])
+def test_tool_stays_within_query_budget(client, seeded, query_budget, tool, payload, budget):
+    with query_budget(budget):
+        response = client.post(f"/tools/{tool}", json=payload)
+    assert response.status_code == 200
+
+
+def test_query_budget_reports_overruns(client, seeded, query_budget):
+    with pytest.raises(AssertionError, match="over the budget of 1"):
+        with query_budget(1):
+            client.post("/tools/getTaskDetails", json={"task_id": "A"})
+
+
+def test_query_stats_in_headers_and_debug_endpoint(client, seeded):
+    client.get("/debug/queries", params={"reset": True})
+
+    response = client.post("/tools/getTaskDetails", json={"task_id": "B"})
+
+    assert response.headers["x-query-count"] == "3"
+    assert float(response.headers["x-query-time-ms"]) > 0
+    debug = client.get("/debug/queries").json()
+    assert debug["queries"] == 3
+    assert len(debug["slowest"]) == 3
+    assert all(entry["request"] == "POST /tools/getTaskDetails" for entry in debug["slowest"])
+    assert debug["slowest"][0]["ms"] >= debug["slowest"][-1]["ms"]
+    assert slow_queries.snapshot()["queries"] == 3
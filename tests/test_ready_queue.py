@@ -0,0 +1,131 @@
+from app.models import Task
+
+
+def create_chain(client, tasks):
+    response = client.post("/tools/createTaskChain", json={"tasks": tasks})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_dependents_become_ready_when_dependencies_complete(client, db_session):
+    create_chain(client, [
+        {"task_id": "A", "description": "a", "type": "CODE"},
+        {"task_id": "B", "description": "b", "type": "CODE"},
+        {"task_id": "C", "description": "c", "type": "CODE", "dependencies": ["A", "B"]},
+    ])
+    assert db_session.query(Task).filter(Task.task_id == "C").one().unmet_dependencies == 2
+
+    client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+    client.post("/tools/startWorkOnTask", json={"task_id": "B"})
+    response = client.post("/tools/getNextReadyTask", json={})
+    assert response.json() is None # C still waits for B
+
+    client.post("/tools/finishWorkOnTask", json={"task_id": "B"})
+    response = client.post("/tools/getNextReadyTask", json={})
+    assert response.json()["task_id"] == "C"
+
+
+def test_reopening_a_completed_task_blocks_its_dependents(client, db_session):
+    create_chain(client, [
+        {"task_id": "A", "description": "a", "type": "CODE", "status": "COMPLETED"},
+        {"task_id": "B", "description": "b", "type": "CODE", "dependencies": ["A"]},
+    ])
+    assert client.post("/tools/getNextReadyTask", json={}).json()["task_id"] == "B"
+
+    client.post("/tools/updateTaskStatus", json={"task_id": "A", "status": "FAILED"})
+
+    db_session.expire_all()
+    assert db_session.query(Task).filter(Task.task_id == "B").one().unmet_dependencies == 1
+    assert client.post("/tools/getNextReadyTask", json={}).json() is None
+
+
+def test_dependency_ids_are_matched_exactly(client, db_session):
+    create_chain(client, [
+        {"task_id": "T_1", "description": "blocker", "type": "CODE"},
+        {"task_id": "T1", "description": "other blocker", "type": "CODE"},
+        {"task_id": "T%1", "description": "similar id", "type": "CODE", "dependencies": ["T_1"]},
+        {"task_id": "X", "description": "waits on T1", "type": "CODE", "dependencies": ["T1"]},
+    ])
+
+    client.post("/tools/finishWorkOnTask", json={"task_id": "T_1"})
+
+    db_session.expire_all()
+    assert db_session.query(Task).filter(Task.task_id == "T%1").one().unmet_dependencies == 0
+    assert db_session.query(Task).filter(Task.task_id == "X").one().unmet_dependencies == 1
+
+
+def test_finish_reports_newly_unblocked_tasks(client, db_session):
+    create_chain(client, [
+        {"task_id": "A", "description": "a", "type": "CODE"},
+        {"task_id": "B", "description": "b", "type": "CODE", "dependencies": ["A"]},
+        {"task_id": "C", "description": "c", "type": "CODE", "dependencies": ["A"]},
+        {"task_id": "D", "description": "d", "type": "CODE", "dependencies": ["B", "C"]},
+        {"task_id": "E", "description": "e", "type": "CODE", "status": "BLOCKED", "dependencies": ["A"]},
+    ])
+
+    response = client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "COMPLETED"
+    assert response.json()["unblocked_task_ids"] == ["B", "C"] # E is not PENDING
+
+    assert client.post("/tools/finishWorkOnTask", json={"task_id": "B"}).json()["unblocked_task_ids"] == []
+    assert client.post("/tools/finishWorkOnTask", json={"task_id": "C"}).json()["unblocked_task_ids"] == ["D"]
+    # Finishing an already completed task unblocks nothing new.
+    assert client.post("/tools/finishWorkOnTask", json={"task_id": "C"}).json()["unblocked_task_ids"] == []
+
+
+def test_ready_queue_is_ordered_by_priority_then_age(client, db_session):
+    create_chain(client, [
+        {"task_id": "OLD", "description": "old", "type": "CODE"},
+        {"task_id": "URGENT", "description": "urgent", "type": "CODE", "priority": 10},
+        {"task_id": "QA", "description": "qa", "type": "QA", "assignee_role": "qa", "priority": 5},
+        {"task_id": "NEW", "description": "new", "type": "CODE"},
+        {"task_id": "AFTER", "description": "after", "type": "CODE", "priority": 20, "dependencies": ["OLD"]},
+    ])
+
+    assert client.post("/tools/getNextReadyTask", json={}).json()["task_id"] == "URGENT"
+    assert client.post("/tools/getNextReadyTask", json={"assignee_role": "qa"}).json()["task_id"] == "QA"
+    claimed = client.post("/tools/claimNextReadyTask", json={"max_tasks": 3}).json()
+    assert [task["task_id"] for task in claimed] == ["URGENT", "QA", "OLD"]
+    finished = client.post("/tools/finishWorkOnTask", json={"task_id": "OLD"}).json()
+    assert finished["unblocked_task_ids"] == ["AFTER"]
+    assert client.post("/tools/getNextReadyTask", json={}).json()["task_id"] == "AFTER"
+
+
+def test_ready_queue_lookups_use_an_index(client, db_session):
+    from sqlalchemy import text
+
+    from app import crud
+    from tests.conftest import engine
+
+    for assignee_role in (None, "qa"):
+        query = db_session.query(Task).filter(Task.status == "PENDING", Task.unmet_dependencies == 0)
+        if assignee_role is not None:
+            query = query.filter(Task.assignee_role == assignee_role)
+        sql = str(query.order_by(*crud.READY_QUEUE_ORDER).limit(1).statement.compile(
+            engine, compile_kwargs={"literal_binds": True}
+        ))
+        plan = " ".join(row[3] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert "USING INDEX ix_tasks_" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_fair_share_splits_ready_tasks_across_roles(client, db_session, monkeypatch):
+    from app import config
+
+    monkeypatch.setattr(config, "FAIR_SHARE", True)
+    create_chain(client, [
+        *({"task_id": f"DEV-{i}", "description": "dev", "type": "CODE", "assignee_role": "dev"} for i in range(5)),
+        {"task_id": "QA-0", "description": "qa", "type": "QA", "assignee_role": "qa"},
+        {"task_id": "QA-1", "description": "qa", "type": "QA", "assignee_role": "qa"},
+        {"task_id": "ANY-0", "description": "any", "type": "CODE"},
+    ])
+
+    claimed = client.post("/tools/claimNextReadyTask", json={"max_tasks": 3}).json()
+    assert sorted(task["task_id"] for task in claimed) == ["ANY-0", "DEV-0", "QA-0"]
+    client.post("/tools/claimNextReadyTask", json={"max_tasks": 1, "assignee_role": "dev"})
+    # dev has 2 RUNNING, qa 1, unassigned has no ready tasks left
+    assert client.post("/tools/getNextReadyTask", json={}).json()["task_id"] == "QA-1"
+    claimed = client.post("/tools/claimNextReadyTask", json={"max_tasks": 10}).json()
+    assert sorted(task["task_id"] for task in claimed) == ["DEV-2", "DEV-3", "DEV-4", "QA-1"]
+    assert client.post("/tools/getNextReadyTask", json={}).json() is None
@@ -0,0 +1,84 @@
+from sqlalchemy import text
+
+from app import crud, models
+from app.retention import JournalCompactor, load_archive, read_archive
+from tests.conftest import TestingSessionLocal
+
+
+def _seed(client, db_session):
+    """
+    A: COMPLETED with 6 entries, B: COMPLETED with 2, C: RUNNING with 5.
+    """
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": task_id, "description": task_id, "type": "CODE"} for task_id in ("A", "B", "C")
+    ]})
+    for event_type in ("NOTE", "NOTE", "RETRY", "NOTE"):
+        db_session.add(models.Journal(task_id="A", event_type=event_type))
+        db_session.add(models.Journal(task_id="C", event_type=event_type))
+    db_session.commit()
+    for task_id in ("A", "B", "C"):
+        client.post("/tools/startWorkOnTask", json={"task_id": task_id})
+    client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+    client.post("/tools/finishWorkOnTask", json={"task_id": "B"})
+
+
+def _journal(db_session, task_id):
+    return db_session.execute(text(
+        "SELECT id, task_id, event_type, timestamp FROM journal WHERE task_id = :task_id ORDER BY id"
+    ), {"task_id": task_id}).all()
+
+
+def _compactor(tmp_path, keep=2, batch_size=500):
+    return JournalCompactor(TestingSessionLocal, str(tmp_path), keep, ["COMPLETED"], batch_size=batch_size)
+
+
+def test_compaction_keeps_the_newest_entries_and_summarises_the_rest(client, db_session, tmp_path):
+    _seed(client, db_session)
+    journal_a = _journal(db_session, "A")
+
+    assert _compactor(tmp_path, batch_size=3).sweep() == 4
+
+    # Only COMPLETED tasks with more than 2 entries lose entries
+    assert _journal(db_session, "A") == journal_a[-2:]
+    assert len(_journal(db_session, "B")) == 2
+    assert len(_journal(db_session, "C")) == 5
+    archived = [entry for path in tmp_path.iterdir() for entry in read_archive(path)]
+    assert [tuple(entry.values()) for entry in archived] == [tuple(row) for row in journal_a[:4]]
+
+    page = client.post("/tools/getTaskJournal", json={"task_id": "A"}).json()
+    assert [entry["event_type"] for entry in page["entries"]] == ["FINISHED", "STARTING"]
+    assert page["archived"]["archived_entries"] == 4
+    assert page["archived"]["event_counts"] == {"NOTE": 3, "RETRY": 1}
+    assert client.post("/tools/getTaskJournal", json={"task_id": "B"}).json()["archived"] is None
+    details = client.post("/tools/getTaskDetails", json={"task_id": "A"}).json()
+    assert details["journal_entry_count"] == 2
+    assert client.post("/tools/getInconsistentTasks", json={}).json()["inconsistent_tasks"] == []
+    assert db_session.query(models.Task.journal_events).filter(models.Task.task_id == "A").scalar() == 2
+    assert _compactor(tmp_path).sweep() == 0
+
+
+def test_archived_entries_load_back(client, db_session, tmp_path):
+    _seed(client, db_session)
+    journal_a = _journal(db_session, "A")
+    _compactor(tmp_path, keep=1, batch_size=2).sweep()
+    (path,) = tmp_path.iterdir()
+
+    assert load_archive(TestingSessionLocal, str(path), batch_size=2) == 6
+    db_session.expire_all()
+
+    assert _journal(db_session, "A") == journal_a
+    assert crud.get_journal_summary(db_session, "A") is None
+    assert client.post("/tools/getTaskDetails", json={"task_id": "A"}).json()["journal_entry_count"] == 6
+    assert client.post("/tools/getInconsistentTasks", json={}).json()["inconsistent_tasks"] == []
+    # Loading the same file again restores nothing
+    assert load_archive(TestingSessionLocal, str(path)) == 0
+
+
+def test_candidate_tasks_are_an_index_range(db_session):
+    candidates = db_session.query(models.Task.task_id).filter(
+        models.Task.status.in_(["COMPLETED"]), models.Task.journal_events > 20
+    ).statement.compile(db_session.get_bind(), compile_kwargs={"literal_binds": True})
+
+    plan = " ".join(row[3] for row in db_session.execute(text(f"EXPLAIN QUERY PLAN {candidates}")))
+
+    assert "USING INDEX ix_tasks_journal_events (status=? AND journal_events>?)" in plan
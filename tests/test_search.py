@@ -0,0 +1,65 @@
+from sqlalchemy import text
+
+from app import search
+
+
+def _search(client, query, **payload):
+    response = client.post("/tools/searchMemory", json={"query": query, **payload})
+    assert response.status_code == 200
+    return response.json()["hits"]
+
+
+def _seed(client):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "AUTH", "description": "Implement user-auth login", "type": "CODE",
+         "details": "Hash passwords with bcrypt before storing them."},
+        {"task_id": "DOCS", "description": "Write the README", "type": "DOCS"},
+    ]})
+    client.post("/tools/updateSystemPatterns", json={"patterns": "Always hash passwords; never log them."})
+    client.post("/tools/appendActiveContext", json={"context": "Chose bcrypt over argon2 for password hashing."})
+
+
+def test_finds_tasks_and_context_with_ranked_snippets(client, db_session, query_budget):
+    _seed(client)
+
+    with query_budget(1):
+        hits = _search(client, "bcrypt")
+
+    assert sorted((hit["kind"], hit["task_id"], hit["key"]) for hit in hits) == [
+        ("context", None, "active_context"), ("task", "AUTH", None),
+    ]
+    assert all("[bcrypt]" in hit["snippet"] for hit in hits)
+    assert hits[0]["score"] >= hits[1]["score"]
+    segment = next(hit for hit in hits if hit["kind"] == "context")
+    assert segment["seq"] is not None
+    # Porter stemming matches "hash", "hashing" and "passwords"; punctuation is not an error
+    assert {hit["key"] or hit["task_id"] for hit in _search(client, "hashing user-auth", kinds=["context"])} == {
+        "system_patterns", "active_context",
+    }
+    assert [hit["task_id"] for hit in _search(client, "READ*", kinds=["task"])] == ["DOCS"]
+    assert _search(client, "!!!") == []
+
+
+def test_index_follows_updates_and_replacements(client, db_session):
+    _seed(client)
+    db_session.execute(text("UPDATE tasks SET details = 'Use scrypt instead.' WHERE task_id = 'AUTH'"))
+    db_session.execute(text("UPDATE tasks SET status = 'COMPLETED' WHERE task_id = 'DOCS'"))
+    db_session.commit()
+    client.post("/tools/updateSystemPatterns", json={"patterns": "Prefer small functions."})
+
+    assert _search(client, "bcrypt", kinds=["task"]) == []
+    assert [hit["task_id"] for hit in _search(client, "scrypt")] == ["AUTH"]
+    # The old patterns are no longer indexed
+    assert [hit["key"] for hit in _search(client, "passwords", kinds=["context"])] == ["active_context"]
+    assert [hit["key"] for hit in _search(client, "functions")] == ["system_patterns"]
+
+
+def test_index_is_built_from_existing_rows(client, db_session):
+    _seed(client)
+    connection = db_session.connection()
+    connection.execute(text("DROP TABLE tasks_fts"))
+
+    search.install_search_index(connection)
+    db_session.commit()
+
+    assert [hit["task_id"] for hit in _search(client, "login")] == ["AUTH"]
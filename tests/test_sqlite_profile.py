@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, database
+from app.database import Base
+from app.models import ProjectContextSegment
+
+
+@pytest.fixture()
+def engines(tmp_path):
+    write_engine, read_engine = database._create_engines(
+        create_engine, f"sqlite:///{tmp_path / 'tuned.db'}", {"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=write_engine)
+    yield write_engine, read_engine
+    write_engine.dispose()
+    read_engine.dispose()
+
+
+def test_tuned_profile_pragmas_are_applied(engines):
+    write_engine, read_engine = engines
+    with write_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1 # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 0
+    with read_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA query_only")).scalar() == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("DELETE FROM tasks"))
+
+
+def test_concurrent_writers_queue_instead_of_failing(engines):
+    write_engine, read_engine = engines
+    WriteSession = sessionmaker(autoflush=False, bind=write_engine)
+    ReadSession = sessionmaker(autoflush=False, bind=read_engine)
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(20):
+                with WriteSession() as db:
+                    crud.append_project_context(db, "active_context", f"{n}-{i}")
+        except Exception as e:  # pragma: no cover - surfaced by the assertion below
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(50):
+                with ReadSession() as db:
+                    crud.get_project_context_value(db, "active_context")
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with ReadSession() as db:
+        assert db.query(ProjectContextSegment).count() == 160
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import schemas, services
+from app.database import Base
+from app.models import Task, TaskDependency
+from tests.conftest import engine
+
+
+def chain(size):
+    return [
+        {"task_id": f"T-{i}", "description": f"step {i}", "type": "CODE",
+         "dependencies": [f"T-{i - 1}"] if i else []}
+        for i in range(size)
+    ]
+
+
+def test_chain_is_created_in_payload_order(client, db_session):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "DONE", "description": "done", "type": "CODE", "status": "COMPLETED"},
+    ]})
+
+    response = client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "B", "description": "b", "type": "CODE", "dependencies": ["A", "DONE"]},
+        {"task_id": "A", "description": "a", "type": "CODE", "dependencies": ["DONE"]},
+    ]})
+
+    assert response.status_code == 200
+    assert [task["task_id"] for task in response.json()] == ["B", "A"]
+    assert response.json()[0]["dependencies"] == ["A", "DONE"]
+    unmet = dict(db_session.query(Task.task_id, Task.unmet_dependencies))
+    assert unmet == {"DONE": 0, "A": 0, "B": 1}
+
+
+def test_statement_count_does_not_grow_with_chain_size(client, db_session):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        counts = []
+        for offset, size in ((0, 10), (1, 200)):
+            statements.clear()
+            tasks = chain(size)
+            for task in tasks:
+                task["task_id"] = f"{offset}-{task['task_id']}"
+                task["dependencies"] = [f"{offset}-{dep}" for dep in task["dependencies"]]
+            assert client.post("/tools/createTaskChain", json={"tasks": tasks}).status_code == 200
+            counts.append(len(statements))
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert counts[0] == counts[1]
+
+
+@pytest.mark.parametrize("tasks, message", [
+    ([{"task_id": "A", "description": "a", "type": "CODE"},
+      {"task_id": "A", "description": "again", "type": "CODE"}], "more than once"),
+    ([{"task_id": "EXISTING", "description": "dup", "type": "CODE"}], "already exists"),
+    ([{"task_id": "A", "description": "a", "type": "CODE", "dependencies": ["MISSING"]}], "Unknown dependencies: MISSING"),
+    ([{"task_id": "A", "description": "a", "type": "CODE", "dependencies": ["C"]},
+      {"task_id": "B", "description": "b", "type": "CODE", "dependencies": ["A"]},
+      {"task_id": "C", "description": "c", "type": "CODE", "dependencies": ["B"]},
+      {"task_id": "D", "description": "d", "type": "CODE", "dependencies": ["C"]}], "cycle detected; tasks that cannot be ordered: A, B, C, D"),
+    ([{"task_id": "A", "description": "a", "type": "CODE", "dependencies": ["A"]}], "cycle detected"),
+])
+def test_invalid_chain_is_rejected_without_writes(client, db_session, tasks, message):
+    db_session.add(Task(task_id="EXISTING", description="existing", type="CODE"))
+    db_session.commit()
+
+    response = client.post("/tools/createTaskChain", json={"tasks": tasks})
+
+    assert response.status_code == 400
+    assert message in response.json()["detail"]
+    assert db_session.query(Task).count() == 1
+    assert db_session.query(TaskDependency).count() == 0
+
+
+def test_concurrent_chains_with_the_same_id_fail_validation(tmp_path):
+    file_engine = create_engine(
+        f"sqlite:///{tmp_path / 'chains.db'}", connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    Base.metadata.create_all(bind=file_engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=file_engine)
+    barrier = threading.Barrier(8)
+    outcomes = []
+
+    def create():
+        with SessionLocal() as db:
+            barrier.wait()
+            try:
+                services.create_task_chain(db, [schemas.TaskCreate(task_id="SAME", description="d", type="CODE")])
+                outcomes.append("created")
+            except Exception as e:
+                outcomes.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    file_engine.dispose()
+
+    assert sorted(outcomes) == ["ValueError: Task with ID 'SAME' already exists."] * 7 + ["created"]
@@ -0,0 +1,96 @@
+from app import models
+
+
+def _create(client, tasks):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": task_id, "description": task_id, "type": "CODE", "dependencies": dependencies}
+        for task_id, dependencies in tasks
+    ]})
+
+
+def test_returns_ancestors_descendants_and_critical_path(client, db_session, query_budget):
+    # A -> B -> D -> E and A -> C -> D, plus F -> E and an unrelated G
+    _create(client, [
+        ("A", []), ("B", ["A"]), ("C", ["A"]), ("D", ["B", "C"]), ("E", ["D", "F"]), ("F", []), ("G", []),
+    ])
+    client.post("/tools/startWorkOnTask", json={"task_id": "A"})
+    client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+
+    with query_budget(2):
+        response = client.post("/tools/getTaskGraph", json={"task_id": "D"})
+
+    assert response.status_code == 200
+    graph = response.json()
+    assert graph["status"] == "PENDING"
+    assert graph["ancestors"] == [
+        {"task_id": "B", "status": "PENDING", "distance": 1, "dependencies": ["A"]},
+        {"task_id": "C", "status": "PENDING", "distance": 1, "dependencies": ["A"]},
+        {"task_id": "A", "status": "COMPLETED", "distance": 2, "dependencies": []},
+    ]
+    assert graph["descendants"] == [
+        {"task_id": "E", "status": "PENDING", "distance": 1, "dependencies": ["D", "F"]},
+    ]
+    assert (graph["ancestor_count"], graph["descendant_count"]) == (3, 1)
+    assert graph["critical_path"] == ["B", "D", "E"]
+    assert graph["critical_path_length"] == 3
+    # F is ready but neither an ancestor nor a descendant of D
+    assert graph["ready_frontier"] == ["B", "C"]
+
+
+def test_limit_truncates_lists_but_not_counts(client, db_session):
+    _create(client, [(f"T{i}", [f"T{i - 1}"] if i else []) for i in range(10)])
+
+    graph = client.post("/tools/getTaskGraph", json={"task_id": "T9", "limit": 3}).json()
+
+    assert [node["task_id"] for node in graph["ancestors"]] == ["T8", "T7", "T6"]
+    assert graph["ancestor_count"] == 9
+    assert graph["critical_path"] == ["T0", "T1", "T2"]
+    assert graph["critical_path_length"] == 10
+    assert graph["ready_frontier"] == ["T0"]
+
+
+def test_handles_missing_dependencies_and_cycles(client, db_session):
+    # createTaskChain rejects both, but older databases may contain them.
+    _create(client, [("A", []), ("B", ["A"]), ("C", ["B"])])
+    db_session.add_all([
+        models.TaskDependency(task_id="B", depends_on_id="C"),
+        models.TaskDependency(task_id="B", depends_on_id="GONE"),
+    ])
+    db_session.commit()
+
+    graph = client.post("/tools/getTaskGraph", json={"task_id": "B"}).json()
+
+    assert graph["ancestors"] == [
+        {"task_id": "A", "status": "PENDING", "distance": 1, "dependencies": []},
+        {"task_id": "C", "status": "PENDING", "distance": 1, "dependencies": ["B"]},
+        {"task_id": "GONE", "status": None, "distance": 1, "dependencies": []},
+    ]
+    assert [node["task_id"] for node in graph["descendants"]] == ["C"]
+    assert graph["critical_path"] == ["A", "B", "C"]
+    assert client.post("/tools/getTaskGraph", json={"task_id": "GONE"}).status_code == 404
+
+
+def test_max_tasks_bounds_the_walk_nearest_first(client, db_session):
+    _create(client, [(f"T{i}", [f"T{i - 1}"] if i else []) for i in range(10)])
+
+    graph = client.post("/tools/getTaskGraph", json={"task_id": "T5", "max_tasks": 3}).json()
+
+    assert [node["task_id"] for node in graph["ancestors"]] == ["T4", "T3", "T2"]
+    assert [node["task_id"] for node in graph["descendants"]] == ["T6", "T7", "T8"]
+    assert (graph["ancestor_count"], graph["descendant_count"]) == (3, 3)
+    assert graph["ancestors_truncated"] and graph["descendants_truncated"]
+    # Computed over the tasks walked
+    assert graph["critical_path"] == ["T2", "T3", "T4", "T5", "T6", "T7", "T8"]
+    assert graph["ready_frontier"] == []
+
+
+def test_exactly_max_tasks_is_not_truncated(client, db_session):
+    _create(client, [(f"T{i}", [f"T{i - 1}"] if i else []) for i in range(10)])
+
+    graph = client.post("/tools/getTaskGraph", json={"task_id": "T5", "max_tasks": 5}).json()
+
+    assert (graph["ancestor_count"], graph["ancestors_truncated"]) == (5, False)
+    assert (graph["descendant_count"], graph["descendants_truncated"]) == (4, False)
+    graph = client.post("/tools/getTaskGraph", json={"task_id": "T5", "max_tasks": 4}).json()
+    assert (graph["ancestor_count"], graph["ancestors_truncated"]) == (4, True)
+    assert (graph["descendant_count"], graph["descendants_truncated"]) == (4, False)
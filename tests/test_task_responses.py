@@ -0,0 +1,72 @@
+from app import config
+from app.instrumentation import capture
+from app.models import Journal
+
+
+def create_task_with_journal(client, db_session, task_id, entries):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": f"{task_id}-DEP-{i}", "description": "d", "type": "CODE"} for i in range(5)
+    ] + [
+        {"task_id": task_id, "description": "d", "type": "CODE",
+         "dependencies": [f"{task_id}-DEP-{i}" for i in range(5)]}
+    ]})
+    db_session.add_all(Journal(task_id=task_id, event_type=f"NOTE-{i}") for i in range(entries))
+    db_session.commit()
+
+
+def test_task_response_caps_journal(client, db_session, monkeypatch):
+    monkeypatch.setattr(config, "TASK_JOURNAL_LIMIT", 3)
+    create_task_with_journal(client, db_session, "T", 10)
+
+    task = client.post("/tools/getTaskDetails", json={"task_id": "T"}).json()
+
+    assert task["dependencies"] == [f"T-DEP-{i}" for i in range(5)]
+    assert [entry["event_type"] for entry in task["journal_entries"]] == ["NOTE-7", "NOTE-8", "NOTE-9"]
+    assert task["journal_entry_count"] == 10
+
+
+def test_query_count_does_not_depend_on_journal_size(client, db_session):
+    create_task_with_journal(client, db_session, "SMALL", 1)
+    create_task_with_journal(client, db_session, "LARGE", 300)
+
+    counts = {}
+    for task_id in ("SMALL", "LARGE"):
+        for tool in ("getTaskDetails", "startWorkOnTask", "finishWorkOnTask"):
+            with capture() as stats:
+                response = client.post(f"/tools/{tool}", json={"task_id": task_id})
+            assert response.status_code == 200
+            counts[task_id, tool] = stats.count
+
+    assert counts["LARGE", "getTaskDetails"] == counts["SMALL", "getTaskDetails"] == 3
+    assert counts["LARGE", "startWorkOnTask"] == counts["SMALL", "startWorkOnTask"]
+    assert counts["LARGE", "finishWorkOnTask"] == counts["SMALL", "finishWorkOnTask"]
+    assert len(response.json()["journal_entries"]) == config.TASK_JOURNAL_LIMIT
+
+
+def test_claim_query_count_does_not_depend_on_batch_size(client, db_session):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": f"T-{i:02d}", "description": "d", "type": "CODE"} for i in range(30)
+    ]})
+    counts = []
+    for max_tasks in (1, 20):
+        with capture() as stats:
+            response = client.post("/tools/claimNextReadyTask", json={"max_tasks": max_tasks})
+        assert len(response.json()) == max_tasks
+        counts.append(stats.count)
+    assert counts[0] == counts[1]
+
+
+def test_task_journal_pages(client, db_session):
+    create_task_with_journal(client, db_session, "T", 7)
+
+    seen = []
+    before_id = None
+    while True:
+        page = client.post("/tools/getTaskJournal", json={"task_id": "T", "limit": 3, "before_id": before_id}).json()
+        seen.extend(entry["event_type"] for entry in page["entries"])
+        before_id = page["next_before_id"]
+        if before_id is None:
+            break
+
+    assert seen == [f"NOTE-{i}" for i in reversed(range(7))]
+    assert client.post("/tools/getTaskJournal", json={"task_id": "NOPE"}).status_code == 404
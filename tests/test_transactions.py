@@ -1,57 +1,11 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
 from unittest.mock import patch
 
-from app.main import app, get_db
-from app.database import Base
 from app.models import Task, Journal
 from app.services import start_work_on_task
 
-# Use an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Create the database tables for the test session
-# This line is no longer needed here as the fixture will handle table creation.
-# Base.metadata.create_all(bind=engine)
-
-# Override the get_db dependency to use the test database
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-
-app.dependency_overrides[get_db] = override_get_db
-
-client = TestClient(app)
-
-@pytest.fixture(scope="function")
-def db_session():
-    """
-    Fixture to provide a clean database session for each test function.
-    It creates all tables before the test and drops them afterwards.
-    """
-    Base.metadata.create_all(bind=engine)
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
-
-
-def test_start_work_on_task_success(db_session):
+def test_start_work_on_task_success(client, db_session):
     # 1. Setup: Create a task
     initial_task = Task(task_id="TASK-001", description="Test task", type="TDD", status="PENDING")
     db_session.add(initial_task)
@@ -69,7 +23,7 @@ def test_start_work_on_task_success(db_session):
     journal_entry = db_session.query(Journal).filter(Journal.task_id == "TASK-001").one()
     assert journal_entry.event_type == "STARTING"
 
-def test_finish_work_on_task_success(db_session):
+def test_finish_work_on_task_success(client, db_session):
     # 1. Setup: Create a task that is 'RUNNING'
     initial_task = Task(task_id="TASK-002", description="Test task", type="CODE", status="RUNNING")
     db_session.add(initial_task)
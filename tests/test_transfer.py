@@ -0,0 +1,111 @@
+import json
+
+from app import crud, models, transfer
+from tests.conftest import TestingSessionLocal, engine
+
+
+def _seed(client):
+    client.post("/tools/createTaskChain", json={"tasks": [
+        {"task_id": "A", "description": "Design the schema", "type": "DESIGN"},
+        {"task_id": "B", "description": "Write the migrations", "type": "CODE", "dependencies": ["A"]},
+        {"task_id": "C", "description": "Document the API", "type": "DOCS", "dependencies": ["A", "B"]},
+    ]})
+    client.post("/tools/startWorkOnTask", json={"task_id": "A"})
+    client.post("/tools/finishWorkOnTask", json={"task_id": "A"})
+    client.post("/tools/startWorkOnTask", json={"task_id": "B"})
+    client.post("/tools/updateSystemPatterns", json={"patterns": "Use type hints."})
+    client.post("/tools/appendActiveContext", json={"context": "Chose SQLite for the prototype."})
+
+
+def _export(client):
+    response = client.get("/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return response.text
+
+
+def _counters(db):
+    # Counters that dropped back to 0 keep their row
+    return {name: value for name, value in crud.get_stats_counters(db).items() if value}
+
+
+def _reset_database():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+
+def test_export_imports_into_an_identical_memory_bank(client, db_session):
+    _seed(client)
+    exported = _export(client)
+    lines = [json.loads(line) for line in exported.splitlines()]
+    assert lines[0] == {"format": "memorybank", "version": 1}
+    assert [line["table"] for line in lines[1:]] == sorted(
+        (line["table"] for line in lines[1:]), key=list(transfer.TABLES).index
+    )
+    counters = _counters(db_session)
+
+    _reset_database()
+    response = client.post("/import", content=exported)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "project_context": 1, "project_context_segments": 1, "tasks": 3,
+        "task_dependencies": 3, "journal": 3, "journal_summaries": 0,
+    }
+    assert _export(client) == exported
+    # Derived state follows the imported rows
+    assert _counters(db_session) == counters
+    assert client.post("/tools/getInconsistentTasks", json={}).json()["inconsistent_tasks"] == []
+    assert client.post("/tools/getNextReadyTask").json() is None
+    hits = client.post("/tools/searchMemory", json={"query": "SQLite migrations"}).json()["hits"]
+    assert {hit["key"] or hit["task_id"] for hit in hits} == {"active_context", "B"}
+    assert client.post("/tools/getActiveContext", json={}).json()["context"].endswith(
+        "Chose SQLite for the prototype."
+    )
+
+
+def test_import_is_all_or_nothing(client, db_session):
+    _seed(client)
+    exported = _export(client)
+
+    assert client.post("/import", content=exported).status_code == 409
+
+    _reset_database()
+    truncated = exported + '{"table": "tasks", "row": {"task_id": "A"}}\n'
+    response = client.post("/import", content=truncated)
+    assert response.status_code == 400
+    assert client.post("/import", content='{"format": "other"}\n').status_code == 400
+    assert client.post("/import", content=exported.replace('"table": "journal"', '"table": "users"')).status_code == 400
+    db = TestingSessionLocal()
+    assert transfer.is_empty(db)
+    db.close()
+
+
+def test_transfers_stream_in_batches(client, db_session):
+    _seed(client)
+    db = TestingSessionLocal()
+    chunks = list(transfer.export_lines(db, batch_size=2))
+    db.close()
+    # The header, then up to 2 rows of one table per chunk
+    assert [chunk.count("\n") for chunk in chunks] == [1, 1, 1, 2, 1, 2, 1, 2, 1]
+
+    _reset_database()
+    db = TestingSessionLocal()
+    counts = transfer.import_lines(db, "".join(chunks).splitlines(keepends=True), batch_size=2)
+    db.close()
+
+    assert sum(counts.values()) == 11
+    assert _export(client) == "".join(chunks)
+
+
+def test_import_accepts_a_body_sent_in_chunks(client, db_session):
+    _seed(client)
+    exported = _export(client)
+    _reset_database()
+
+    # Chunks that split lines, as a slow upload would arrive
+    encoded = exported.encode()
+    response = client.post("/import", content=(encoded[i:i + 7] for i in range(0, len(encoded), 7)))
+
+    assert response.status_code == 200
+    assert _export(client) == exported